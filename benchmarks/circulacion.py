@@ -0,0 +1,116 @@
+# benchmarks/circulacion.py
+"""
+Consulta de tendencias sobre el resumen diario contra la unión directa.
+
+Uso:
+    python -m benchmarks.circulacion --libros 20000 --prestamos 1000000
+    python -m benchmarks.circulacion --url postgresql://... --conservar-datos
+
+Genera datos sintéticos (benchmarks.datos_sinteticos) salvo con
+--conservar-datos, y mide:
+- la reconstrucción completa de circulacion_diaria;
+- tendencias() de un año (mensual y diaria), que solo lee el resumen,
+  contra la misma agregación calculada desde prestamo, prestamo_edicion,
+  edicion, libro y libro_genero; los totales deben coincidir;
+- el costo que registrar_prestamo() agrega a cada préstamo (se revierte).
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.datos_sinteticos import Escala, crear_app, generar
+from models.base import db
+from models.model import EstadoEnum, Prestamo
+from services import circulacion
+
+
+def mediana(funcion, repeticiones):
+    """(resultado, mediana en ms)"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return resultado, statistics.median(tiempos) * 1000
+
+
+def desde_prestamos(desde, hasta):
+    """Totales (préstamos, devoluciones, ingresos) por unión directa, sin resumen"""
+    items = circulacion._items(
+        (Prestamo.fecha_prestamo.between(desde, hasta))
+        | ((Prestamo.estado_actual == EstadoEnum.DEVUELTO)
+           & Prestamo.fecha_devolucion.between(desde, hasta))
+    )
+    filas = circulacion._consulta_resumen(circulacion._eventos(items, desde, hasta)).subquery()
+    return db.session.execute(
+        select(func.sum(filas.c.prestamos), func.sum(filas.c.devoluciones), func.sum(filas.c.ingresos))
+        .where(filas.c.id_genero == circulacion.TODOS_LOS_GENEROS)
+    ).one()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tendencias de circulación desde el resumen diario')
+    parser.add_argument('--url')
+    parser.add_argument('--libros', type=int, default=20000)
+    parser.add_argument('--prestamos', type=int, default=200000)
+    parser.add_argument('--usuarios', type=int)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--conservar-datos', action='store_true')
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'circulacion.db')}"
+    with crear_app(url).app_context():
+        if not args.conservar_datos:
+            escala = Escala(args.libros, args.prestamos, args.usuarios)
+            print(f'Generando datos: {escala.a_dict()}')
+            generar(escala, progreso=lambda *_: None)
+        else:
+            db.create_all()
+
+        inicio = time.perf_counter()
+        filas = circulacion.reconstruir_circulacion()
+        print(f"  {'reconstrucción completa':<28} {time.perf_counter() - inicio:>9.2f} s   {filas} filas")
+
+        hasta = date.today()
+        desde = hasta - timedelta(days=364)
+        for granularidad in ('month', 'day'):
+            resultado, ms = mediana(
+                lambda: circulacion.tendencias(desde, hasta, granularidad), args.repeticiones
+            )
+            print(f"  {'tendencias un año (' + granularidad + ')':<28} {ms:>9.1f} ms")
+
+        directo, ms = mediana(lambda: desde_prestamos(desde, hasta), args.repeticiones)
+        print(f"  {'unión directa un año':<28} {ms:>9.1f} ms")
+
+        total = resultado['total']
+        resumen = (
+            sum(p['prestamos'] for p in total),
+            sum(p['devoluciones'] for p in total),
+            round(sum(p['ingresos'] for p in total), 2),
+        )
+        directo = (int(directo[0] or 0), int(directo[1] or 0), round(float(directo[2] or 0), 2))
+        print(f"  {'mismos totales':<28} {'sí' if resumen == directo else 'NO'}  {resumen}")
+
+        ids = db.session.execute(
+            select(Prestamo.id_prestamo).order_by(Prestamo.id_prestamo.desc()).limit(200)
+        ).scalars().all()
+        inicio = time.perf_counter()
+        for id_prestamo in ids:
+            circulacion.registrar_prestamo(id_prestamo)
+        segundos = time.perf_counter() - inicio
+        db.session.rollback()
+        print(f"  {'registrar_prestamo':<28} {segundos / len(ids) * 1000:>9.2f} ms por préstamo")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+# benchmarks/concurrencia_prestamos.py
+"""
+Verificación de concurrencia del motor de préstamos: muchos hilos piden a
+la vez la misma edición y nunca deben prestarse más ejemplares de los que
+hay.
+
+Uso:
+    python -m benchmarks.concurrencia_prestamos --url postgresql://... \
+        --hilos 32 --copias 5 --rondas 3
+
+Sin --url usa una base SQLite temporal; SQLite serializa las escrituras y
+no ejercita los bloqueos de fila, así que la comprobación que vale es
+contra PostgreSQL (una base desechable: se vacía).
+
+La base se vacía y se siembra con un usuario y una edición, con los
+ejemplares repartidos en dos filas de copia. Se prueban dos escenarios:
+escasez (`--copias` ejemplares) y holgura (el doble de ejemplares que
+hilos, donde ningún hilo debe recibir "sin copias"). Cada ronda lanza los
+hilos contra la edición, comprueba que hubo exactamente min(copias, hilos)
+préstamos y que el stock es consistente, y luego devuelve todo en
+paralelo comprobando que el stock se repone. Termina con código 1 si
+alguna comprobación falla.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+from flask import Flask
+from sqlalchemy import func, select
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from config import configurar_base_datos
+from models.base import db
+from models.model import Copia, Edicion, Libro, Prestamo, Usuario
+from services.prestamos import SinDisponibilidad, devolver, prestar
+
+ID_EDICION = 1
+
+
+def crear_app(url, hilos):
+    app = Flask(__name__)
+    configurar_base_datos(app, {
+        'DATABASE_URL': url,
+        'DB_POOL_SIZE': hilos,
+        'DB_MAX_OVERFLOW': 0,
+        'DB_POOL_TIMEOUT': 60,
+    })
+    db.init_app(app)
+    return app
+
+
+def sembrar(copias):
+    db.drop_all()
+    db.create_all()
+    db.session.add(Usuario(id_usuario=1, nombre_usuario='Carga', apellido_usuario='Prueba',
+                           ci='0', telefono='0', domicilio='-'))
+    db.session.add(Libro(id_libro=1, titulo_libro='Libro disputado', idioma='es',
+                         numero_paginas=100, sinopsis='-'))
+    db.session.add(Edicion(id_edicion=ID_EDICION, isbn='0', año_publicacion=2000, id_libro=1))
+    # Los ejemplares repartidos en dos filas de copia: también ejercita el reintento
+    mitad = copias // 2
+    db.session.add_all([
+        Copia(id_copia=1, copias_disponibles=mitad, id_edicion=ID_EDICION),
+        Copia(id_copia=2, copias_disponibles=copias - mitad, id_edicion=ID_EDICION),
+    ])
+    db.session.commit()
+
+
+def stock():
+    db.session.expire_all()
+    valores = db.session.execute(
+        select(Copia.copias_disponibles).where(Copia.id_edicion == ID_EDICION)
+    ).scalars().all()
+    return sum(valores), min(valores)
+
+
+def en_paralelo(app, hilos, operacion):
+    """Ejecuta `operacion(i)` en `hilos` hilos a la vez y cuenta los resultados"""
+    resultados = Counter()
+    prestados = []
+    lock = threading.Lock()
+    barrera = threading.Barrier(hilos)
+
+    def trabajador(i):
+        with app.app_context():
+            barrera.wait()
+            try:
+                resultado = operacion(i)
+                clave = 'ok'
+            except SinDisponibilidad:
+                resultado, clave = None, 'sin_copias'
+            except Exception as e:
+                resultado, clave = None, type(e).__name__
+            with lock:
+                resultados[clave] += 1
+                if resultado is not None:
+                    prestados.append(resultado)
+
+    lista = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+    for hilo in lista:
+        hilo.start()
+    for hilo in lista:
+        hilo.join()
+    return resultados, prestados
+
+
+def probar_ronda(app, hilos, copias, nombre):
+    """Presta y devuelve en paralelo; devuelve la lista de comprobaciones fallidas"""
+    fallos = []
+    inicio = time.perf_counter()
+    resultados, prestamos = en_paralelo(
+        app, hilos,
+        lambda i: prestar(1, [ID_EDICION], precio_alquiler='0').id_prestamo
+    )
+    duracion = time.perf_counter() - inicio
+
+    with app.app_context():
+        total, minimo = stock()
+    print(f"{nombre}: préstamo {dict(resultados)} en {duracion * 1000:.0f}ms, "
+          f"stock={total} (mínimo por fila {minimo})")
+    if len(prestamos) != min(copias, hilos):
+        fallos.append(f'{nombre}: {len(prestamos)} préstamos de {hilos} pedidos con {copias} copias')
+    if minimo < 0 or total != copias - len(prestamos):
+        fallos.append(f'{nombre}: stock inconsistente ({total}, mínimo {minimo})')
+
+    # Cada préstamo se intenta devolver dos veces: solo una debe prosperar
+    pendientes = prestamos * 2
+    resultados, devueltos = en_paralelo(
+        app, len(pendientes), lambda i: devolver(pendientes[i]).id_prestamo
+    )
+    with app.app_context():
+        total, minimo = stock()
+        en_curso = db.session.execute(
+            select(func.count()).select_from(Prestamo)
+            .where(Prestamo.fecha_devolucion > date.today())
+        ).scalar()
+    print(f"{nombre}: devolución {dict(resultados)}, stock={total}, "
+          f"sin devolver={en_curso}")
+    if sorted(devueltos) != sorted(prestamos) or total != copias:
+        fallos.append(f'{nombre}: devoluciones inconsistentes (stock {total})')
+    return fallos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrencia de préstamos sobre una misma edición')
+    parser.add_argument('--url')
+    parser.add_argument('--hilos', type=int, default=32)
+    parser.add_argument('--copias', type=int, default=5)
+    parser.add_argument('--rondas', type=int, default=3)
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'prestamos.db')}"
+    app = crear_app(url, args.hilos)
+    if url.startswith('sqlite'):
+        print('AVISO: SQLite serializa las escrituras; use --url postgresql://... '
+              'para ejercitar los bloqueos de fila')
+    fallos = []
+
+    for escenario, copias in (('escasez', args.copias), ('holgura', args.hilos * 2)):
+        with app.app_context():
+            sembrar(copias)
+        for ronda in range(1, args.rondas + 1):
+            fallos.extend(probar_ronda(app, args.hilos, copias, f'{escenario} {ronda}'))
+
+    for fallo in fallos:
+        print(f'FALLO {fallo}')
+    print('OK' if not fallos else f'{len(fallos)} comprobaciones fallidas')
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+# benchmarks/datos_sinteticos.py
+"""
+Generador de datos sintéticos para los dos esquemas (catálogo y
+circulación), a escala configurable.
+
+Uso:
+    python -m benchmarks.datos_sinteticos --url sqlite:////tmp/biblio.db --libros 100000
+    python -m benchmarks.datos_sinteticos --url postgresql://... --libros 10000000 \
+        --conservar-esquema
+
+Por defecto se recrea el esquema desde los modelos. Con
+--conservar-esquema se vacían las tablas y se mantiene el esquema
+existente (el de `flask db upgrade`, con sus triggers e índices de
+búsqueda). Las filas se generan en lotes sin materializar la tabla
+completa. En PostgreSQL se cargan con COPY y en otros motores con
+executemany.
+
+La generación es determinista para una misma semilla y escala. Los
+benchmarks y scripts/verificar_indices.py cuentan con algunos valores:
+el usuario 1 es admin, hay 40 categorías y los autores se llaman
+'Autor <n>'.
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import insert, text
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from config import configurar_base_datos
+from models.base import db, es_postgres
+from models.model import (
+    Category, Book, User, Usuario, Genero, Autor, Libro, Edicion, Copia,
+    Prestamo, EstadoPrestamo, PrestamoEdicion, AutorLibro, LibroGenero
+)
+from services.inventario import refrescar_inventario
+
+LOTE = 10000
+CATEGORIAS = 40
+GENEROS = 30
+FRACCION_EN_CURSO = 0.03
+PALABRAS = (
+    'sombra viento mar noche ciudad jardin tiempo memoria fuego silencio rio '
+    'camino luz piedra invierno verano casa sueño guerra amor historia isla '
+    'montaña bosque cielo palabra espejo reino puerta viaje'
+).split()
+IDIOMAS = ('es', 'en', 'pt', 'fr')
+
+
+def crear_app(url, env=None):
+    app = Flask(__name__)
+    configurar_base_datos(app, {'DATABASE_URL': url, **(env or {})})
+    db.init_app(app)
+    return app
+
+
+class Escala:
+    """Volumen de cada tabla derivado del número de libros"""
+
+    def __init__(self, libros, prestamos=None, usuarios=None,
+                 ediciones_por_libro=1, copias_por_edicion=1):
+        self.libros = libros
+        self.prestamos = prestamos if prestamos is not None else libros * 3
+        self.usuarios = usuarios or max(100, libros // 10)
+        self.autores = max(100, libros // 10)
+        self.ediciones_por_libro = ediciones_por_libro
+        self.copias_por_edicion = copias_por_edicion
+
+    @property
+    def ediciones(self):
+        return self.libros * self.ediciones_por_libro
+
+    def a_dict(self):
+        return {
+            'libros': self.libros, 'prestamos': self.prestamos, 'usuarios': self.usuarios,
+            'autores': self.autores, 'ediciones': self.ediciones,
+            'copias': self.ediciones * self.copias_por_edicion
+        }
+
+
+def _titulo(rnd, i):
+    return f"{rnd.choice(PALABRAS).capitalize()} {rnd.choice(PALABRAS)} {i}"
+
+
+def _cargar(modelo, filas):
+    """Inserta un iterable de dicts por lotes (COPY en PostgreSQL)"""
+    tabla = getattr(modelo, '__table__', modelo)
+    lote = []
+    total = 0
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= LOTE:
+            total += _insertar_lote(tabla, lote)
+            lote = []
+    if lote:
+        total += _insertar_lote(tabla, lote)
+    return total
+
+
+def _insertar_lote(tabla, lote):
+    if not es_postgres():
+        db.session.execute(insert(tabla), lote)
+        return len(lote)
+
+    columnas = list(lote[0].keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for fila in lote:
+        writer.writerow([_csv(fila[c]) for c in columnas])
+    buffer.seek(0)
+
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f'COPY {tabla.name} ({", ".join(columnas)}) FROM STDIN WITH (FORMAT csv)', buffer
+        )
+    finally:
+        cursor.close()
+    return len(lote)
+
+
+def _csv(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def _vaciar_tablas():
+    for tabla in reversed(db.metadata.sorted_tables):
+        db.session.execute(tabla.delete())
+    db.session.commit()
+
+
+def _sincronizar_secuencias():
+    """Tras cargar ids explícitos, las secuencias deben continuar después del máximo"""
+    for tabla in db.metadata.sorted_tables:
+        pk = list(tabla.primary_key.columns)
+        if len(pk) != 1 or not pk[0].autoincrement or not isinstance(pk[0].type, db.Integer):
+            continue
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{tabla.name}', '{pk[0].name}'), "
+            f"(SELECT COALESCE(MAX({pk[0].name}), 1) FROM {tabla.name}))"
+        ).execution_options(no_parameters=True))
+
+
+def generar(escala, semilla=42, recrear=True, progreso=print):
+    """Llena ambos esquemas. Requiere un contexto de aplicación."""
+    hoy = date.today()
+    tiempos = {}
+
+    if recrear:
+        db.drop_all()
+        db.create_all()
+    else:
+        _vaciar_tablas()
+
+    def paso(nombre, modelo, filas):
+        inicio = time.perf_counter()
+        n = _cargar(modelo, filas)
+        db.session.commit()
+        tiempos[nombre] = round(time.perf_counter() - inicio, 2)
+        progreso(f'  {nombre}: {n} filas en {tiempos[nombre]}s')
+
+    # Catálogo
+    paso('categories', Category, (
+        {'id': i, 'name': f'Categoria {i}'} for i in range(1, CATEGORIAS + 1)
+    ))
+    paso('users', User, (
+        {'id': i, 'ci': str(i), 'password_hash': '-', 'role': 'admin' if i == 1 else 'user'}
+        for i in range(1, escala.usuarios + 1)
+    ))
+
+    # Circulación
+    paso('usuario', Usuario, (
+        {'id_usuario': i, 'nombre_usuario': f'Nombre{i}', 'apellido_usuario': f'Apellido{i}',
+         'ci': str(i), 'telefono': '0', 'domicilio': '-'}
+        for i in range(1, escala.usuarios + 1)
+    ))
+    paso('genero', Genero, (
+        {'id_genero': i, 'nombre_genero': f'Genero {i}', 'cantidad_libros': 0}
+        for i in range(1, GENEROS + 1)
+    ))
+    paso('autor', Autor, (
+        {'id_autor': i, 'nombre_autor': f'Autor {i}', 'nacionalidad': '-',
+         'libros_publicados': 0, 'fecha_nacimiento': date(1950, 1, 1)}
+        for i in range(1, escala.autores + 1)
+    ))
+
+    titulos = random.Random(semilla)
+    paso('libro', Libro, (
+        {'id_libro': i, 'titulo_libro': _titulo(titulos, i), 'idioma': IDIOMAS[i % len(IDIOMAS)],
+         'numero_paginas': 100 + i % 400, 'sinopsis': '-'}
+        for i in range(1, escala.libros + 1)
+    ))
+    # Mismos títulos y autores en el catálogo, vinculados por id_libro
+    titulos = random.Random(semilla)
+    paso('books', Book, (
+        {'id': i, 'title': _titulo(titulos, i), 'author': f'Autor {i % escala.autores + 1}',
+         'description': '-', 'category_id': i % CATEGORIAS + 1, 'id_libro': i}
+        for i in range(1, escala.libros + 1)
+    ))
+    paso('autor_libro', AutorLibro, (
+        {'id_libro': i, 'id_autor': i % escala.autores + 1} for i in range(1, escala.libros + 1)
+    ))
+    paso('libro_genero', LibroGenero, (
+        {'id_libro': i, 'id_genero': g}
+        for i in range(1, escala.libros + 1)
+        for g in sorted({i % GENEROS + 1, (i * 7) % GENEROS + 1})
+    ))
+    paso('edicion', Edicion, (
+        {'id_edicion': e, 'isbn': f'978{e:010d}', 'año_publicacion': 1950 + e % 75,
+         'id_libro': (e - 1) // escala.ediciones_por_libro + 1}
+        for e in range(1, escala.ediciones + 1)
+    ))
+    paso('copia', Copia, (
+        {'id_copia': (e - 1) * escala.copias_por_edicion + c, 'copias_disponibles': 3,
+         'id_edicion': e}
+        for e in range(1, escala.ediciones + 1)
+        for c in range(1, escala.copias_por_edicion + 1)
+    ))
+
+    # Préstamos: la misma semilla genera las tres tablas de forma consistente
+    def prestamos():
+        r = random.Random(semilla + 1)
+        for i in range(1, escala.prestamos + 1):
+            inicio = hoy - timedelta(days=r.randint(0, 1500))
+            en_curso = r.random() < FRACCION_EN_CURSO
+            yield i, inicio, en_curso, r.randint(1, escala.usuarios), r.randint(1, escala.ediciones)
+
+    paso('prestamo', Prestamo.__table__, (
+        {'id_prestamo': i, 'fecha_prestamo': inicio,
+         'fecha_devolucion': inicio + timedelta(days=14), 'precio_alquiler': '10',
+         'id_usuario': usuario, 'estado_actual': 'En_curso' if en_curso else 'Devuelto'}
+        for i, inicio, en_curso, usuario, _ in prestamos()
+    ))
+    paso('prestamo_edicion', PrestamoEdicion, (
+        {'id_prestamo_edicion': i, 'id_prestamo': i, 'id_edicion': edicion}
+        for i, _, _, _, edicion in prestamos()
+    ))
+    paso('estado_prestamo', EstadoPrestamo.__table__, (
+        {'id_prestamo': i, 'estado': estado}
+        for i, _, en_curso, _, _ in prestamos()
+        for estado in (('En_curso',) if en_curso else ('En_curso', 'Devuelto'))
+    ))
+
+    if es_postgres():
+        _sincronizar_secuencias()
+    db.session.commit()
+
+    # Resumen de inventario (lo leen los reportes) y estadísticas del planificador
+    refrescar_inventario()
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera datos sintéticos de biblioteca')
+    parser.add_argument('--url')
+    parser.add_argument('--libros', type=int, default=10000)
+    parser.add_argument('--prestamos', type=int)
+    parser.add_argument('--usuarios', type=int)
+    parser.add_argument('--ediciones-por-libro', type=int, default=1)
+    parser.add_argument('--copias-por-edicion', type=int, default=1)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--conservar-esquema', action='store_true')
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'biblioteca.db')}"
+    escala = Escala(args.libros, args.prestamos, args.usuarios,
+                    args.ediciones_por_libro, args.copias_por_edicion)
+    print(f'Generando en {url}: {escala.a_dict()}')
+
+    inicio = time.perf_counter()
+    with crear_app(url).app_context():
+        generar(escala, args.semilla, recrear=not args.conservar_esquema)
+    print(f'Listo en {time.perf_counter() - inicio:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+# benchmarks/endpoints.py
+"""
+Benchmarks de escenarios: cada endpoint a través del cliente de pruebas de
+Flask, contra una base poblada por benchmarks.datos_sinteticos.
+
+Uso:
+    python -m benchmarks.endpoints --libros 100000 --iteraciones 20
+    python -m benchmarks.endpoints --url postgresql://... --sin-generar \
+        --baseline benchmarks/resultados/base.json --fallar-si-regresion
+
+Por escenario se reportan la latencia p50/p95, las consultas SQL por
+petición y el pico de memoria Python de una petición (tracemalloc, medido
+en una ejecución aparte para no distorsionar la latencia). Las respuestas
+en streaming se consumen completas dentro de la medición.
+
+Los resultados se guardan en JSON (por defecto en benchmarks/resultados/)
+junto con la escala, el motor y el commit. Con --baseline se comparan con
+una corrida anterior: una regresión es un p95 mayor que el de la base más
+la tolerancia, o más consultas por petición.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import event
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.datos_sinteticos import Escala, generar
+from benchmarks.pool_concurrencia import percentil
+
+USUARIO_HISTORIAL = 17
+
+# (nombre, ruta); todas las peticiones se hacen como el admin (usuario 1)
+ESCENARIOS = [
+    ('home', '/'),
+    ('home_filtrado', '/?author=Autor+7'),
+    ('pagina_libros', '/libros'),
+    ('masinfo', '/masinfo'),
+    ('api_libros_pagina', '/api/libros?limit=50'),
+    ('api_libros_categoria', '/api/libros?categoria_id=7&limit=50'),
+    ('api_libros_autor', '/api/libros?autor=Autor+7&limit=50'),
+    ('api_libros_ndjson', '/api/libros?format=ndjson'),
+    ('api_libros_busqueda', '/api/libros/search?q=sombra+viento'),
+    ('api_libro_detalle', '/api/libros/{libro_medio}'),
+    ('api_libros_opciones', '/api/libros/opciones'),
+    ('reporte_inventario', '/api/reportes/inventario'),
+    ('reporte_prestamos_activos', '/api/reportes/prestamos-activos'),
+    ('reporte_historial_usuario', f'/api/reportes/historial-usuario/{USUARIO_HISTORIAL}'),
+    ('reporte_top_usuarios', '/api/reportes/top-usuarios'),
+    ('descarga_inventario_csv', '/api/reports/download/inventory'),
+    ('descarga_activos_csv', '/api/reports/download/active_loans'),
+    ('descarga_historial_csv', f'/api/reports/download/user_loans?user_id={USUARIO_HISTORIAL}'),
+    ('descarga_top_csv', '/api/reports/download/top_users'),
+]
+
+
+class ContadorConsultas:
+    def __init__(self, engine):
+        self.total = 0
+        event.listen(engine, 'before_cursor_execute', self._contar)
+
+    def _contar(self, *args):
+        self.total += 1
+
+
+def cliente_admin(app):
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['_user_id'] = '1'
+        sesion['_fresh'] = True
+        sesion['role'] = 'admin'
+    return cliente
+
+
+def peticion(cliente, ruta):
+    respuesta = cliente.get(ruta)
+    cuerpo = respuesta.get_data()  # consume también las respuestas en streaming
+    respuesta.close()
+    return respuesta.status_code, len(cuerpo)
+
+
+def medir(cliente, contador, ruta, iteraciones):
+    estado, tamano = peticion(cliente, ruta)  # calentamiento (cachés, planes)
+
+    latencias, consultas = [], []
+    for _ in range(iteraciones):
+        antes = contador.total
+        inicio = time.perf_counter()
+        estado, tamano = peticion(cliente, ruta)
+        latencias.append(time.perf_counter() - inicio)
+        consultas.append(contador.total - antes)
+
+    tracemalloc.start()
+    peticion(cliente, ruta)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'estado': estado,
+        'bytes': tamano,
+        'p50_ms': round(percentil(latencias, 0.5) * 1000, 2),
+        'p95_ms': round(percentil(latencias, 0.95) * 1000, 2),
+        'max_ms': round(max(latencias) * 1000, 2),
+        'consultas': round(sum(consultas) / len(consultas), 1),
+        'pico_memoria_kb': round(pico / 1024, 1),
+    }
+
+
+def commit_actual():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(resultados, base, tolerancia):
+    """Imprime la comparación con la base y devuelve los escenarios con regresión"""
+    regresiones = []
+    print(f"\n{'escenario':<28} {'p95 base':>9} {'p95':>9} {'delta':>8} "
+          f"{'consultas':>12}")
+    for nombre, actual in resultados.items():
+        anterior = base.get(nombre)
+        if not anterior:
+            continue
+        delta = (actual['p95_ms'] - anterior['p95_ms']) / anterior['p95_ms'] if anterior['p95_ms'] else 0
+        regresion = delta > tolerancia or actual['consultas'] > anterior['consultas']
+        if regresion:
+            regresiones.append(nombre)
+        print(f"{nombre:<28} {anterior['p95_ms']:>9.1f} {actual['p95_ms']:>9.1f} "
+              f"{delta * 100:>+7.0f}% {anterior['consultas']:>5} -> {actual['consultas']:<5}"
+              + ('  REGRESIÓN' if regresion else ''))
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de endpoints con datos sintéticos')
+    parser.add_argument('--url')
+    parser.add_argument('--libros', type=int, default=10000)
+    parser.add_argument('--prestamos', type=int)
+    parser.add_argument('--sin-generar', action='store_true',
+                        help='Usa los datos ya cargados en --url')
+    parser.add_argument('--iteraciones', type=int, default=20)
+    parser.add_argument('--escenarios', help='Lista separada por comas (por defecto todos)')
+    parser.add_argument('--salida', help='Archivo JSON de resultados')
+    parser.add_argument('--baseline', help='JSON de una corrida anterior para comparar')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    parser.add_argument('--fallar-si-regresion', action='store_true')
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}"
+    # app.py lee la configuración del entorno al importarse
+    os.environ['DATABASE_URL'] = url
+    from app import app
+    from models.base import db
+
+    escala = Escala(args.libros, args.prestamos)
+    with app.app_context():
+        if not args.sin_generar:
+            print(f'Generando datos: {escala.a_dict()}')
+            generar(escala)
+        contador = ContadorConsultas(db.engine)
+        dialecto = db.engine.dialect.name
+
+    elegidos = set(args.escenarios.split(',')) if args.escenarios else None
+    cliente = cliente_admin(app)
+    resultados = {}
+
+    print(f"\n{'escenario':<28} {'estado':>6} {'p50_ms':>8} {'p95_ms':>8} "
+          f"{'consultas':>9} {'pico_kb':>9} {'bytes':>10}")
+    for nombre, ruta in ESCENARIOS:
+        if elegidos and nombre not in elegidos:
+            continue
+        ruta = ruta.format(libro_medio=max(1, escala.libros // 2))
+        r = medir(cliente, contador, ruta, args.iteraciones)
+        resultados[nombre] = {'ruta': ruta, **r}
+        print(f"{nombre:<28} {r['estado']:>6} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['consultas']:>9} {r['pico_memoria_kb']:>9.0f} {r['bytes']:>10}")
+
+    salida = args.salida or os.path.join(
+        ROOT, 'benchmarks', 'resultados', f"{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(salida), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump({
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit_actual(),
+            'motor': dialecto,
+            'escala': escala.a_dict(),
+            'iteraciones': args.iteraciones,
+            'resultados': resultados,
+        }, f, indent=2, ensure_ascii=False)
+    print(f'\nResultados en {salida}')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            base = json.load(f)
+        if base.get('escala') != escala.a_dict() or base.get('motor') != dialecto:
+            print('Aviso: la base se midió con otra escala o motor')
+        regresiones = comparar(resultados, base['resultados'], args.tolerancia)
+        if regresiones and args.fallar_si_regresion:
+            print(f"Regresiones: {', '.join(regresiones)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/exportacion_csv.py
+"""
+Compara el pico de memoria (RSS) de la exportación CSV antigua
+(.all() + lista + StringIO + getvalue) contra la exportación en streaming
+(yield_per + generar_csv).
+
+Uso:
+    python -m benchmarks.exportacion_csv --filas 1000000
+
+Cada modo corre en un subproceso propio para que su pico de RSS no se
+contamine con el del otro. Los datos viven en un SQLite temporal.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+HEADERS = ["ID Préstamo", "Libro", "Fecha Préstamo", "Fecha Devolución", "Estado"]
+CONSULTA = text(
+    "SELECT id_prestamo, titulo_libro, fecha_prestamo, fecha_devolucion, estado "
+    "FROM reporte ORDER BY id_prestamo"
+)
+
+
+def preparar_datos(ruta, filas):
+    engine = create_engine(f'sqlite:///{ruta}')
+    inicio = date(2020, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE reporte (id_prestamo INTEGER PRIMARY KEY, titulo_libro TEXT, "
+            "fecha_prestamo DATE, fecha_devolucion DATE, estado TEXT)"
+        ))
+        lote = []
+        for i in range(1, filas + 1):
+            lote.append({
+                'id': i,
+                'titulo': f'Libro de prueba número {i}',
+                'fp': inicio + timedelta(days=i % 1500),
+                'fd': inicio + timedelta(days=i % 1500 + 14),
+                'estado': ('Devuelto', 'Pendiente', 'En_curso')[i % 3],
+            })
+            if len(lote) == 50000:
+                conn.execute(text("INSERT INTO reporte VALUES (:id, :titulo, :fp, :fd, :estado)"), lote)
+                lote = []
+        if lote:
+            conn.execute(text("INSERT INTO reporte VALUES (:id, :titulo, :fp, :fd, :estado)"), lote)
+    engine.dispose()
+
+
+def modo_antiguo(ruta):
+    """Reproduce el download_report() original"""
+    engine = create_engine(f'sqlite:///{ruta}')
+    inicio = time.perf_counter()
+    with engine.connect() as conn:
+        data = conn.execute(CONSULTA).all()
+        rows = [[p.id_prestamo, p.titulo_libro, p.fecha_prestamo,
+                 p.fecha_devolucion, p.estado] for p in data]
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['Reporte'])
+        writer.writerow([])
+        writer.writerow(HEADERS)
+        writer.writerows(rows)
+        cuerpo = output.getvalue().encode('utf-8')
+    primer_byte = time.perf_counter() - inicio
+    return len(cuerpo), primer_byte, time.perf_counter() - inicio
+
+
+def modo_stream(ruta):
+    """Camino nuevo: cursor por lotes + generar_csv, consumido bloque a bloque"""
+    from services.reportes import generar_csv, TAMANO_LOTE
+
+    engine = create_engine(f'sqlite:///{ruta}')
+    inicio = time.perf_counter()
+    primer_byte = None
+    total = 0
+    with engine.connect() as conn:
+        data = conn.execute(CONSULTA.execution_options(yield_per=TAMANO_LOTE))
+        rows = ([p.id_prestamo, p.titulo_libro, p.fecha_prestamo,
+                 p.fecha_devolucion, p.estado] for p in data)
+        for bloque in generar_csv('Reporte', HEADERS, rows):
+            if primer_byte is None:
+                primer_byte = time.perf_counter() - inicio
+            total += len(bloque.encode('utf-8'))
+    return total, primer_byte, time.perf_counter() - inicio
+
+
+def ejecutar_modo(modo, ruta):
+    funcion = {'antiguo': modo_antiguo, 'stream': modo_stream}[modo]
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tamano, primer_byte, total = funcion(ruta)
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        'modo': modo,
+        'bytes': tamano,
+        'primer_byte_s': round(primer_byte, 4),
+        'total_s': round(total, 4),
+        'pico_rss_mb': round(pico / 1024, 1),
+        'incremento_rss_mb': round((pico - base) / 1024, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--filas', type=int, default=1_000_000)
+    parser.add_argument('--modo', choices=['antiguo', 'stream'])
+    parser.add_argument('--db')
+    args = parser.parse_args()
+
+    if args.modo:
+        ejecutar_modo(args.modo, args.db)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, 'reporte.db')
+        print(f'Generando {args.filas} filas...')
+        preparar_datos(ruta, args.filas)
+        for modo in ('antiguo', 'stream'):
+            salida = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.exportacion_csv',
+                 '--modo', modo, '--db', ruta],
+                cwd=ROOT, capture_output=True, text=True, check=True
+            )
+            print(salida.stdout.strip())
+
+
+if __name__ == '__main__':
+    main()
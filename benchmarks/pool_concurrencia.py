@@ -0,0 +1,94 @@
+# benchmarks/pool_concurrencia.py
+"""
+Prueba de carga del pool de conexiones: latencia a medida que la
+concurrencia supera el tamaño del pool.
+
+Uso:
+    python -m benchmarks.pool_concurrencia --url sqlite:////tmp/pool.db \
+        --pool-size 4 --max-overflow 2 --retencion-ms 20
+
+Cada hilo toma una conexión, ejecuta SELECT 1 y la retiene `retencion-ms`
+(simula el tiempo de una consulta real). Con concurrencia <= pool_size +
+max_overflow la espera es ~0; por encima, las peticiones hacen cola y la
+latencia crece en escalones de `retencion-ms`.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from config import opciones_motor
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def ejecutar_nivel(engine, concurrencia, operaciones, retencion):
+    latencias = []
+    lock = threading.Lock()
+    barrera = threading.Barrier(concurrencia)
+
+    def trabajador():
+        barrera.wait()
+        for _ in range(operaciones):
+            inicio = time.perf_counter()
+            with engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+                time.sleep(retencion)
+            with lock:
+                latencias.append(time.perf_counter() - inicio)
+
+    hilos = [threading.Thread(target=trabajador) for _ in range(concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latencia del pool según concurrencia')
+    parser.add_argument('--url')
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--max-overflow', type=int, default=2)
+    parser.add_argument('--retencion-ms', type=float, default=20)
+    parser.add_argument('--operaciones', type=int, default=20)
+    parser.add_argument('--niveles', default='1,2,4,6,8,12,16,32')
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'pool.db')}"
+    opciones = opciones_motor(url, {
+        'DB_POOL_SIZE': args.pool_size,
+        'DB_MAX_OVERFLOW': args.max_overflow,
+        'DB_POOL_TIMEOUT': 60,
+    })
+    engine = create_engine(url, **opciones)
+    retencion = args.retencion_ms / 1000
+
+    print(f"pool_size={args.pool_size} max_overflow={args.max_overflow} "
+          f"retencion={args.retencion_ms}ms")
+    print(f"{'concurrencia':>12} {'p50_ms':>8} {'p95_ms':>8} {'max_ms':>8} "
+          f"{'espera_media_ms':>16} {'espera_max_ms':>14}")
+
+    for nivel in (int(n) for n in args.niveles.split(',')):
+        engine.dispose()
+        latencias = ejecutar_nivel(engine, nivel, args.operaciones, retencion)
+        stats = engine.pool.estadisticas()
+        print(f"{nivel:>12} {statistics.median(latencias) * 1000:>8.1f} "
+              f"{percentil(latencias, 0.95) * 1000:>8.1f} {max(latencias) * 1000:>8.1f} "
+              f"{stats['espera_media_ms']:>16.1f} {stats['espera_maxima_ms']:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/serializacion.py
+"""
+Tiempo de serialización y tamaño de la respuesta para listados grandes.
+
+Uso:
+    python -m benchmarks.serializacion --filas 100000 --repeticiones 5
+
+Compara, sobre listados sintéticos con la forma de /api/libros y de
+/api/reportes/inventario:
+- mapeo fila -> dict: comprensión escrita a mano contra Mapeador;
+- codificación JSON: proveedor estándar de Flask contra ProveedorJSON
+  (orjson, si está instalado);
+- tamaño y tiempo de compresión con gzip (niveles 1 y 6) y brotli (si
+  está instalado).
+
+No usa base de datos: las filas son namedtuple con las mismas columnas que
+devuelven las consultas.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from services import serializacion
+from services.catalogo import libro_a_dict
+from services.serializacion import Mapeador, ProveedorJSON, comprimir
+
+FilaLibro = namedtuple('FilaLibro', 'id title author description category_id category_name')
+FilaInventario = namedtuple('FilaInventario', 'id_libro titulo_libro idioma generos copias_disponibles')
+
+
+def filas_libros(n):
+    return [
+        FilaLibro(i, f'Sombra del viento {i}', f'Autor {i % 1000}',
+                  'Descripción de prueba con acentos: núcleo, pingüino, año.',
+                  i % 40 + 1, f'Categoria {i % 40 + 1}' if i % 50 else None)
+        for i in range(1, n + 1)
+    ]
+
+
+def filas_inventario(n):
+    return [
+        FilaInventario(i, f'Libro {i}', ('es', 'en', 'pt')[i % 3],
+                       'Genero 3, Genero 7', i % 5)
+        for i in range(1, n + 1)
+    ]
+
+
+def libros_a_mano(filas):
+    return [{
+        "id": f.id,
+        "title": f.title,
+        "author": f.author,
+        "description": f.description,
+        "category": f.category_name or "Sin categoría",
+        "category_id": f.category_id
+    } for f in filas]
+
+
+_inventario = Mapeador(
+    id='id_libro', titulo='titulo_libro', idioma='idioma',
+    generos='generos', copias_disponibles='copias_disponibles'
+)
+
+
+def inventario_a_mano(filas):
+    return [{
+        'id': f.id_libro,
+        'titulo': f.titulo_libro,
+        'idioma': f.idioma,
+        'generos': f.generos,
+        'copias_disponibles': f.copias_disponibles
+    } for f in filas]
+
+
+def cronometrar(funcion, repeticiones):
+    """Mejor tiempo (ms) de `repeticiones` ejecuciones y el último resultado"""
+    mejor, resultado = None, None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return round(mejor * 1000, 2), resultado
+
+
+def medir_listado(nombre, filas, a_mano, mapeador, app, repeticiones):
+    estandar = DefaultJSONProvider(app)
+    rapido = ProveedorJSON(app)
+
+    t_mano, _ = cronometrar(lambda: a_mano(filas), repeticiones)
+    t_mapeador, datos = cronometrar(lambda: mapeador.lista(filas), repeticiones)
+
+    with app.app_context():
+        t_estandar, r_estandar = cronometrar(lambda: estandar.response(datos).get_data(), repeticiones)
+        t_rapido, cuerpo = cronometrar(lambda: rapido.response(datos).get_data(), repeticiones)
+
+    print(f'\n{nombre}: {len(filas)} filas')
+    print(f"  {'mapeo a mano':<28} {t_mano:>9.1f} ms")
+    print(f"  {'mapeo con Mapeador':<28} {t_mapeador:>9.1f} ms")
+    print(f"  {'JSON estándar (Flask)':<28} {t_estandar:>9.1f} ms  {len(r_estandar):>11} bytes")
+    motor = 'orjson' if serializacion.orjson else 'sin orjson: estándar'
+    print(f"  {'ProveedorJSON (' + motor + ')':<28} {t_rapido:>9.1f} ms  {len(cuerpo):>11} bytes")
+
+    variantes = [('gzip nivel 1', 'gzip', 1), ('gzip nivel 6', 'gzip', 6)]
+    if serializacion.brotli:
+        variantes.append(('brotli calidad 4', 'br', None))
+    for etiqueta, codificacion, nivel in variantes:
+        t, comprimido = cronometrar(
+            lambda: comprimir(cuerpo, codificacion, nivel_gzip=nivel), repeticiones
+        )
+        print(f"  {etiqueta:<28} {t:>9.1f} ms  {len(comprimido):>11} bytes "
+              f"({len(comprimido) / len(cuerpo):.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serialización y compresión de listados')
+    parser.add_argument('--filas', type=int, default=100000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    print(f"orjson: {'sí' if serializacion.orjson else 'no'}  "
+          f"brotli: {'sí' if serializacion.brotli else 'no'}")
+
+    medir_listado('libros', filas_libros(args.filas), libros_a_mano, libro_a_dict,
+                  app, args.repeticiones)
+    medir_listado('inventario', filas_inventario(args.filas), inventario_a_mano, _inventario,
+                  app, args.repeticiones)
+
+
+if __name__ == '__main__':
+    main()
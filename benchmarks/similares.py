@@ -0,0 +1,158 @@
+# benchmarks/similares.py
+"""
+Tiempo y memoria de la reconstrucción de libro_similar.
+
+Uso:
+    python -m benchmarks.similares --libros 20000 --prestamos 1000000
+    python -m benchmarks.similares --url postgresql://... --conservar-datos
+
+Genera datos sintéticos (benchmarks.datos_sinteticos) salvo con
+--conservar-datos, y mide:
+- la reconstrucción completa por SQL (INSERT ... SELECT) y, si NumPy y
+  SciPy están instalados, por multiplicación de matrices dispersas; ambas
+  deben producir las mismas filas;
+- la actualización incremental después de --nuevos préstamos: las listas
+  de los libros de esos préstamos deben coincidir con las de una
+  reconstrucción completa; se informa cuántas listas combinadas del resto
+  difieren (ver services/similares.py).
+
+Con --memoria se informa además el pico de memoria de Python
+(tracemalloc, que hace más lentas las mediciones); la de la ruta SQL la
+usa la base, no el proceso.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.datos_sinteticos import Escala, crear_app, generar
+from models.base import db
+from models.model import (
+    Edicion, LibroSimilar, Prestamo, PrestamoEdicion, SimilarPendiente, Usuario
+)
+from services import similares
+
+
+def medir(funcion, memoria=False):
+    """(resultado, segundos, texto con el pico de memoria o '')"""
+    if memoria:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcion()
+    segundos = time.perf_counter() - inicio
+    if not memoria:
+        return resultado, segundos, ''
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return resultado, segundos, f'{pico / 2**20:>7.1f} MiB'
+
+
+def filas_similares(ids=None):
+    stmt = select(
+        LibroSimilar.id_libro, LibroSimilar.posicion, LibroSimilar.id_similar,
+        LibroSimilar.coprestamos, func.round(LibroSimilar.puntaje, 9)
+    )
+    if ids is not None:
+        stmt = stmt.where(LibroSimilar.id_libro.in_(ids))
+    return set(db.session.execute(stmt).all())
+
+
+def agregar_prestamos(n, semilla=7):
+    """Préstamos nuevos (de hoy) de usuarios y ediciones existentes"""
+    r = random.Random(semilla)
+    usuarios = db.session.execute(select(func.max(Usuario.id_usuario))).scalar()
+    ediciones = db.session.execute(select(func.max(Edicion.id_edicion))).scalar()
+    siguiente = (db.session.execute(select(func.max(Prestamo.id_prestamo))).scalar() or 0) + 1
+    hoy = date.today()
+    prestamos, detalle = [], []
+    for i in range(siguiente, siguiente + n):
+        prestamos.append({
+            'id_prestamo': i, 'fecha_prestamo': hoy, 'fecha_devolucion': hoy + timedelta(days=14),
+            'precio_alquiler': '10', 'id_usuario': r.randint(1, usuarios), 'estado_actual': 'En_curso'
+        })
+        detalle.append({'id_prestamo': i, 'id_edicion': r.randint(1, ediciones)})
+    db.session.execute(insert(Prestamo.__table__), prestamos)
+    db.session.execute(insert(PrestamoEdicion), detalle)
+    # Como prestar() (o el trigger, si la base tiene las migraciones)
+    db.session.execute(insert(SimilarPendiente).from_select(
+        ['id_prestamo'],
+        select(Prestamo.id_prestamo).where(
+            Prestamo.id_prestamo >= siguiente,
+            Prestamo.id_prestamo.not_in(select(SimilarPendiente.id_prestamo))
+        )
+    ))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconstrucción de recomendaciones por coocurrencia')
+    parser.add_argument('--url')
+    parser.add_argument('--libros', type=int, default=20000)
+    parser.add_argument('--prestamos', type=int, default=200000)
+    parser.add_argument('--usuarios', type=int)
+    parser.add_argument('--nuevos', type=int, default=100)
+    parser.add_argument('--conservar-datos', action='store_true')
+    parser.add_argument('--memoria', action='store_true')
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'similares.db')}"
+    with crear_app(url).app_context():
+        if not args.conservar_datos:
+            escala = Escala(args.libros, args.prestamos, args.usuarios)
+            print(f'Generando datos: {escala.a_dict()}')
+            generar(escala, progreso=lambda *_: None)
+        else:
+            db.create_all()
+
+        print(f"numpy/scipy: {'sí' if similares.sparse is not None else 'no'}")
+        resultado, segundos, pico = medir(
+            lambda: similares.recalcular_similares(usar_matriz=False), args.memoria
+        )
+        print(f"  {'reconstrucción SQL':<28} {segundos:>8.2f} s  {pico}  {resultado['filas']} filas")
+        por_sql = filas_similares()
+
+        if similares.sparse is not None:
+            resultado, segundos, pico = medir(
+                lambda: similares.recalcular_similares(usar_matriz=True), args.memoria
+            )
+            print(f"  {'reconstrucción con matrices':<28} {segundos:>8.2f} s  {pico}  "
+                  f"{resultado['filas']} filas")
+            print(f"  {'mismas filas que SQL':<28} {'sí' if filas_similares() == por_sql else 'NO'}")
+
+        marca = db.session.execute(select(func.max(Prestamo.id_prestamo))).scalar()
+        agregar_prestamos(args.nuevos)
+        antes = filas_similares()
+        resultado, segundos, pico = medir(similares.actualizar_similares, args.memoria)
+        print(f"  {'incremental (' + str(args.nuevos) + ' préstamos)':<28} {segundos:>8.2f} s  "
+              f"{pico}  {resultado['libros']} libros nuevos, {resultado['listas']} listas reescritas")
+
+        # Las listas de los libros prestados deben quedar igual que en una reconstrucción completa
+        nuevos = set(db.session.execute(
+            select(Edicion.id_libro).join(
+                PrestamoEdicion, PrestamoEdicion.id_edicion == Edicion.id_edicion
+            ).where(PrestamoEdicion.id_prestamo > marca)
+        ).scalars())
+        incremental = filas_similares()
+        similares.recalcular_similares(usar_matriz=False)
+        completa = filas_similares()
+
+        iguales = {f for f in incremental if f[0] in nuevos} == {f for f in completa if f[0] in nuevos}
+        cambiaron = {f[0] for f in antes ^ completa} - nuevos
+        combinadas = {f[0] for f in antes ^ incremental} - nuevos
+        distintas = {f[0] for f in incremental ^ completa} - nuevos
+        print(f"  {'libros nuevos = completa':<28} {'sí' if iguales else 'NO'}")
+        print(f"  {'otras listas':<28} {len(cambiaron)} cambian en la reconstrucción, "
+              f"{len(combinadas)} combinadas, {len(distintas)} distintas a la reconstrucción")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/sugerencias.py
+"""
+Construcción, memoria y latencia del índice de autocompletado.
+
+Uso:
+    python -m benchmarks.sugerencias --titulos 100000 --consultas 2000
+
+Sobre títulos sintéticos (palabras con acentos, 3 a 7 por título) mide:
+- tiempo de construcción de IndicePrefijos y memoria asignada
+  (tracemalloc, en una segunda construcción; incluye los textos
+  normalizados y visibles);
+- latencia p50/p95/máx de buscar() para prefijos de 1 a 5 letras,
+  contra un recorrido lineal de los textos normalizados;
+- costo de una actualización incremental (poner + quitar).
+
+No usa base de datos.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from services.sugerencias import IndicePrefijos, normalizar
+
+PALABRAS = (
+    'sombra viento cien años soledad otoño patriarca amor tiempos cólera '
+    'crónica muerte anunciada ciudad perros casa espíritus rayuela ficciones '
+    'aleph pedro páramo laberinto túnel región transparente muerte artemio '
+    'cruz noticia secuestro memoria putas tristes niño pijama rayas príncipe '
+    'isla tesoro viaje centro tierra vuelta mundo ochenta días mar hombre '
+    'viejo guerra paz crimen castigo orgullo prejuicio señor anillos nombre '
+    'rosa pingüino núcleo jardín senderos bifurcan historia universal infamia'
+).split()
+
+
+def titulos_sinteticos(n, semilla=1):
+    azar = random.Random(semilla)
+    return [
+        (i, ' '.join(azar.choice(PALABRAS) for _ in range(azar.randint(3, 7))).capitalize() + f' {i}')
+        for i in range(1, n + 1)
+    ]
+
+
+def percentiles(tiempos):
+    tiempos = sorted(tiempos)
+    p95 = tiempos[int(len(tiempos) * 0.95) - 1]
+    return statistics.median(tiempos) * 1000, p95 * 1000, tiempos[-1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Índice de prefijos para autocompletado')
+    parser.add_argument('--titulos', type=int, default=100000)
+    parser.add_argument('--consultas', type=int, default=2000)
+    parser.add_argument('--limite', type=int, default=10)
+    args = parser.parse_args()
+
+    documentos = titulos_sinteticos(args.titulos)
+
+    inicio = time.perf_counter()
+    IndicePrefijos().cargar(documentos)
+    construccion = time.perf_counter() - inicio
+
+    # Segunda construcción para medir memoria: tracemalloc distorsiona los tiempos
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    indice = IndicePrefijos()
+    indice.cargar(documentos)
+    memoria = tracemalloc.get_traced_memory()[0] - antes
+    tracemalloc.stop()
+
+    print(f"{args.titulos} títulos, {indice.memoria()['entradas']} entradas")
+    print(f"  {'construcción':<24} {construccion * 1000:>10.1f} ms")
+    print(f"  {'memoria (tracemalloc)':<24} {memoria / 2**20:>10.1f} MiB  "
+          f"({memoria / 2**20 * 100000 / args.titulos:.1f} MiB por 100k títulos)")
+    print(f"  {'memoria (estimada)':<24} {indice.memoria()['bytes'] / 2**20:>10.1f} MiB  "
+          f"(sin textos visibles)")
+
+    azar = random.Random(2)
+    textos = [normalizar(t) for _, t in documentos]
+    print(f"\n  {'prefijo':<8} {'índice p50':>11} {'p95':>9} {'máx':>9}   {'lineal p50':>11}")
+    for largo in range(1, 6):
+        prefijos = [normalizar(azar.choice(PALABRAS))[:largo] for _ in range(args.consultas)]
+
+        tiempos = []
+        for prefijo in prefijos:
+            inicio = time.perf_counter()
+            indice.buscar(prefijo, args.limite)
+            tiempos.append(time.perf_counter() - inicio)
+        p50, p95, maximo = percentiles(tiempos)
+
+        lineal = []
+        for prefijo in prefijos[:20]:
+            buscado = ' ' + prefijo
+            inicio = time.perf_counter()
+            [t for t in textos if t.startswith(prefijo) or buscado in t][:args.limite]
+            lineal.append(time.perf_counter() - inicio)
+
+        print(f'  {largo:<8} {p50:>8.3f} ms {p95:>6.3f} ms {maximo:>6.3f} ms   '
+              f'{statistics.median(lineal) * 1000:>8.1f} ms')
+
+    tiempos = []
+    for i in range(200):
+        clave = args.titulos + 1 + i
+        inicio = time.perf_counter()
+        indice.poner(clave, f'Nuevo título número {i} del año')
+        indice.quitar(clave)
+        tiempos.append(time.perf_counter() - inicio)
+    p50, p95, _ = percentiles(tiempos)
+    print(f"\n  {'poner + quitar':<24} {p50:>8.3f} ms p50  {p95:.3f} ms p95")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Índice de búsqueda de texto completo para books
+
+Revision ID: 3f9a1c2d7e41
+Revises: afc76d75f768
+Create Date: 2026-10-18 10:12:40.118204
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c2d7e41'
+down_revision = 'afc76d75f768'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Solo PostgreSQL tiene tsvector/GIN; en otros motores se usa el fallback con ilike
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column('books', sa.Column('search_vector', postgresql.TSVECTOR()))
+
+    # Función que construye el vector con pesos: título > autor > categoría > descripción
+    op.execute("""
+        CREATE OR REPLACE FUNCTION books_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('spanish', coalesce(NEW.title, '')), 'A') ||
+                setweight(to_tsvector('spanish', coalesce(NEW.author, '')), 'B') ||
+                setweight(to_tsvector('spanish', coalesce(
+                    (SELECT name FROM categories WHERE id = NEW.category_id), '')), 'C') ||
+                setweight(to_tsvector('spanish', coalesce(NEW.description, '')), 'D');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER books_search_vector_trg
+        BEFORE INSERT OR UPDATE OF title, author, description, category_id ON books
+        FOR EACH ROW EXECUTE FUNCTION books_search_vector_update()
+    """)
+
+    # Si cambia el nombre de una categoría se recalculan los libros que la usan
+    op.execute("""
+        CREATE OR REPLACE FUNCTION categories_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            UPDATE books SET category_id = category_id WHERE category_id = NEW.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER categories_search_vector_trg
+        AFTER UPDATE OF name ON categories
+        FOR EACH ROW EXECUTE FUNCTION categories_search_vector_update()
+    """)
+
+    # Rellenar los libros existentes (dispara el trigger)
+    op.execute("UPDATE books SET title = title")
+
+    op.create_index(
+        'ix_books_search_vector', 'books', ['search_vector'],
+        postgresql_using='gin'
+    )
+    # Índices trigram para que los filtros ilike '%...%' de home() y /api/libros no recorran la tabla
+    op.create_index(
+        'ix_books_title_trgm', 'books', ['title'],
+        postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_books_author_trgm', 'books', ['author'],
+        postgresql_using='gin', postgresql_ops={'author': 'gin_trgm_ops'}
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_books_author_trgm', table_name='books')
+    op.drop_index('ix_books_title_trgm', table_name='books')
+    op.drop_index('ix_books_search_vector', table_name='books')
+    op.execute("DROP TRIGGER IF EXISTS categories_search_vector_trg ON categories")
+    op.execute("DROP FUNCTION IF EXISTS categories_search_vector_update()")
+    op.execute("DROP TRIGGER IF EXISTS books_search_vector_trg ON books")
+    op.execute("DROP FUNCTION IF EXISTS books_search_vector_update()")
+    op.drop_column('books', 'search_vector')
@@ -0,0 +1,138 @@
+"""Resumen de inventario mantenido incrementalmente
+
+Revision ID: 5c8e2b7a9d13
+Revises: 3f9a1c2d7e41
+Create Date: 2026-10-18 11:03:52.640127
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5c8e2b7a9d13'
+down_revision = '3f9a1c2d7e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'estado_proceso',
+        sa.Column('nombre', sa.String(length=50), primary_key=True),
+        sa.Column('actualizado_en', sa.DateTime(), nullable=False),
+        sa.Column('marca', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    op.create_table(
+        'inventario_resumen',
+        sa.Column('id_libro', sa.Integer(), primary_key=True),
+        sa.Column('titulo_libro', sa.String(length=50), nullable=False),
+        sa.Column('idioma', sa.String(length=30), nullable=False),
+        sa.Column('generos', sa.Text(), nullable=True),
+        sa.Column('copias_disponibles', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('actualizado_en', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_inventario_resumen_titulo_libro', 'inventario_resumen', ['titulo_libro'])
+    op.create_table(
+        'inventario_pendiente',
+        sa.Column('id_libro', sa.Integer(), primary_key=True),
+    )
+
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Cualquier cambio en copias, ediciones, géneros o libros anota el libro como pendiente
+    op.execute("""
+        CREATE OR REPLACE FUNCTION inventario_marcar(p_id_libro integer) RETURNS void AS $$
+        BEGIN
+            IF p_id_libro IS NOT NULL THEN
+                INSERT INTO inventario_pendiente (id_libro) VALUES (p_id_libro)
+                ON CONFLICT DO NOTHING;
+            END IF;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION inventario_copia_trg() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM inventario_marcar((SELECT id_libro FROM edicion WHERE id_edicion = OLD.id_edicion));
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM inventario_marcar((SELECT id_libro FROM edicion WHERE id_edicion = NEW.id_edicion));
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION inventario_libro_trg() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM inventario_marcar(OLD.id_libro);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM inventario_marcar(NEW.id_libro);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION inventario_genero_trg() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO inventario_pendiente (id_libro)
+            SELECT DISTINCT id_libro FROM libro_genero WHERE id_genero = NEW.id_genero
+            ON CONFLICT DO NOTHING;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for tabla, funcion in (
+        ('copia', 'inventario_copia_trg'),
+        ('edicion', 'inventario_libro_trg'),
+        ('libro_genero', 'inventario_libro_trg'),
+        ('libro', 'inventario_libro_trg'),
+    ):
+        op.execute(f"""
+            CREATE TRIGGER {tabla}_inventario_trg
+            AFTER INSERT OR UPDATE OR DELETE ON {tabla}
+            FOR EACH ROW EXECUTE FUNCTION {funcion}()
+        """)
+    op.execute("""
+        CREATE TRIGGER genero_inventario_trg
+        AFTER UPDATE OF nombre_genero ON genero
+        FOR EACH ROW EXECUTE FUNCTION inventario_genero_trg()
+    """)
+
+    # Carga inicial
+    op.execute("""
+        INSERT INTO inventario_resumen
+            (id_libro, titulo_libro, idioma, generos, copias_disponibles, actualizado_en)
+        SELECT l.id_libro, l.titulo_libro, l.idioma, g.generos, c.copias_disponibles, now()
+        FROM libro l
+        JOIN (
+            SELECT lg.id_libro, string_agg(ge.nombre_genero, ', ') AS generos
+            FROM libro_genero lg JOIN genero ge ON lg.id_genero = ge.id_genero
+            GROUP BY lg.id_libro
+        ) g ON g.id_libro = l.id_libro
+        JOIN (
+            SELECT e.id_libro, sum(co.copias_disponibles) AS copias_disponibles
+            FROM edicion e JOIN copia co ON co.id_edicion = e.id_edicion
+            GROUP BY e.id_libro
+        ) c ON c.id_libro = l.id_libro
+    """)
+    op.execute("INSERT INTO estado_proceso (nombre, actualizado_en, marca) VALUES ('inventario_resumen', now(), 0)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for tabla in ('copia', 'edicion', 'libro_genero', 'libro', 'genero'):
+            op.execute(f"DROP TRIGGER IF EXISTS {tabla}_inventario_trg ON {tabla}")
+        op.execute("DROP FUNCTION IF EXISTS inventario_genero_trg()")
+        op.execute("DROP FUNCTION IF EXISTS inventario_libro_trg()")
+        op.execute("DROP FUNCTION IF EXISTS inventario_copia_trg()")
+        op.execute("DROP FUNCTION IF EXISTS inventario_marcar(integer)")
+
+    op.drop_table('inventario_pendiente')
+    op.drop_index('ix_inventario_resumen_titulo_libro', table_name='inventario_resumen')
+    op.drop_table('inventario_resumen')
+    op.drop_table('estado_proceso')
@@ -0,0 +1,37 @@
+"""Tabla trabajo para la cola de trabajos en segundo plano
+
+Revision ID: 7a1d4e9b2c60
+Revises: 5c8e2b7a9d13
+Create Date: 2026-10-18 12:20:07.513998
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '7a1d4e9b2c60'
+down_revision = '5c8e2b7a9d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'trabajo',
+        sa.Column('id', sa.String(length=32), primary_key=True),
+        sa.Column('tipo', sa.String(length=50), nullable=False),
+        sa.Column('parametros', sa.Text(), nullable=False),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('resultado', sa.Text(), nullable=True),
+        sa.Column('tipo_contenido', sa.String(length=50), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('intentos', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('creado_en', sa.DateTime(), nullable=False),
+        sa.Column('iniciado_en', sa.DateTime(), nullable=True),
+        sa.Column('terminado_en', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_trabajo_estado', 'trabajo', ['estado'])
+
+
+def downgrade():
+    op.drop_index('ix_trabajo_estado', table_name='trabajo')
+    op.drop_table('trabajo')
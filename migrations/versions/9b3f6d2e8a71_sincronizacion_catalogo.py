@@ -0,0 +1,99 @@
+"""Seguimiento de cambios legacy para sincronizar el catálogo
+
+Revision ID: 9b3f6d2e8a71
+Revises: 7a1d4e9b2c60
+Create Date: 2026-10-18 13:41:26.905112
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '9b3f6d2e8a71'
+down_revision = '7a1d4e9b2c60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Vínculo entre el libro del catálogo y el libro legacy que lo origina
+    op.add_column('books', sa.Column('id_libro', sa.Integer(), nullable=True))
+    op.create_index('ix_books_id_libro', 'books', ['id_libro'], unique=True)
+
+    op.create_table(
+        'catalogo_cambio',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), primary_key=True),
+        sa.Column('id_libro', sa.Integer(), nullable=False),
+        sa.Column('cambiado_en', sa.DateTime(), nullable=False),
+    )
+
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # migrate_legacy.py copió los libros conservando el id legacy
+    op.execute("UPDATE books SET id_libro = id WHERE id IN (SELECT id_libro FROM libro)")
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION catalogo_cambio_libro_trg() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                INSERT INTO catalogo_cambio (id_libro, cambiado_en) VALUES (OLD.id_libro, now());
+            END IF;
+            IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.id_libro <> OLD.id_libro) THEN
+                INSERT INTO catalogo_cambio (id_libro, cambiado_en) VALUES (NEW.id_libro, now());
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for tabla in ('libro', 'autor_libro', 'libro_genero'):
+        op.execute(f"""
+            CREATE TRIGGER {tabla}_catalogo_trg
+            AFTER INSERT OR UPDATE OR DELETE ON {tabla}
+            FOR EACH ROW EXECUTE FUNCTION catalogo_cambio_libro_trg()
+        """)
+
+    # Renombrar un autor o un género afecta a todos sus libros
+    op.execute("""
+        CREATE OR REPLACE FUNCTION catalogo_cambio_autor_trg() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO catalogo_cambio (id_libro, cambiado_en)
+            SELECT id_libro, now() FROM autor_libro WHERE id_autor = NEW.id_autor;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER autor_catalogo_trg
+        AFTER UPDATE OF nombre_autor ON autor
+        FOR EACH ROW EXECUTE FUNCTION catalogo_cambio_autor_trg()
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION catalogo_cambio_genero_trg() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO catalogo_cambio (id_libro, cambiado_en)
+            SELECT id_libro, now() FROM libro_genero WHERE id_genero = NEW.id_genero;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER genero_catalogo_trg
+        AFTER UPDATE OF nombre_genero ON genero
+        FOR EACH ROW EXECUTE FUNCTION catalogo_cambio_genero_trg()
+    """)
+
+    # Primera sincronización: todos los libros legacy
+    op.execute("INSERT INTO catalogo_cambio (id_libro, cambiado_en) SELECT id_libro, now() FROM libro")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for tabla in ('libro', 'autor_libro', 'libro_genero', 'autor', 'genero'):
+            op.execute(f"DROP TRIGGER IF EXISTS {tabla}_catalogo_trg ON {tabla}")
+        op.execute("DROP FUNCTION IF EXISTS catalogo_cambio_genero_trg()")
+        op.execute("DROP FUNCTION IF EXISTS catalogo_cambio_autor_trg()")
+        op.execute("DROP FUNCTION IF EXISTS catalogo_cambio_libro_trg()")
+
+    op.drop_table('catalogo_cambio')
+    op.drop_index('ix_books_id_libro', table_name='books')
+    op.drop_column('books', 'id_libro')
@@ -0,0 +1,30 @@
+"""Resumen diario de circulación por género e idioma
+
+Revision ID: a7c4e2d9b316
+Revises: f3b8d1a6c925
+Create Date: 2026-10-18 23:02:11.846302
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a7c4e2d9b316'
+down_revision = 'f3b8d1a6c925'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'circulacion_diaria',
+        sa.Column('fecha', sa.Date(), primary_key=True),
+        sa.Column('id_genero', sa.Integer(), primary_key=True),
+        sa.Column('idioma', sa.String(length=30), primary_key=True),
+        sa.Column('prestamos', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('devoluciones', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('ingresos', sa.Numeric(precision=14, scale=4), nullable=False, server_default='0'),
+    )
+
+
+def downgrade():
+    op.drop_table('circulacion_diaria')
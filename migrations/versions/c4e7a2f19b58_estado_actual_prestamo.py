@@ -0,0 +1,94 @@
+"""Proyección del estado actual del préstamo
+
+Revision ID: c4e7a2f19b58
+Revises: 9b3f6d2e8a71
+Create Date: 2026-10-18 15:52:08.311467
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c4e7a2f19b58'
+down_revision = '9b3f6d2e8a71'
+branch_labels = None
+depends_on = None
+
+# Último estado registrado de cada préstamo
+ULTIMO_ESTADO = """
+    SELECT CAST(ep.estado AS VARCHAR(20)) FROM estado_prestamo ep
+    WHERE ep.id_prestamo = {prestamo}
+    ORDER BY ep.id_estado_prestamo DESC
+    LIMIT 1
+"""
+
+
+def upgrade():
+    op.add_column('prestamo', sa.Column('estado_actual', sa.String(length=20), nullable=True))
+
+    if op.get_bind().dialect.name == 'postgresql':
+        # Una sola pasada sobre estado_prestamo en lugar de una subconsulta por préstamo
+        op.execute("""
+            UPDATE prestamo p SET estado_actual = u.estado
+            FROM (
+                SELECT DISTINCT ON (id_prestamo) id_prestamo, estado::TEXT AS estado
+                FROM estado_prestamo
+                ORDER BY id_prestamo, id_estado_prestamo DESC
+            ) u
+            WHERE p.id_prestamo = u.id_prestamo
+        """)
+    else:
+        op.execute(
+            "UPDATE prestamo SET estado_actual = ("
+            + ULTIMO_ESTADO.format(prestamo='prestamo.id_prestamo') + ")"
+        )
+
+    op.create_index(
+        'ix_prestamo_en_curso', 'prestamo', ['fecha_prestamo', 'id_prestamo', 'id_usuario'],
+        postgresql_where=sa.text("estado_actual = 'En_curso'"),
+        sqlite_where=sa.text("estado_actual = 'En_curso'")
+    )
+
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Cualquier escritura en estado_prestamo (también fuera de la aplicación)
+    # recalcula la proyección; si ya coincide no se reescribe la fila
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION prestamo_estado_actual_trg() RETURNS trigger AS $$
+        DECLARE
+            v_id_prestamo integer;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                v_id_prestamo := OLD.id_prestamo;
+            ELSE
+                v_id_prestamo := NEW.id_prestamo;
+            END IF;
+
+            UPDATE prestamo
+            SET estado_actual = ({ULTIMO_ESTADO.format(prestamo='v_id_prestamo')})
+            WHERE id_prestamo = v_id_prestamo
+              AND estado_actual IS DISTINCT FROM ({ULTIMO_ESTADO.format(prestamo='v_id_prestamo')});
+
+            IF TG_OP = 'UPDATE' AND OLD.id_prestamo <> NEW.id_prestamo THEN
+                UPDATE prestamo
+                SET estado_actual = ({ULTIMO_ESTADO.format(prestamo='OLD.id_prestamo')})
+                WHERE id_prestamo = OLD.id_prestamo;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER estado_prestamo_actual_trg
+        AFTER INSERT OR UPDATE OR DELETE ON estado_prestamo
+        FOR EACH ROW EXECUTE FUNCTION prestamo_estado_actual_trg()
+    """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS estado_prestamo_actual_trg ON estado_prestamo")
+        op.execute("DROP FUNCTION IF EXISTS prestamo_estado_actual_trg()")
+
+    op.drop_index('ix_prestamo_en_curso', table_name='prestamo')
+    op.drop_column('prestamo', 'estado_actual')
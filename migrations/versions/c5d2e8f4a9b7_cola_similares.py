@@ -0,0 +1,61 @@
+"""Cola de préstamos y lectores por libro para la actualización de similares
+
+Revision ID: c5d2e8f4a9b7
+Revises: a7c4e2d9b316
+Create Date: 2026-10-19 10:41:26.318054
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c5d2e8f4a9b7'
+down_revision = 'a7c4e2d9b316'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'libro_lectores',
+        sa.Column('id_libro', sa.Integer(), primary_key=True),
+        sa.Column('lectores', sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        'similar_pendiente',
+        sa.Column('id_prestamo', sa.Integer(), primary_key=True),
+    )
+
+    # Los préstamos posteriores al watermark anterior quedan en la cola;
+    # libro_lectores se llena en la primera reconstrucción completa
+    op.execute("""
+        INSERT INTO similar_pendiente (id_prestamo)
+        SELECT id_prestamo FROM prestamo
+        WHERE id_prestamo > COALESCE(
+            (SELECT marca FROM estado_proceso WHERE nombre = 'libros_similares'), 0)
+    """)
+    op.execute("DELETE FROM estado_proceso WHERE nombre = 'libros_similares'")
+
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION similar_pendiente_trg() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO similar_pendiente (id_prestamo) VALUES (NEW.id_prestamo)
+            ON CONFLICT DO NOTHING;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER prestamo_similar_trg AFTER INSERT ON prestamo
+            FOR EACH ROW EXECUTE FUNCTION similar_pendiente_trg()
+    """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS prestamo_similar_trg ON prestamo")
+        op.execute("DROP FUNCTION IF EXISTS similar_pendiente_trg()")
+    op.drop_table('similar_pendiente')
+    op.drop_table('libro_lectores')
@@ -0,0 +1,72 @@
+"""Índices de claves foráneas y filtros en circulación y catálogo
+
+Revision ID: d81b3c6f0e24
+Revises: c4e7a2f19b58
+Create Date: 2026-10-18 16:20:44.902138
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd81b3c6f0e24'
+down_revision = 'c4e7a2f19b58'
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, columnas, único)
+INDICES = [
+    ('ix_books_category_id_id', 'books', ['category_id', 'id'], False),
+    ('ix_books_author_id', 'books', ['author', 'id'], False),
+    ('ix_prestamo_id_usuario_fecha', 'prestamo', ['id_usuario', 'fecha_prestamo'], False),
+    ('ix_prestamo_fecha_prestamo', 'prestamo', ['fecha_prestamo'], False),
+    ('ix_estado_prestamo_id_prestamo', 'estado_prestamo', ['id_prestamo', 'id_estado_prestamo'], False),
+    ('ix_prestamo_edicion_prestamo_edicion', 'prestamo_edicion', ['id_prestamo', 'id_edicion'], False),
+    ('ix_prestamo_edicion_id_edicion', 'prestamo_edicion', ['id_edicion'], False),
+    ('ix_edicion_id_libro', 'edicion', ['id_libro'], False),
+    ('ix_copia_id_edicion', 'copia', ['id_edicion', 'id_copia'], False),
+    ('ix_libro_genero_libro_genero', 'libro_genero', ['id_libro', 'id_genero'], True),
+    ('ix_libro_genero_id_genero', 'libro_genero', ['id_genero'], False),
+    ('ix_autor_libro_libro_autor', 'autor_libro', ['id_libro', 'id_autor'], True),
+    ('ix_autor_libro_id_autor', 'autor_libro', ['id_autor'], False),
+]
+
+
+def upgrade():
+    # Las tablas de asociación pueden tener pares repetidos (no aportan nada)
+    # y los índices únicos fallarían al crearse
+    op.execute("""
+        DELETE FROM libro_genero WHERE id_libro_genero NOT IN (
+            SELECT MIN(id_libro_genero) FROM libro_genero GROUP BY id_libro, id_genero
+        )
+    """)
+    op.execute("""
+        DELETE FROM autor_libro WHERE id_autor_libro NOT IN (
+            SELECT MIN(id_autor_libro) FROM autor_libro GROUP BY id_libro, id_autor
+        )
+    """)
+
+    if op.get_bind().dialect.name != 'postgresql':
+        for nombre, tabla, columnas, unico in INDICES:
+            op.create_index(nombre, tabla, columnas, unique=unico)
+        return
+
+    # CREATE INDEX CONCURRENTLY no bloquea escrituras pero no puede ir en una transacción
+    with op.get_context().autocommit_block():
+        for nombre, tabla, columnas, unico in INDICES:
+            op.create_index(
+                nombre, tabla, columnas, unique=unico,
+                postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        for nombre, tabla, _, _ in reversed(INDICES):
+            op.drop_index(nombre, table_name=tabla)
+        return
+
+    with op.get_context().autocommit_block():
+        for nombre, tabla, _, _ in reversed(INDICES):
+            op.drop_index(
+                nombre, table_name=tabla,
+                postgresql_concurrently=True, if_exists=True
+            )
@@ -0,0 +1,24 @@
+"""Archivo de resultado de los trabajos en segundo plano
+
+Revision ID: d8e3f1a6b2c4
+Revises: c5d2e8f4a9b7
+Create Date: 2026-10-19 16:05:42.871203
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd8e3f1a6b2c4'
+down_revision = 'c5d2e8f4a9b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nombre del archivo con el resultado, para los trabajos que generan
+    # archivos (p. ej. CSV); resultado queda para los resultados JSON
+    op.add_column('trabajo', sa.Column('archivo', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    op.drop_column('trabajo', 'archivo')
@@ -0,0 +1,27 @@
+"""Contadores de versión por tabla
+
+Revision ID: e2a9c5d7f318
+Revises: d81b3c6f0e24
+Create Date: 2026-10-18 16:48:12.530719
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e2a9c5d7f318'
+down_revision = 'd81b3c6f0e24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'version_tabla',
+        sa.Column('tabla', sa.String(length=64), primary_key=True),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('actualizado_en', sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('version_tabla')
@@ -0,0 +1,29 @@
+"""Recomendaciones precalculadas por coocurrencia de préstamos
+
+Revision ID: f3b8d1a6c925
+Revises: e2a9c5d7f318
+Create Date: 2026-10-18 21:14:37.205918
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d1a6c925'
+down_revision = 'e2a9c5d7f318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'libro_similar',
+        sa.Column('id_libro', sa.Integer(), primary_key=True),
+        sa.Column('posicion', sa.SmallInteger(), primary_key=True),
+        sa.Column('id_similar', sa.Integer(), nullable=False),
+        sa.Column('puntaje', sa.Float(), nullable=False),
+        sa.Column('coprestamos', sa.Integer(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('libro_similar')
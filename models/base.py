@@ -1,5 +1,13 @@
 # models/base.py
 from flask_sqlalchemy import SQLAlchemy
 
-# Aquí se crea la instancia de SQLAlchemy sin referirse a 'app'
-db = SQLAlchemy()
+from models.replicas import SesionEnrutada
+
+# Aquí se crea la instancia de SQLAlchemy sin referirse a 'app'.
+# La sesión envía a réplicas las lecturas permitidas (models/replicas.py)
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
+
+
+def es_postgres():
+    """Indica si la base de datos configurada es PostgreSQL"""
+    return db.engine.dialect.name == 'postgresql'
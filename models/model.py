@@ -3,6 +3,7 @@ from flask_login import UserMixin
 from sqlalchemy import case
 from sqlalchemy import Enum
 from enum import Enum as PyEnum
+from services.serializacion import relacion_cargada
 class Category(db.Model):
     __tablename__ = 'categories'
     id   = db.Column(db.Integer, primary_key=True)
@@ -29,13 +30,22 @@ class Book(db.Model):
     author      = db.Column(db.String(128), nullable=False)
     description = db.Column(db.Text, nullable=True)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'))
-    
+    id_libro    = db.Column(db.Integer, unique=True, nullable=True)  # Libro legacy proyectado
+
+    __table_args__ = (
+        # Filtros del catálogo con paginación por id (WHERE ... AND id > :after_id ORDER BY id)
+        db.Index('ix_books_category_id_id', 'category_id', 'id'),
+        db.Index('ix_books_author_id', 'author', 'id'),
+    )
 
     def to_dict(self):
+        # La categoría solo se incluye si ya está cargada (joinedload):
+        # serializar no debe disparar una consulta por libro
+        categoria = relacion_cargada(self, 'category')
         return {
             'id':self.id,'title':self.title,'author':self.author,
             'description':self.description,
-            'category': self.category.name if self.category else None,
+            'category': categoria.name if categoria is not None else None,
             'category_id':self.category_id
         }
 
@@ -56,6 +66,10 @@ class EstadoEnum(PyEnum):
     PENDIENTE = 'Pendiente'
     EN_CURSO = 'En_curso'  # ¡Exactamente como en la BD, con mayúscula y guión bajo!
 
+def _valores_enum(enum):
+    # La BD guarda los valores ('En_curso'), no los nombres del enum ('EN_CURSO')
+    return [miembro.value for miembro in enum]
+
 class Usuario(UserMixin, db.Model):
     __tablename__ = 'usuario'
     id_usuario = db.Column(db.Integer, primary_key=True)
@@ -101,7 +115,7 @@ class Edicion(db.Model):
     id_edicion = db.Column(db.Integer, primary_key=True)
     isbn = db.Column(db.String(45), nullable=False)
     año_publicacion = db.Column(db.Integer, nullable=False)
-    id_libro = db.Column(db.Integer, db.ForeignKey('libro.id_libro'), nullable=False)
+    id_libro = db.Column(db.Integer, db.ForeignKey('libro.id_libro'), nullable=False, index=True)
     
     # Relaciones
     libro = db.relationship('Libro', backref='ediciones')
@@ -113,13 +127,32 @@ class Copia(db.Model):
     copias_disponibles = db.Column(db.Integer, nullable=False)
     id_edicion = db.Column(db.Integer, db.ForeignKey('edicion.id_edicion'), nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_copia_id_edicion', 'id_edicion', 'id_copia'),
+    )
+
 class Prestamo(db.Model):
     __tablename__ = 'prestamo'
     id_prestamo = db.Column(db.Integer, primary_key=True)
-    fecha_prestamo = db.Column(db.Date, nullable=False)
+    fecha_prestamo = db.Column(db.Date, nullable=False, index=True)
     fecha_devolucion = db.Column(db.Date, nullable=False)
     precio_alquiler = db.Column(db.String(20), nullable=False)
     id_usuario = db.Column(db.Integer, db.ForeignKey('usuario.id_usuario'), nullable=False)
+    # Último estado registrado en estado_prestamo (proyección mantenida al transicionar)
+    estado_actual = db.Column(
+        Enum(EstadoEnum, native_enum=False, length=20, values_callable=_valores_enum)
+    )
+
+    __table_args__ = (
+        # Historial por usuario, más reciente primero
+        db.Index('ix_prestamo_id_usuario_fecha', 'id_usuario', 'fecha_prestamo'),
+        # Solo los préstamos en curso: el reporte de activos no recorre el histórico
+        db.Index(
+            'ix_prestamo_en_curso', 'fecha_prestamo', 'id_prestamo', 'id_usuario',
+            postgresql_where=db.text("estado_actual = 'En_curso'"),
+            sqlite_where=db.text("estado_actual = 'En_curso'")
+        ),
+    )
     
     # Relaciones
     usuario = db.relationship('Usuario', backref='prestamos')
@@ -129,24 +162,124 @@ class Prestamo(db.Model):
 class EstadoPrestamo(db.Model):
     __tablename__ = 'estado_prestamo'
     id_estado_prestamo = db.Column(db.Integer, primary_key=True)
-    estado = db.Column(Enum(EstadoEnum), nullable=False)
+    estado = db.Column(Enum(EstadoEnum, values_callable=_valores_enum), nullable=False)
     id_prestamo = db.Column(db.Integer, db.ForeignKey('prestamo.id_prestamo'), nullable=False)
 
+    __table_args__ = (
+        # Último estado de un préstamo: id_prestamo = :id ORDER BY id_estado_prestamo DESC
+        db.Index('ix_estado_prestamo_id_prestamo', 'id_prestamo', 'id_estado_prestamo'),
+    )
+
 # Tablas de asociación
 class AutorLibro(db.Model):
     __tablename__ = 'autor_libro'
     id_autor_libro = db.Column(db.Integer, primary_key=True)
-    id_autor = db.Column(db.Integer, db.ForeignKey('autor.id_autor'), nullable=False)
+    id_autor = db.Column(db.Integer, db.ForeignKey('autor.id_autor'), nullable=False, index=True)
     id_libro = db.Column(db.Integer, db.ForeignKey('libro.id_libro'), nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_autor_libro_libro_autor', 'id_libro', 'id_autor', unique=True),
+    )
+
 class LibroGenero(db.Model):
     __tablename__ = 'libro_genero'
     id_libro_genero = db.Column(db.Integer, primary_key=True)
     id_libro = db.Column(db.Integer, db.ForeignKey('libro.id_libro'), nullable=False)
-    id_genero = db.Column(db.Integer, db.ForeignKey('genero.id_genero'), nullable=False)
+    id_genero = db.Column(db.Integer, db.ForeignKey('genero.id_genero'), nullable=False, index=True)
+
+    __table_args__ = (
+        db.Index('ix_libro_genero_libro_genero', 'id_libro', 'id_genero', unique=True),
+    )
 
 class PrestamoEdicion(db.Model):
     __tablename__ = 'prestamo_edicion'
     id_prestamo_edicion = db.Column(db.Integer, primary_key=True)
     id_prestamo = db.Column(db.Integer, db.ForeignKey('prestamo.id_prestamo'), nullable=False)
-    id_edicion = db.Column(db.Integer, db.ForeignKey('edicion.id_edicion'), nullable=False)
\ No newline at end of file
+    id_edicion = db.Column(db.Integer, db.ForeignKey('edicion.id_edicion'), nullable=False, index=True)
+
+    __table_args__ = (
+        # No único: prestar() ya rechaza ediciones repetidas y el índice sirve solo de búsqueda
+        db.Index('ix_prestamo_edicion_prestamo_edicion', 'id_prestamo', 'id_edicion'),
+    )
+
+# Resúmenes mantenidos por la aplicación
+class EstadoProceso(db.Model):
+    """Marca de tiempo y watermark de procesos periódicos (refrescos, sincronizaciones)"""
+    __tablename__ = 'estado_proceso'
+    nombre = db.Column(db.String(50), primary_key=True)
+    actualizado_en = db.Column(db.DateTime, nullable=False)
+    marca = db.Column(db.BigInteger, nullable=False, default=0)
+
+class VersionTabla(db.Model):
+    """Contador de cambios confirmados por tabla (ETag de las APIs y caché de PDF)"""
+    __tablename__ = 'version_tabla'
+    tabla = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    actualizado_en = db.Column(db.DateTime, nullable=False)
+
+class InventarioResumen(db.Model):
+    __tablename__ = 'inventario_resumen'
+    id_libro = db.Column(db.Integer, primary_key=True)
+    titulo_libro = db.Column(db.String(50), nullable=False, index=True)
+    idioma = db.Column(db.String(30), nullable=False)
+    generos = db.Column(db.Text)
+    copias_disponibles = db.Column(db.Integer, nullable=False, default=0)
+    actualizado_en = db.Column(db.DateTime, nullable=False)
+
+class LibroSimilar(db.Model):
+    """Libros más prestados por los mismos lectores, precalculados (services/similares.py)"""
+    __tablename__ = 'libro_similar'
+    id_libro = db.Column(db.Integer, primary_key=True)
+    posicion = db.Column(db.SmallInteger, primary_key=True)
+    id_similar = db.Column(db.Integer, nullable=False)
+    puntaje = db.Column(db.Float, nullable=False)
+    coprestamos = db.Column(db.Integer, nullable=False)
+
+class LibroLectores(db.Model):
+    """Lectores distintos de cada libro, denominador del puntaje de libro_similar"""
+    __tablename__ = 'libro_lectores'
+    id_libro = db.Column(db.Integer, primary_key=True)
+    lectores = db.Column(db.Integer, nullable=False)
+
+class SimilarPendiente(db.Model):
+    """Préstamos nuevos que la actualización incremental de similares aún no procesó"""
+    __tablename__ = 'similar_pendiente'
+    id_prestamo = db.Column(db.Integer, primary_key=True)
+
+class CirculacionDiaria(db.Model):
+    """Préstamos, devoluciones e ingresos por día, género e idioma (services/circulacion.py)"""
+    __tablename__ = 'circulacion_diaria'
+    fecha = db.Column(db.Date, primary_key=True)
+    id_genero = db.Column(db.Integer, primary_key=True)  # 0: todos los géneros
+    idioma = db.Column(db.String(30), primary_key=True)
+    prestamos = db.Column(db.Integer, nullable=False, default=0)
+    devoluciones = db.Column(db.Integer, nullable=False, default=0)
+    ingresos = db.Column(db.Numeric(14, 4), nullable=False, default=0)
+
+class InventarioPendiente(db.Model):
+    """Libros cuyo resumen de inventario debe recalcularse"""
+    __tablename__ = 'inventario_pendiente'
+    id_libro = db.Column(db.Integer, primary_key=True)
+
+class Trabajo(db.Model):
+    """Trabajo en segundo plano (reportes largos) procesado por scripts/worker.py"""
+    __tablename__ = 'trabajo'
+    id = db.Column(db.String(32), primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    parametros = db.Column(db.Text, nullable=False, default='{}')
+    estado = db.Column(db.String(20), nullable=False, default='pendiente', index=True)
+    resultado = db.Column(db.Text)
+    archivo = db.Column(db.String(255))
+    tipo_contenido = db.Column(db.String(50))
+    error = db.Column(db.Text)
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    creado_en = db.Column(db.DateTime, nullable=False)
+    iniciado_en = db.Column(db.DateTime)
+    terminado_en = db.Column(db.DateTime)
+
+class CatalogoCambio(db.Model):
+    """Libros legacy modificados pendientes de proyectar en books/categories"""
+    __tablename__ = 'catalogo_cambio'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    id_libro = db.Column(db.Integer, nullable=False)
+    cambiado_en = db.Column(db.DateTime, nullable=False)
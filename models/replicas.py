@@ -0,0 +1,211 @@
+# models/replicas.py
+"""
+Enrutamiento de lecturas a réplicas (opcional).
+
+Con réplicas configuradas (DATABASE_REPLICA_URLS, ver config.py), la
+sesión (SesionEnrutada) envía a una réplica los SELECT de las vistas
+marcadas con @solo_lectura; todo lo demás va a la primaria:
+- escrituras (INSERT/UPDATE/DELETE, flush) y SELECT ... FOR UPDATE;
+- sentencias de texto y session.connection() sin sentencia;
+- las lecturas de una transacción que ya modificó tablas, y las del resto
+  de la petición después de confirmarla (según services.eventos);
+- las peticiones de un usuario durante REPLICA_PIN_SEGUNDOS después de
+  confirmar una escritura (lee lo que acaba de escribir aunque la réplica
+  tenga retraso).
+
+Las réplicas se eligen por turnos y se verifican cada
+REPLICA_CHEQUEO_SEGUNDOS (SELECT 1 y, en PostgreSQL, el retraso de
+replicación frente a REPLICA_MAX_RETRASO). El chequeo corre en un hilo
+aparte: la petición que lo dispara sigue con el último estado conocido,
+así una réplica inalcanzable no frena las lecturas mientras vence su
+connect_timeout (DB_REPLICA_CONNECT_TIMEOUT). Una réplica que falla al
+conectar sale de la rotación hasta el próximo chequeo; sin réplicas sanas
+se lee de la primaria.
+"""
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_app_context, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+
+from services.eventos import al_confirmar, hay_cambios
+
+CLAVE_PIN = '_primaria_hasta'
+
+RETRASO_POSTGRES = (
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class Replica:
+    def __init__(self, url, motor):
+        self.url = url
+        self.motor = motor
+        self.sana = True
+        self.chequeando = False
+        self.revisar_en = 0.0
+        self.retraso = None
+        self.lecturas = 0
+        self.fallos = 0
+
+
+class Replicas:
+    def __init__(self):
+        self.replicas = []
+        self.intervalo_chequeo = 30
+        self.pin_segundos = 10
+        self.max_retraso = 30
+        self._turno = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.intervalo_chequeo = app.config.get('REPLICA_CHEQUEO_SEGUNDOS', self.intervalo_chequeo)
+        self.pin_segundos = app.config.get('REPLICA_PIN_SEGUNDOS', self.pin_segundos)
+        self.max_retraso = app.config.get('REPLICA_MAX_RETRASO', self.max_retraso)
+        self.replicas = []
+        for url, opciones in (app.config.get('DATABASE_REPLICAS') or {}).items():
+            replica = Replica(url, create_engine(url, **opciones))
+            event.listen(replica.motor, 'handle_error', self._al_fallar(replica))
+            self.replicas.append(replica)
+
+    @property
+    def activas(self):
+        return bool(self.replicas)
+
+    def _al_fallar(self, replica):
+        def al_fallar(contexto):
+            # Sin conexión (no pudo conectar) o conexión caída: fuera de la rotación
+            if contexto.connection is None or contexto.is_disconnect:
+                self._marcar(replica, False)
+        return al_fallar
+
+    def _marcar(self, replica, sana):
+        with self._lock:
+            replica.sana = sana
+            if not sana:
+                replica.fallos += 1
+            replica.revisar_en = time.monotonic() + self.intervalo_chequeo
+
+    def chequear(self, replica):
+        try:
+            with replica.motor.connect() as conexion:
+                conexion.exec_driver_sql('SELECT 1')
+                replica.retraso = None
+                if replica.motor.dialect.name == 'postgresql':
+                    retraso = conexion.exec_driver_sql(RETRASO_POSTGRES).scalar()
+                    replica.retraso = float(retraso) if retraso is not None else None
+            sana = replica.retraso is None or replica.retraso <= self.max_retraso
+        except Exception:
+            sana = False
+        self._marcar(replica, sana)
+        return sana
+
+    def _chequear_en_fondo(self, replica):
+        try:
+            self.chequear(replica)
+        finally:
+            replica.chequeando = False
+
+    def elegir(self):
+        """Siguiente réplica sana por turnos, o None"""
+        vencidas, elegida = [], None
+        with self._lock:
+            ahora = time.monotonic()
+            for replica in self.replicas:
+                if ahora >= replica.revisar_en and not replica.chequeando:
+                    replica.chequeando = True
+                    vencidas.append(replica)
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[self._turno % len(self.replicas)]
+                self._turno += 1
+                if replica.sana:
+                    replica.lecturas += 1
+                    elegida = replica.motor
+                    break
+
+        # Fuera del lock: conectar a una réplica caída puede tardar
+        for replica in vencidas:
+            threading.Thread(
+                target=self._chequear_en_fondo, args=(replica,),
+                name='chequeo-replica', daemon=True
+            ).start()
+        return elegida
+
+    def lectura_permitida(self):
+        """Si las lecturas de este contexto pueden ir a una réplica"""
+        if not self.replicas or not has_app_context():
+            return False
+        if not g.get('solo_lectura') or g.get('leer_primaria'):
+            return False
+        if has_request_context() and session.get(CLAVE_PIN, 0) > time.time():
+            return False
+        return True
+
+    def fijar_primaria(self):
+        """El resto de la petición y las próximas del usuario leen de la primaria"""
+        if not self.replicas or not has_app_context():
+            return
+        g.leer_primaria = True
+        if has_request_context():
+            session[CLAVE_PIN] = time.time() + self.pin_segundos
+
+    def estadisticas(self):
+        return {
+            'replicas': [{
+                'url': r.motor.url.render_as_string(hide_password=True),
+                'sana': r.sana,
+                'retraso_s': r.retraso,
+                'lecturas': r.lecturas,
+                'fallos': r.fallos,
+            } for r in self.replicas],
+            'pin_segundos': self.pin_segundos,
+        }
+
+
+replicas = Replicas()
+
+
+def solo_lectura(vista):
+    """Marca una vista cuyas consultas pueden leerse de una réplica"""
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        g.solo_lectura = True
+        return vista(*args, **kwargs)
+    return envoltura
+
+
+class SesionEnrutada(Session):
+    """Sesión de Flask-SQLAlchemy que envía a réplicas las lecturas permitidas"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primaria = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not replicas.activas or primaria is not self._db.engine:
+            return primaria
+
+        if (
+            self._flushing
+            or not getattr(clause, 'is_select', False)
+            or getattr(clause, '_for_update_arg', None) is not None
+            or hay_cambios(self)
+            or not replicas.lectura_permitida()
+        ):
+            return primaria
+
+        # Una sola réplica por transacción: lecturas consistentes entre sí
+        if 'replica' not in self.info:
+            self.info['replica'] = replicas.elegir()
+        return self.info['replica'] or primaria
+
+
+@event.listens_for(SesionEnrutada, 'after_transaction_end')
+def _al_terminar_transaccion(sesion, transaccion):
+    if transaccion.parent is None:
+        sesion.info.pop('replica', None)
+
+
+@al_confirmar
+def _al_confirmar_escritura(cambios):
+    replicas.fijar_primaria()
@@ -0,0 +1,121 @@
+# scripts/verificar_indices.py
+"""
+Verificación de planes de consulta: ejecuta EXPLAIN sobre las consultas de
+los reportes con datos sintéticos grandes y falla si alguna vuelve a
+recorrer completa (Seq Scan / SCAN sin índice) una tabla que debería
+leerse por índice.
+
+Uso:
+    python scripts/verificar_indices.py --url postgresql://... --escala 1
+
+Sin --url usa una base SQLite temporal. La base se vacía y se siembra
+con benchmarks.datos_sinteticos (20k libros y 60k préstamos por unidad
+de escala); no usar contra una base con datos reales. Termina con
+código 1 si algún plan no usa los índices esperados.
+
+El ranking de usuarios (top_users) agrega todos los préstamos: recorrer
+la tabla completa es lo esperado y no se verifica.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from sqlalchemy import select
+
+# Asegura que el root del proyecto esté en sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.datos_sinteticos import Escala, crear_app, generar
+from models.base import db
+from models.model import Copia, EstadoPrestamo, PrestamoEdicion
+from services.catalogo import consulta_libros
+from services.inventario import consulta_inventario
+from services.reportes import (
+    _consulta_historial_usuario, _consulta_user_loans, _consulta_active_loans
+)
+
+
+def consultas():
+    """(nombre, SELECT, tablas que no deben recorrerse completas)"""
+    return [
+        ('historial_usuario', _consulta_historial_usuario(17).statement,
+         {'prestamo', 'prestamo_edicion', 'edicion', 'libro'}),
+        ('user_loans', _consulta_user_loans(17).statement,
+         {'prestamo', 'prestamo_edicion', 'edicion', 'libro'}),
+        ('active_loans', _consulta_active_loans().statement,
+         {'prestamo', 'prestamo_edicion', 'edicion', 'libro'}),
+        ('inventario_incremental', consulta_inventario(list(range(100, 150))),
+         {'libro', 'libro_genero', 'edicion', 'copia'}),
+        ('catalogo_categoria', consulta_libros(categoria_id=7).limit(50),
+         {'books'}),
+        ('catalogo_autor', consulta_libros(autor='Autor 77').limit(50),
+         {'books'}),
+        ('estado_prestamo', select(EstadoPrestamo.estado)
+         .where(EstadoPrestamo.id_prestamo == 1234)
+         .order_by(EstadoPrestamo.id_estado_prestamo.desc()).limit(1),
+         {'estado_prestamo'}),
+        ('copias_edicion', select(Copia.id_copia)
+         .where(Copia.id_edicion == 1234, Copia.copias_disponibles > 0)
+         .order_by(Copia.id_copia).limit(1),
+         {'copia'}),
+        ('ediciones_prestamo', select(PrestamoEdicion.id_edicion)
+         .where(PrestamoEdicion.id_prestamo == 1234),
+         {'prestamo_edicion'}),
+    ]
+
+
+def plan(stmt):
+    dialecto = db.engine.dialect
+    sql = str(stmt.compile(dialect=dialecto, compile_kwargs={'literal_binds': True}))
+    prefijo = 'EXPLAIN ' if dialecto.name == 'postgresql' else 'EXPLAIN QUERY PLAN '
+    filas = db.session.connection().exec_driver_sql(prefijo + sql).fetchall()
+    # PostgreSQL devuelve una columna de texto; SQLite (id, parent, notused, detail)
+    return [fila[-1] for fila in filas]
+
+
+def recorridos_completos(lineas):
+    """Tablas leídas sin índice según el plan"""
+    tablas = set()
+    for linea in lineas:
+        texto = linea.strip().lstrip('->').strip()
+        if texto.startswith('Seq Scan on '):
+            tablas.add(texto.split()[3])
+        elif texto.startswith('SCAN ') and ' USING ' not in texto:
+            tablas.add(texto.split()[1])
+    return tablas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EXPLAIN de las consultas de reportes')
+    parser.add_argument('--url')
+    parser.add_argument('--escala', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help='Imprime los planes completos')
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'indices.db')}"
+    app = crear_app(url)
+    fallos = 0
+
+    with app.app_context():
+        print('Generando datos sintéticos...')
+        generar(Escala(20000 * args.escala), progreso=lambda mensaje: None)
+
+        for nombre, stmt, protegidas in consultas():
+            lineas = plan(stmt)
+            indebidas = recorridos_completos(lineas) & protegidas
+            print(f"{'FALLO' if indebidas else 'ok':>5}  {nombre}"
+                  + (f"  (recorre completa: {', '.join(sorted(indebidas))})" if indebidas else ''))
+            if indebidas or args.verbose:
+                for linea in lineas:
+                    print(f'         {linea}')
+            fallos += bool(indebidas)
+
+    print('OK' if not fallos else f'{fallos} consultas sin los índices esperados')
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# scripts/verificar_replicas.py
+"""
+Verificación del enrutamiento a réplicas con dos bases locales.
+
+Uso:
+    python scripts/verificar_replicas.py
+    python scripts/verificar_replicas.py --primaria postgresql://.../biblio \
+        --replica postgresql://.../biblio_replica
+
+Sin argumentos crea dos SQLite temporales. Las bases se vacían y se
+siembran con el mismo esquema pero títulos distintos ('Primaria' /
+'Replica'), así se ve de dónde sale cada lectura. Además se configura una
+segunda réplica inalcanzable, que debe quedar fuera de la rotación.
+Termina con código 1 si alguna comprobación falla.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, select
+
+# Asegura que el root del proyecto esté en sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PIN_SEGUNDOS = 1
+
+
+def sembrar(url, titulo):
+    from models.base import db
+    from models.model import Book, Category, User
+
+    motor = create_engine(url)
+    db.metadata.drop_all(motor)
+    db.metadata.create_all(motor)
+    with motor.begin() as conexion:
+        conexion.execute(Category.__table__.insert(), [{'id': 1, 'name': 'General'}])
+        conexion.execute(User.__table__.insert(), [
+            {'id': 1, 'ci': titulo, 'password_hash': '-', 'role': 'admin'}
+        ])
+        conexion.execute(Book.__table__.insert(), [
+            {'id': i, 'title': f'{titulo} {i}', 'author': 'Autor', 'description': '-', 'category_id': 1}
+            for i in range(1, 4)
+        ])
+    return motor
+
+
+def cliente_admin(app):
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['_user_id'] = '1'
+        sesion['_fresh'] = True
+        sesion['role'] = 'admin'
+    return cliente
+
+
+def origen(respuesta):
+    titulos = {libro['title'].split()[0] for libro in respuesta.get_json()['libros']}
+    return ', '.join(sorted(titulos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Comprueba el enrutamiento a réplicas')
+    parser.add_argument('--primaria')
+    parser.add_argument('--replica')
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    primaria = args.primaria or f"sqlite:///{os.path.join(directorio, 'primaria.db')}"
+    replica = args.replica or f"sqlite:///{os.path.join(directorio, 'replica.db')}"
+    caida = 'sqlite:////directorio/inexistente/replica.db'
+
+    # app.py lee la configuración del entorno al importarse
+    os.environ['DATABASE_URL'] = primaria
+    os.environ['DATABASE_REPLICA_URLS'] = f'{caida},{replica}'
+    os.environ['REPLICA_PIN_SEGUNDOS'] = str(PIN_SEGUNDOS)
+
+    sembrar(primaria, 'Primaria')
+    motor_replica = sembrar(replica, 'Replica')
+
+    from app import app
+    from models.model import Book
+    from models.replicas import replicas
+
+    fallos = 0
+
+    def comprobar(descripcion, condicion, detalle=''):
+        nonlocal fallos
+        print(f"{'ok' if condicion else 'FALLO':>5}  {descripcion}" + (f'  ({detalle})' if detalle else ''))
+        fallos += not condicion
+
+    cliente = cliente_admin(app)
+
+    r = cliente.get('/api/libros')
+    comprobar('GET /api/libros lee de la réplica', origen(r) == 'Replica', origen(r))
+
+    estado = {x['url']: x for x in replicas.estadisticas()['replicas']}
+    comprobar('la réplica inalcanzable queda fuera de la rotación',
+              not estado[caida]['sana'] and estado[replica]['sana'])
+
+    r = cliente.post('/api/libros', json={'title': 'Nuevo', 'author': 'Autor', 'category_id': 1})
+    comprobar('POST /api/libros escribe', r.status_code in (200, 201), r.status_code)
+    with motor_replica.connect() as conexion:
+        en_replica = conexion.execute(select(func.count()).select_from(Book.__table__)).scalar()
+    comprobar('la escritura no llega a la réplica', en_replica == 3, f'{en_replica} libros')
+
+    r = cliente.get('/api/libros')
+    comprobar('tras escribir, el mismo usuario lee de la primaria', origen(r) == 'Nuevo, Primaria', origen(r))
+
+    otro = cliente_admin(app)
+    r = otro.get('/api/libros')
+    comprobar('otro usuario sigue leyendo de la réplica', origen(r) == 'Replica', origen(r))
+
+    time.sleep(PIN_SEGUNDOS + 0.2)
+    r = cliente.get('/api/libros')
+    comprobar('vencido el pin, vuelve a la réplica', origen(r) == 'Replica', origen(r))
+
+    r = cliente.get('/api/reportes/dashboard?reportes=usuarios')
+    usuarios = r.get_json()['reportes']['usuarios'].get('datos') or [{}]
+    comprobar('los reportes del dashboard leen de la réplica', usuarios[0].get('ci') == 'Replica',
+              usuarios[0].get('ci'))
+
+    r = cliente.get('/libros')
+    comprobar('las vistas sin @solo_lectura usan la primaria', b'Primaria' in r.data)
+
+    print('OK' if not fallos else f'{fallos} comprobaciones fallidas')
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == '__main__':
+    main()
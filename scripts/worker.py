@@ -0,0 +1,111 @@
+# scripts/worker.py
+"""
+Worker de trabajos en segundo plano.
+
+Uso:
+    python scripts/worker.py --concurrencia 4 --intervalo 1
+
+Cada hilo reclama trabajos de la tabla `trabajo` y los ejecuta con su
+propia sesión (y por tanto su propia conexión del pool). El primer hilo
+además aplica cada --inventario-cada segundos los libros pendientes del
+resumen de inventario, y cada --mantenimiento-cada segundos devuelve a la
+cola los trabajos huérfanos y borra los terminados hace más de
+--retencion-horas (0 desactiva cada tarea periódica).
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+# Asegura que el root del proyecto esté en sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import app
+from services import trabajos
+from services.inventario import aplicar_pendientes
+
+
+def mantenimiento(numero, retencion_horas):
+    recuperados = trabajos.recuperar_huerfanos()
+    purgados = trabajos.purgar_terminados(retencion_horas)
+    if recuperados or purgados:
+        print(f"[worker {numero}] trabajos: {recuperados} recuperados, {purgados} purgados",
+              flush=True)
+
+
+def bucle(numero, intervalo, detener, inventario_cada=0, mantenimiento_cada=0,
+          retencion_horas=trabajos.RETENCION_HORAS):
+    proximo_inventario = proximo_mantenimiento = 0.0
+    while not detener.is_set():
+        with app.app_context():
+            try:
+                if mantenimiento_cada and time.monotonic() >= proximo_mantenimiento:
+                    proximo_mantenimiento = time.monotonic() + mantenimiento_cada
+                    mantenimiento(numero, retencion_horas)
+                if inventario_cada and time.monotonic() >= proximo_inventario:
+                    proximo_inventario = time.monotonic() + inventario_cada
+                    aplicados = aplicar_pendientes()
+                    if aplicados:
+                        print(f"[worker {numero}] inventario: {aplicados} libros recalculados",
+                              flush=True)
+                trabajo = trabajos.reclamar_siguiente()
+                if trabajo is None:
+                    detener.wait(intervalo)
+                    continue
+                inicio = time.perf_counter()
+                trabajo = trabajos.ejecutar(trabajo)
+                print(f"[worker {numero}] {trabajo.tipo} {trabajo.id} -> {trabajo.estado} "
+                      f"({time.perf_counter() - inicio:.2f}s)", flush=True)
+            except Exception as e:
+                app.logger.error(f'Error en worker {numero}: {str(e)}')
+                detener.wait(intervalo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Worker de trabajos en segundo plano')
+    parser.add_argument('--concurrencia', type=int,
+                        default=int(os.getenv('WORKER_CONCURRENCIA', 2)))
+    parser.add_argument('--intervalo', type=float,
+                        default=float(os.getenv('WORKER_INTERVALO', 1)))
+    parser.add_argument('--inventario-cada', type=float,
+                        default=float(os.getenv('WORKER_INVENTARIO_SEGUNDOS', 30)))
+    parser.add_argument('--mantenimiento-cada', type=float,
+                        default=float(os.getenv('WORKER_MANTENIMIENTO_SEGUNDOS', 300)))
+    parser.add_argument('--retencion-horas', type=float,
+                        default=float(os.getenv('WORKER_RETENCION_HORAS', trabajos.RETENCION_HORAS)))
+    args = parser.parse_args()
+
+    detener = threading.Event()
+    hilos = [
+        threading.Thread(
+            target=bucle,
+            args=(i, args.intervalo, detener),
+            # Las tareas periódicas corren solo en el primer hilo (la primera vez al iniciar)
+            kwargs={
+                'inventario_cada': args.inventario_cada if i == 0 else 0,
+                'mantenimiento_cada': args.mantenimiento_cada if i == 0 else 0,
+                'retencion_horas': args.retencion_horas,
+            },
+            daemon=True
+        )
+        for i in range(args.concurrencia)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    print(f"Worker iniciado con {args.concurrencia} hilos", flush=True)
+
+    try:
+        while any(h.is_alive() for h in hilos):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Deteniendo worker...")
+        detener.set()
+        for hilo in hilos:
+            hilo.join()
+
+
+if __name__ == '__main__':
+    main()
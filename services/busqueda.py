@@ -0,0 +1,84 @@
+# services/busqueda.py
+from sqlalchemy import case, func, literal_column, or_
+
+from models.base import db, es_postgres
+from models.model import Book, Category
+from services.serializacion import Mapeador
+
+# Configuración de text search usada por el trigger de la migración
+TS_CONFIG = 'spanish'
+LIMITE_MAXIMO = 100
+
+
+def buscar_libros(q, limit=20):
+    """
+    Búsqueda ranqueada sobre título, autor, descripción y categoría.
+
+    En PostgreSQL usa la columna books.search_vector (tsvector mantenido por
+    trigger e indexado con GIN); en otros motores (SQLite en pruebas) cae a
+    una búsqueda con ilike y un ranking por campo coincidente.
+    """
+    q = (q or '').strip()
+    if not q:
+        return []
+    limit = max(1, min(limit or 20, LIMITE_MAXIMO))
+
+    if es_postgres():
+        return _buscar_postgres(q, limit)
+    return _buscar_generico(q, limit)
+
+
+def _buscar_postgres(q, limit):
+    vector = literal_column('books.search_vector')
+    consulta = func.websearch_to_tsquery(TS_CONFIG, q)
+    rank = func.ts_rank_cd(vector, consulta).label('rank')
+
+    filas = db.session.query(
+        Book.id, Book.title, Book.author, Book.description,
+        Book.category_id, Category.name.label('category_name'), rank
+    ).outerjoin(
+        Category, Book.category_id == Category.id
+    ).filter(
+        vector.op('@@')(consulta)
+    ).order_by(
+        rank.desc(), Book.id
+    ).limit(limit).all()
+
+    return _fila_a_dict.lista(filas)
+
+
+def _buscar_generico(q, limit):
+    patron = f'%{q}%'
+    rank = (
+        case((Book.title.ilike(patron), 1.0), else_=0.0)
+        + case((Book.author.ilike(patron), 0.4), else_=0.0)
+        + case((Category.name.ilike(patron), 0.2), else_=0.0)
+        + case((Book.description.ilike(patron), 0.1), else_=0.0)
+    ).label('rank')
+
+    filas = db.session.query(
+        Book.id, Book.title, Book.author, Book.description,
+        Book.category_id, Category.name.label('category_name'), rank
+    ).outerjoin(
+        Category, Book.category_id == Category.id
+    ).filter(or_(
+        Book.title.ilike(patron),
+        Book.author.ilike(patron),
+        Book.description.ilike(patron),
+        Category.name.ilike(patron),
+    )).order_by(
+        rank.desc(), Book.id
+    ).limit(limit).all()
+
+    return _fila_a_dict.lista(filas)
+
+
+_fila_a_dict = Mapeador(
+    id='id',
+    title='title',
+    author='author',
+    description='description',
+    category=lambda f: f.category_name or "Sin categoría",
+    category_id='category_id',
+    rank=lambda f: round(float(f.rank or 0), 4)
+)
@@ -0,0 +1,182 @@
+# services/cache.py
+"""
+Caché de datos de referencia (categorías, autores, conteos).
+
+Por defecto vive en memoria del proceso (LRU acotado + TTL). El backend es
+intercambiable: cualquier objeto con get/set/delete/clear sirve, por
+ejemplo un adaptador a Redis para compartirlo entre workers.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import func
+
+from models.base import db
+from models.model import Book, Category, User
+from services.eventos import al_confirmar
+
+AUSENTE = object()
+
+
+class BackendMemoria:
+    """LRU en memoria con expiración por entrada; seguro entre hilos"""
+
+    def __init__(self, max_items=256):
+        self.max_items = max_items
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return AUSENTE
+            valor, expira = entrada
+            if expira is not None and expira < time.monotonic():
+                del self._datos[clave]
+                return AUSENTE
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor, ttl=None):
+        expira = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._datos[clave] = (valor, expira)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_items:
+                self._datos.popitem(last=False)
+
+    def delete(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class CacheReferencia:
+    """
+    Caché con invalidación por tabla.
+
+    Cada clave se declara al importar el módulo junto con las tablas de
+    las que depende, así todos los procesos conocen las mismas
+    dependencias: un commit que modifica alguna de ellas (ver
+    services/eventos.py) borra la clave del backend aunque este proceso
+    nunca la haya cargado.
+    """
+
+    def __init__(self, backend=None, ttl=300):
+        self.backend = backend or BackendMemoria()
+        self.ttl = ttl
+        self._dependencias = {}
+        self._declaradas = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidaciones = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get('CACHE_TTL', self.ttl)
+        max_items = app.config.get('CACHE_MAX_ITEMS')
+        if max_items and isinstance(self.backend, BackendMemoria):
+            self.backend.max_items = max_items
+
+    def declarar(self, clave, tablas):
+        """Registra `clave` y las tablas cuyos cambios la invalidan"""
+        with self._lock:
+            self._declaradas.add(clave)
+            for tabla in tablas:
+                self._dependencias.setdefault(tabla, set()).add(clave)
+        return clave
+
+    def obtener(self, clave, cargar, ttl=None):
+        if clave not in self._declaradas:
+            raise KeyError(f'Clave de caché no declarada: {clave}')
+
+        valor = self.backend.get(clave)
+        if valor is not AUSENTE:
+            with self._lock:
+                self.hits += 1
+            return valor
+
+        with self._lock:
+            self.misses += 1
+        valor = cargar()
+        self.backend.set(clave, valor, ttl or self.ttl)
+        return valor
+
+    def invalidar_tablas(self, tablas):
+        with self._lock:
+            claves = set()
+            for tabla in tablas:
+                claves |= self._dependencias.get(tabla, set())
+            self.invalidaciones += len(claves)
+        for clave in claves:
+            self.backend.delete(clave)
+
+    def limpiar(self):
+        self.backend.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            hits, misses, invalidaciones = self.hits, self.misses, self.invalidaciones
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+            'invalidaciones': invalidaciones,
+            'entradas': len(self.backend) if hasattr(self.backend, '__len__') else None,
+            'ttl': self.ttl
+        }
+
+
+cache_referencia = CacheReferencia()
+
+
+@al_confirmar
+def _invalidar_por_commit(cambios):
+    cache_referencia.invalidar_tablas(cambios.keys())
+
+
+# ==============================================
+# DATOS DE REFERENCIA
+# ==============================================
+
+CATEGORIAS = cache_referencia.declarar('categorias', ('categories',))
+AUTORES = cache_referencia.declarar('autores', ('books',))
+CONTEOS = cache_referencia.declarar('conteos', ('books', 'users', 'categories'))
+
+def categorias_ordenadas():
+    """Categorías ordenadas por nombre como [{'id', 'name'}]"""
+    def cargar():
+        return [
+            {'id': c.id, 'name': c.name}
+            for c in Category.query.with_entities(Category.id, Category.name)
+                                   .order_by(Category.name).all()
+        ]
+    return cache_referencia.obtener(CATEGORIAS, cargar)
+
+
+def autores_distintos():
+    """Lista ordenada de autores distintos del catálogo"""
+    def cargar():
+        autores = db.session.query(Book.author).distinct().all()
+        return sorted(a[0] for a in autores if a[0])
+    return cache_referencia.obtener(AUTORES, cargar)
+
+
+def conteos_catalogo():
+    """Totales de libros, usuarios y categorías"""
+    def cargar():
+        return {
+            'total_books': db.session.query(func.count(Book.id)).scalar(),
+            'total_users': db.session.query(func.count(User.id)).scalar(),
+            'total_categories': db.session.query(func.count(Category.id)).scalar(),
+        }
+    return cache_referencia.obtener(CONTEOS, cargar)
@@ -0,0 +1,394 @@
+# services/carga_masiva.py
+"""
+Alta, actualización y borrado masivo de libros del catálogo.
+
+La importación lee el cuerpo en streaming (arreglo JSON, NDJSON o CSV),
+valida fila por fila y agrupa las válidas en INSERT de varias filas por
+lote, con un commit por lote. Una fila inválida se informa y no detiene
+la carga; si un lote falla en la base, se reintenta fila por fila (con
+savepoints) para aislar la que falla.
+
+La actualización y el borrado son una sentencia UPDATE/DELETE ... WHERE
+id IN (...) por bloque de ids.
+"""
+import codecs
+import csv
+import io
+import json
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.base import db
+from models.model import Book
+from services.cache import categorias_ordenadas
+from services.eventos import registrar_cambios
+
+TAMANO_LOTE = 1000
+TAMANO_BLOQUE = 1000
+MAX_ERRORES = 500
+LARGO_MAXIMO = 128
+# Un elemento inválido sin cierre no puede retener más que esto en memoria
+LARGO_MAXIMO_ELEMENTO = 1024 * 1024
+FORMATOS = ('json', 'ndjson', 'csv')
+CAMPOS_ACTUALIZABLES = ('title', 'author', 'description', 'category_id')
+
+
+class ErrorCarga(ValueError):
+    """Cuerpo o parámetros de una operación masiva no válidos"""
+
+
+# ==============================================
+# LECTURA EN STREAMING
+# ==============================================
+
+def detectar_formato(tipo_contenido, nombre_archivo=None):
+    nombre = (nombre_archivo or '').lower()
+    for extension, formato in (('.csv', 'csv'), ('.ndjson', 'ndjson'),
+                               ('.jsonl', 'ndjson'), ('.json', 'json')):
+        if nombre.endswith(extension):
+            return formato
+
+    tipo = (tipo_contenido or '').split(';')[0].strip().lower()
+    return {
+        'application/json': 'json',
+        'application/x-ndjson': 'ndjson',
+        'application/jsonl': 'ndjson',
+        'text/csv': 'csv',
+    }.get(tipo)
+
+
+def leer_filas(flujo, formato):
+    """Genera (número de fila, dict o None, error o None) desde un flujo de bytes"""
+    if formato == 'csv':
+        return _leer_csv(flujo)
+    if formato == 'ndjson':
+        return _leer_ndjson(flujo)
+    if formato == 'json':
+        return _leer_arreglo_json(flujo)
+    raise ErrorCarga(f'Formato no soportado; use uno de: {", ".join(FORMATOS)}')
+
+
+def _texto(flujo):
+    return io.TextIOWrapper(flujo, encoding='utf-8-sig', newline='')
+
+
+def _leer_csv(flujo):
+    lector = csv.DictReader(_texto(flujo))
+    # La fila 1 es el encabezado
+    for numero, fila in enumerate(lector, 2):
+        yield numero, fila, None
+
+
+def _leer_ndjson(flujo):
+    numero = 0
+    for linea in _texto(flujo):
+        numero += 1
+        if not linea.strip():
+            continue
+        try:
+            yield numero, json.loads(linea), None
+        except ValueError as e:
+            yield numero, None, f'JSON inválido: {e}'
+
+
+def _fin_elemento(buffer, pos):
+    """
+    Posición de la ',' o ']' que cierra el elemento que empieza en pos
+    (fuera de cadenas y a profundidad 0), o -1 si aún no está en el buffer.
+    """
+    profundidad = 0
+    en_cadena = escapado = False
+    for i in range(pos, len(buffer)):
+        caracter = buffer[i]
+        if en_cadena:
+            if escapado:
+                escapado = False
+            elif caracter == '\\':
+                escapado = True
+            elif caracter == '"':
+                en_cadena = False
+        elif caracter == '"':
+            en_cadena = True
+        elif caracter in '[{':
+            profundidad += 1
+        elif profundidad:
+            if caracter in ']}':
+                profundidad -= 1
+        elif caracter in ',]':
+            return i
+    return -1
+
+
+def _leer_arreglo_json(flujo, tamano_bloque=64 * 1024):
+    """
+    Recorre un arreglo JSON elemento por elemento sin cargarlo completo:
+    decodifica cada valor con raw_decode en cuanto está entero en el buffer.
+    Un elemento inválido se informa y se salta hasta la siguiente ',' o ']'
+    de primer nivel, sin cortar la lectura del resto.
+    """
+    decodificador = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer, pos = '', 0
+    fin_flujo = False
+    abierto = False
+    # Después de un elemento solo se acepta ',' o ']'
+    esperando_separador = False
+    numero = 0
+
+    def saltar_espacios(pos):
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+            pos += 1
+        return pos
+
+    while True:
+        pos = saltar_espacios(pos)
+        if pos < len(buffer):
+            caracter = buffer[pos]
+            if not abierto:
+                if caracter != '[':
+                    raise ErrorCarga('Se esperaba un arreglo JSON')
+                abierto = True
+                pos += 1
+                continue
+            if caracter == ']':
+                return
+            if esperando_separador:
+                if caracter == ',':
+                    esperando_separador = False
+                    pos += 1
+                    continue
+                error = "Falta ',' entre elementos"
+            elif caracter == ',':
+                numero += 1
+                yield numero, None, 'Elemento vacío'
+                pos += 1
+                continue
+            else:
+                try:
+                    valor, fin = decodificador.raw_decode(buffer, pos)
+                except ValueError as e:
+                    error = f'JSON inválido: {e}'
+                else:
+                    # Un número al final del buffer puede continuar en el bloque siguiente
+                    if fin < len(buffer) or fin_flujo:
+                        numero += 1
+                        esperando_separador = True
+                        pos = fin
+                        yield numero, valor, None
+                        continue
+                    error = None
+
+            if error is not None:
+                # Si el elemento está completo en el buffer es inválido: se salta.
+                # Si no, puede ser un valor cortado al final del buffer: se lee más
+                fin = _fin_elemento(buffer, pos)
+                if fin >= 0 or fin_flujo:
+                    numero += 1
+                    yield numero, None, error
+                    if fin < 0:
+                        return
+                    esperando_separador = False
+                    pos = fin + 1 if buffer[fin] == ',' else fin
+                    continue
+                if len(buffer) - pos > LARGO_MAXIMO_ELEMENTO:
+                    yield numero + 1, None, f'{error} (elemento de más de {LARGO_MAXIMO_ELEMENTO} caracteres)'
+                    return
+
+        if fin_flujo:
+            if not abierto:
+                raise ErrorCarga('Cuerpo vacío')
+            yield numero + 1, None, 'Arreglo JSON sin cerrar'
+            return
+
+        bloque = flujo.read(tamano_bloque)
+        buffer, pos = buffer[pos:], 0
+        if bloque:
+            buffer += utf8.decode(bloque)
+        else:
+            fin_flujo = True
+            buffer += utf8.decode(b'', final=True)
+
+
+# ==============================================
+# VALIDACIÓN E INSERCIÓN
+# ==============================================
+
+def _categorias():
+    categorias = categorias_ordenadas()
+    return {c['id'] for c in categorias}, {c['name'].lower(): c['id'] for c in categorias}
+
+
+def validar_fila(fila, ids_categoria, categorias_por_nombre):
+    """Devuelve (valores para INSERT, None) o (None, mensaje de error)"""
+    if not isinstance(fila, dict):
+        return None, 'Cada fila debe ser un objeto'
+
+    valores = {}
+    for campo in ('title', 'author'):
+        valor = fila.get(campo)
+        valor = valor.strip() if isinstance(valor, str) else valor
+        if not valor:
+            return None, f'Campo requerido faltante: {campo}'
+        if not isinstance(valor, str):
+            return None, f'El campo {campo} debe ser texto'
+        if len(valor) > LARGO_MAXIMO:
+            return None, f'El campo {campo} supera {LARGO_MAXIMO} caracteres'
+        valores[campo] = valor
+
+    descripcion = fila.get('description') or ''
+    if not isinstance(descripcion, str):
+        return None, 'El campo description debe ser texto'
+    valores['description'] = descripcion
+
+    categoria = fila.get('category_id')
+    if categoria in (None, ''):
+        nombre = fila.get('category')
+        nombre = nombre.strip() if isinstance(nombre, str) else None
+        categoria = categorias_por_nombre.get(nombre.lower()) if nombre else None
+        if nombre and categoria is None:
+            return None, f'Categoría no encontrada: {nombre}'
+    else:
+        try:
+            categoria = int(categoria)
+        except (TypeError, ValueError):
+            return None, 'category_id debe ser un entero'
+        if categoria not in ids_categoria:
+            return None, f'Categoría no encontrada: {categoria}'
+    valores['category_id'] = categoria
+    return valores, None
+
+
+def _insertar_lote(lote, errores):
+    """Inserta [(fila, valores)]; devuelve cuántas filas entraron"""
+    try:
+        db.session.execute(insert(Book), [valores for _, valores in lote])
+        registrar_cambios(db.session, Book.__tablename__)
+        db.session.commit()
+        return len(lote)
+    except SQLAlchemyError:
+        db.session.rollback()
+
+    insertadas = 0
+    for numero, valores in lote:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(Book), [valores])
+            insertadas += 1
+        except SQLAlchemyError as e:
+            errores.append((numero, str(getattr(e, 'orig', e))))
+    # Se registra al final: el rollback de un savepoint descarta lo registrado
+    registrar_cambios(db.session, Book.__tablename__)
+    db.session.commit()
+    return insertadas
+
+
+def importar_libros(filas, lote=TAMANO_LOTE):
+    """
+    Consume (número, fila, error) de leer_filas() e inserta las válidas.
+    Devuelve el resumen con los errores por fila (hasta MAX_ERRORES).
+    """
+    ids_categoria, categorias_por_nombre = _categorias()
+    pendientes = []
+    errores = []
+    total = insertadas = 0
+
+    for numero, fila, error in filas:
+        total += 1
+        if error is None:
+            valores, error = validar_fila(fila, ids_categoria, categorias_por_nombre)
+        if error is not None:
+            errores.append((numero, error))
+            continue
+
+        pendientes.append((numero, valores))
+        if len(pendientes) >= lote:
+            insertadas += _insertar_lote(pendientes, errores)
+            pendientes = []
+
+    if pendientes:
+        insertadas += _insertar_lote(pendientes, errores)
+
+    return {
+        'total_filas': total,
+        'insertados': insertadas,
+        'con_error': len(errores),
+        'errores': [{'fila': n, 'error': e} for n, e in errores[:MAX_ERRORES]],
+        'errores_omitidos': max(0, len(errores) - MAX_ERRORES)
+    }
+
+
+# ==============================================
+# ACTUALIZACIÓN Y BORRADO POR IDS
+# ==============================================
+
+def _validar_ids(ids):
+    if not isinstance(ids, list) or not ids:
+        raise ErrorCarga('Se requiere una lista no vacía de ids')
+    try:
+        return sorted({int(i) for i in ids})
+    except (TypeError, ValueError):
+        raise ErrorCarga('Los ids deben ser enteros')
+
+
+def _bloques(ids):
+    for i in range(0, len(ids), TAMANO_BLOQUE):
+        yield ids[i:i + TAMANO_BLOQUE]
+
+
+def actualizar_libros(ids, cambios):
+    """Aplica los mismos cambios a todos los libros indicados; devuelve cuántos cambiaron"""
+    ids = _validar_ids(ids)
+    if not isinstance(cambios, dict) or not cambios:
+        raise ErrorCarga('Se requiere un objeto de cambios')
+    invalidos = set(cambios) - set(CAMPOS_ACTUALIZABLES)
+    if invalidos:
+        raise ErrorCarga(f'Campos no actualizables: {", ".join(sorted(invalidos))}')
+
+    ids_categoria, categorias_por_nombre = _categorias()
+    if 'category_id' in cambios and cambios['category_id'] is not None:
+        try:
+            cambios['category_id'] = int(cambios['category_id'])
+        except (TypeError, ValueError):
+            raise ErrorCarga('category_id debe ser un entero')
+        if cambios['category_id'] not in ids_categoria:
+            raise ErrorCarga(f"Categoría no encontrada: {cambios['category_id']}")
+    for campo in ('title', 'author'):
+        if campo in cambios:
+            valor = cambios[campo]
+            if not isinstance(valor, str) or not valor.strip():
+                raise ErrorCarga(f'El campo {campo} no puede estar vacío')
+            if len(valor) > LARGO_MAXIMO:
+                raise ErrorCarga(f'El campo {campo} supera {LARGO_MAXIMO} caracteres')
+
+    actualizados = 0
+    try:
+        for bloque in _bloques(ids):
+            actualizados += db.session.execute(
+                update(Book).where(Book.id.in_(bloque)).values(**cambios)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        registrar_cambios(db.session, Book.__tablename__, ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return actualizados
+
+
+def eliminar_libros(ids):
+    """Borra los libros indicados; devuelve cuántos existían"""
+    ids = _validar_ids(ids)
+    eliminados = 0
+    try:
+        for bloque in _bloques(ids):
+            eliminados += db.session.execute(
+                delete(Book).where(Book.id.in_(bloque))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        registrar_cambios(db.session, Book.__tablename__, ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return eliminados
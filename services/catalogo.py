@@ -0,0 +1,93 @@
+# services/catalogo.py
+from sqlalchemy import select
+
+from models.base import db
+from models.model import Book, Category
+from services.serializacion import Mapeador, a_json
+from services.versiones import registrar_tablas
+
+# Tablas de las que dependen las respuestas del catálogo (ETag)
+TABLAS_CATALOGO = registrar_tablas('books', 'categories')
+# Representaciones de la lista de libros, negociadas por Accept
+FORMATOS_LIBROS = ('application/json', 'application/x-ndjson')
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 500
+TAMANO_LOTE_STREAM = 500
+
+
+def consulta_libros(autor=None, categoria_id=None, after_id=None):
+    """
+    SELECT de columnas de libros con el nombre de su categoría.
+
+    El orden por Book.id es estable y permite paginar por keyset
+    (WHERE id > :after_id) usando la clave primaria.
+    """
+    stmt = select(
+        Book.id, Book.title, Book.author, Book.description,
+        Book.category_id, Category.name.label('category_name')
+    ).outerjoin(
+        Category, Book.category_id == Category.id
+    )
+    if autor:
+        stmt = stmt.where(Book.author == autor)
+    if categoria_id:
+        stmt = stmt.where(Book.category_id == categoria_id)
+    if after_id:
+        stmt = stmt.where(Book.id > after_id)
+    return stmt.order_by(Book.id)
+
+
+libro_a_dict = Mapeador(
+    id='id',
+    title='title',
+    author='author',
+    description='description',
+    category=lambda f: f.category_name or "Sin categoría",
+    category_id='category_id'
+)
+
+# Detalle de un libro: la categoría como objeto
+libro_detalle_a_dict = Mapeador(
+    id='id',
+    title='title',
+    author='author',
+    description='description',
+    category_id='category_id',
+    category=lambda f: {"id": f.category_id, "name": f.category_name} if f.category_name else None
+)
+
+
+def pagina_libros(stmt, limit=LIMITE_POR_DEFECTO):
+    """Devuelve una página de libros y el cursor para pedir la siguiente"""
+    limit = max(1, min(limit or LIMITE_POR_DEFECTO, LIMITE_MAXIMO))
+
+    # Se pide una fila extra para saber si hay más páginas sin hacer COUNT
+    filas = db.session.execute(stmt.limit(limit + 1)).all()
+    hay_mas = len(filas) > limit
+    filas = filas[:limit]
+
+    return {
+        "libros": libro_a_dict.lista(filas),
+        "next_cursor": filas[-1].id if hay_mas else None
+    }
+
+
+def stream_libros_ndjson(stmt, limit=None):
+    """
+    Generador NDJSON: una línea JSON por libro.
+
+    Las filas se leen por lotes desde un cursor del lado del servidor
+    (yield_per), así la memoria por petición no depende del tamaño del catálogo.
+    """
+    if limit:
+        stmt = stmt.limit(limit)
+
+    resultado = db.session.execute(
+        stmt.execution_options(yield_per=TAMANO_LOTE_STREAM)
+    )
+    try:
+        for fila in resultado:
+            yield a_json(libro_a_dict(fila)) + b'\n'
+    finally:
+        resultado.close()
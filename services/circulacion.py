@@ -0,0 +1,310 @@
+# services/circulacion.py
+"""
+Analítica de circulación sobre un resumen diario.
+
+circulacion_diaria guarda, por día, género e idioma, los ejemplares
+prestados, los devueltos y los ingresos (precio_alquiler repartido entre
+las ediciones del préstamo). id_genero = 0 agrupa todos los géneros: un
+libro con dos géneros cuenta en ambos, así que los totales y los
+desgloses por idioma salen de esas filas y no de sumar géneros.
+
+prestar() y devolver() suman sus filas al resumen en la misma transacción
+(registrar_prestamo / registrar_devolucion), al final para retener lo
+menos posible los bloqueos de las filas del día. reconstruir_circulacion()
+recalcula un rango de fechas desde las tablas de préstamos (carga inicial
+o reparación). tendencias() solo lee el resumen: un año son unas pocas
+miles de filas, sin tocar prestamo ni sus uniones.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import (
+    Float, and_, case, cast, delete, func, insert, literal, or_, select, true, union_all, update
+)
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models.base import db, es_postgres
+from models.model import (
+    CirculacionDiaria, Edicion, EstadoEnum, Genero, Libro, LibroGenero,
+    Prestamo, PrestamoEdicion
+)
+from services.eventos import registrar_cambios
+
+TODOS_LOS_GENEROS = 0
+GRANULARIDADES = ('day', 'week', 'month')
+DIAS_POR_DEFECTO = 30
+MAX_PERIODOS = 1000
+
+COLUMNAS = ['fecha', 'id_genero', 'idioma', 'prestamos', 'devoluciones', 'ingresos']
+METRICAS = ('prestamos', 'devoluciones', 'ingresos')
+
+
+class ErrorTendencias(ValueError):
+    """Parámetros de la consulta de tendencias no válidos"""
+
+
+# ==============================================
+# CÁLCULO DESDE LOS PRÉSTAMOS
+# ==============================================
+
+def _precio():
+    """precio_alquiler (texto) como número; los valores no numéricos cuentan 0"""
+    if es_postgres():
+        return case(
+            (Prestamo.precio_alquiler.op('~')(r'^\s*[0-9]+(\.[0-9]+)?\s*$'),
+             cast(Prestamo.precio_alquiler, Float)),
+            else_=0.0
+        )
+    # SQLite convierte el texto no numérico en 0
+    return cast(Prestamo.precio_alquiler, Float)
+
+
+def _items(*condiciones):
+    """Una fila por edición prestada, con su parte del precio del préstamo"""
+    ediciones_del_prestamo = func.count().over(partition_by=PrestamoEdicion.id_prestamo)
+    return select(
+        Prestamo.fecha_prestamo,
+        Prestamo.fecha_devolucion,
+        Prestamo.estado_actual,
+        Edicion.id_libro,
+        (_precio() / ediciones_del_prestamo).label('ingreso')
+    ).join(
+        PrestamoEdicion, PrestamoEdicion.id_prestamo == Prestamo.id_prestamo
+    ).join(
+        Edicion, Edicion.id_edicion == PrestamoEdicion.id_edicion
+    ).where(*condiciones).subquery()
+
+
+def _en_rango(columna, desde, hasta):
+    condiciones = []
+    if desde is not None:
+        condiciones.append(columna >= desde)
+    if hasta is not None:
+        condiciones.append(columna <= hasta)
+    return and_(true(), *condiciones)
+
+
+def _eventos(items, desde=None, hasta=None, prestamos=True, devoluciones=True):
+    """Salidas (en fecha_prestamo) y devoluciones (en fecha_devolucion) por libro"""
+    partes = []
+    if prestamos:
+        partes.append(select(
+            items.c.fecha_prestamo.label('fecha'), items.c.id_libro,
+            literal(1).label('prestamos'), literal(0).label('devoluciones'),
+            items.c.ingreso.label('ingresos')
+        ).where(_en_rango(items.c.fecha_prestamo, desde, hasta)))
+    if devoluciones:
+        partes.append(select(
+            items.c.fecha_devolucion.label('fecha'), items.c.id_libro,
+            literal(0).label('prestamos'), literal(1).label('devoluciones'),
+            literal(0.0).label('ingresos')
+        ).where(
+            items.c.estado_actual == EstadoEnum.DEVUELTO,
+            _en_rango(items.c.fecha_devolucion, desde, hasta)
+        ))
+    return (union_all(*partes) if len(partes) > 1 else partes[0]).subquery()
+
+
+def _consulta_resumen(eventos):
+    """Filas de circulacion_diaria (total por idioma y por género) para los eventos"""
+    sumas = (
+        func.sum(eventos.c.prestamos).label('prestamos'),
+        func.sum(eventos.c.devoluciones).label('devoluciones'),
+        func.sum(eventos.c.ingresos).label('ingresos'),
+    )
+    todos = select(
+        eventos.c.fecha, literal(TODOS_LOS_GENEROS).label('id_genero'), Libro.idioma, *sumas
+    ).join(
+        Libro, Libro.id_libro == eventos.c.id_libro
+    ).group_by(eventos.c.fecha, Libro.idioma)
+
+    por_genero = select(
+        eventos.c.fecha, LibroGenero.id_genero, Libro.idioma, *sumas
+    ).join(
+        Libro, Libro.id_libro == eventos.c.id_libro
+    ).join(
+        LibroGenero, LibroGenero.id_libro == eventos.c.id_libro
+    ).group_by(eventos.c.fecha, LibroGenero.id_genero, Libro.idioma)
+
+    return union_all(todos, por_genero)
+
+
+# ==============================================
+# MANTENIMIENTO INCREMENTAL
+# ==============================================
+
+def _acumular(consulta):
+    """Suma las filas de la consulta al resumen (upsert con incremento)"""
+    filas = sorted(
+        (dict(fila._mapping) for fila in db.session.execute(consulta)),
+        # Orden fijo de claves: dos transacciones no se bloquean en orden inverso
+        key=lambda f: (f['fecha'], f['id_genero'], f['idioma'])
+    )
+    if not filas:
+        return
+
+    tabla = CirculacionDiaria.__table__
+    if es_postgres() or db.engine.dialect.name == 'sqlite':
+        dialecto = postgresql if es_postgres() else sqlite
+        stmt = dialecto.insert(tabla)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[tabla.c.fecha, tabla.c.id_genero, tabla.c.idioma],
+            set_={m: tabla.c[m] + stmt.excluded[m] for m in METRICAS}
+        ), filas)
+    else:
+        for fila in filas:
+            actualizadas = db.session.execute(
+                update(tabla)
+                .where(tabla.c.fecha == fila['fecha'], tabla.c.id_genero == fila['id_genero'],
+                       tabla.c.idioma == fila['idioma'])
+                .values({m: tabla.c[m] + fila[m] for m in METRICAS})
+            ).rowcount
+            if not actualizadas:
+                db.session.execute(insert(tabla), fila)
+    registrar_cambios(db.session, CirculacionDiaria.__tablename__)
+
+
+def registrar_prestamo(id_prestamo):
+    """Suma la salida de un préstamo (dentro de la transacción de prestar)"""
+    items = _items(Prestamo.id_prestamo == id_prestamo)
+    _acumular(_consulta_resumen(_eventos(items, devoluciones=False)))
+
+
+def registrar_devolucion(id_prestamo):
+    """Suma la devolución de un préstamo (dentro de la transacción de devolver)"""
+    items = _items(Prestamo.id_prestamo == id_prestamo)
+    _acumular(_consulta_resumen(_eventos(items, prestamos=False)))
+
+
+def reconstruir_circulacion(desde=None, hasta=None):
+    """Recalcula el resumen de un rango de fechas (todo, sin límites) desde los préstamos"""
+    borrar = delete(CirculacionDiaria).where(_en_rango(CirculacionDiaria.fecha, desde, hasta))
+    db.session.execute(borrar)
+
+    # Préstamos con alguna fecha (salida o devolución) dentro del rango
+    items = _items(or_(
+        _en_rango(Prestamo.fecha_prestamo, desde, hasta),
+        and_(Prestamo.estado_actual == EstadoEnum.DEVUELTO,
+             _en_rango(Prestamo.fecha_devolucion, desde, hasta))
+    ))
+    db.session.execute(
+        insert(CirculacionDiaria).from_select(
+            COLUMNAS, _consulta_resumen(_eventos(items, desde, hasta))
+        )
+    )
+    filas = db.session.execute(
+        select(func.count()).select_from(CirculacionDiaria)
+        .where(_en_rango(CirculacionDiaria.fecha, desde, hasta))
+    ).scalar()
+    registrar_cambios(db.session, CirculacionDiaria.__tablename__)
+    db.session.commit()
+    return filas
+
+
+# ==============================================
+# CONSULTA
+# ==============================================
+
+def inicio_periodo(fecha, granularidad):
+    if granularidad == 'week':
+        return fecha - timedelta(days=fecha.weekday())
+    if granularidad == 'month':
+        return fecha.replace(day=1)
+    return fecha
+
+
+def _periodos(desde, hasta, granularidad):
+    periodo = inicio_periodo(desde, granularidad)
+    while periodo <= hasta:
+        yield periodo
+        if granularidad == 'month':
+            periodo = (periodo + timedelta(days=32)).replace(day=1)
+        else:
+            periodo += timedelta(days=7 if granularidad == 'week' else 1)
+
+
+def interpretar_rango(desde, hasta, granularidad):
+    """Valida los parámetros de texto; devuelve (desde, hasta, granularidad)"""
+    granularidad = granularidad or 'day'
+    if granularidad not in GRANULARIDADES:
+        raise ErrorTendencias(f"granularity debe ser uno de: {', '.join(GRANULARIDADES)}")
+    try:
+        hasta = date.fromisoformat(hasta) if hasta else date.today()
+        desde = date.fromisoformat(desde) if desde else hasta - timedelta(days=DIAS_POR_DEFECTO - 1)
+    except ValueError:
+        raise ErrorTendencias('Las fechas deben tener formato AAAA-MM-DD')
+    if desde > hasta:
+        raise ErrorTendencias('from debe ser anterior o igual a to')
+
+    dias = (hasta - desde).days + 1
+    aproximados = {'day': dias, 'week': dias / 7, 'month': dias / 30}[granularidad]
+    if aproximados > MAX_PERIODOS:
+        raise ErrorTendencias(f'El rango excede {MAX_PERIODOS} periodos; use una granularidad mayor')
+    return desde, hasta, granularidad
+
+
+def _serie(valores, periodos):
+    serie = []
+    for periodo in periodos:
+        prestamos, devoluciones, ingresos = valores.get(periodo, (0, 0, 0))
+        serie.append({
+            'periodo': periodo.isoformat(),
+            'prestamos': prestamos,
+            'devoluciones': devoluciones,
+            'ingresos': round(float(ingresos), 2),
+        })
+    return serie
+
+
+def tendencias(desde, hasta, granularidad='day'):
+    """
+    Series por periodo (total, por género y por idioma) leídas solo del
+    resumen. Cada serie incluye todos los periodos del rango, con ceros.
+    """
+    c = CirculacionDiaria
+    en_rango = c.fecha.between(desde, hasta)
+
+    def acumular(destino, clave, periodo, fila):
+        actual = destino.setdefault(clave, {}).get(periodo, (0, 0, 0))
+        destino[clave][periodo] = (
+            actual[0] + fila.prestamos, actual[1] + fila.devoluciones, actual[2] + fila.ingresos
+        )
+
+    total, por_idioma, por_genero = {}, {}, {}
+    for fila in db.session.execute(
+        select(c.fecha, c.idioma, c.prestamos, c.devoluciones, c.ingresos)
+        .where(c.id_genero == TODOS_LOS_GENEROS, en_rango)
+    ):
+        periodo = inicio_periodo(fila.fecha, granularidad)
+        acumular(total, None, periodo, fila)
+        acumular(por_idioma, fila.idioma, periodo, fila)
+
+    for fila in db.session.execute(
+        select(
+            c.fecha, c.id_genero,
+            func.sum(c.prestamos).label('prestamos'),
+            func.sum(c.devoluciones).label('devoluciones'),
+            func.sum(c.ingresos).label('ingresos')
+        ).where(c.id_genero != TODOS_LOS_GENEROS, en_rango).group_by(c.fecha, c.id_genero)
+    ):
+        acumular(por_genero, fila.id_genero, inicio_periodo(fila.fecha, granularidad), fila)
+
+    nombres = dict(db.session.execute(
+        select(Genero.id_genero, Genero.nombre_genero).where(Genero.id_genero.in_(list(por_genero)))
+    ).all()) if por_genero else {}
+
+    periodos = list(_periodos(desde, hasta, granularidad))
+    return {
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'granularidad': granularidad,
+        'total': _serie(total.get(None, {}), periodos),
+        'por_genero': [{
+            'id_genero': id_genero,
+            'genero': nombres.get(id_genero),
+            'serie': _serie(valores, periodos)
+        } for id_genero, valores in sorted(por_genero.items())],
+        'por_idioma': [{
+            'idioma': idioma,
+            'serie': _serie(valores, periodos)
+        } for idioma, valores in sorted(por_idioma.items())],
+    }
@@ -0,0 +1,57 @@
+# services/estadisticas.py
+from sqlalchemy import func
+
+from models.base import db
+from models.model import Book
+from services.cache import categorias_ordenadas
+
+
+def filtrar_libros(query, title=None, author=None, cat_id=None):
+    """Aplica los filtros del dashboard (título, autor, categoría) a una consulta de Book"""
+    if title:
+        query = query.filter(Book.title.ilike(f'%{title}%'))
+    if author:
+        query = query.filter(Book.author.ilike(f'%{author}%'))
+    if cat_id:
+        query = query.filter(Book.category_id == cat_id)
+    return query
+
+
+def estadisticas_dashboard(title=None, author=None, cat_id=None, top=5):
+    """
+    Calcula los indicadores del dashboard con agregados en SQL.
+
+    Devuelve solo lo que necesitan los gráficos de index.html:
+    total de libros, conteo por categoría y los autores con más libros.
+    """
+    base = filtrar_libros(db.session.query(Book), title, author, cat_id)
+
+    total_books = base.with_entities(func.count(Book.id)).scalar() or 0
+
+    # Conteo por categoría (GROUP BY category_id)
+    conteos = dict(
+        base.with_entities(Book.category_id, func.count(Book.id))
+        .group_by(Book.category_id)
+        .all()
+    )
+    cat_data = [
+        {'label': c['name'], 'count': conteos.get(c['id'], 0)}
+        for c in categorias_ordenadas()
+    ]
+
+    # Top autores (GROUP BY author ORDER BY count DESC LIMIT top)
+    total = func.count(Book.id).label('total')
+    top_auth = (
+        base.with_entities(Book.author, total)
+        .group_by(Book.author)
+        .order_by(total.desc(), Book.author)
+        .limit(top)
+        .all()
+    )
+    top_auth_data = [{'label': a, 'count': n} for a, n in top_auth]
+
+    return {
+        'total_books': total_books,
+        'cat_data': cat_data,
+        'top_auth': top_auth_data,
+    }
@@ -0,0 +1,80 @@
+# services/eventos.py
+"""
+Seguimiento de las tablas modificadas en cada transacción.
+
+Los flush del ORM se registran solos; las escrituras hechas con Core o SQL
+directo deben avisar con registrar_cambios(). Al confirmar la transacción
+se notifica a los suscriptores (caché, índices en memoria, etc.) con un
+diccionario {tabla: set(ids)}; un set vacío significa "ids desconocidos".
+"""
+import logging
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_CLAVE = 'tablas_modificadas'
+# Tablas con alguna escritura de ids desconocidos: se publican con set vacío
+_SIN_IDS = 'tablas_sin_ids'
+_suscriptores = []
+
+
+def al_confirmar(fn):
+    """Registra una función a llamar con los cambios de cada commit"""
+    _suscriptores.append(fn)
+    return fn
+
+
+def registrar_cambios(session, tabla, ids=None):
+    """Marca una tabla como modificada en la transacción actual de la sesión"""
+    cambios = session.info.setdefault(_CLAVE, {})
+    pendientes = cambios.setdefault(tabla, set())
+    if ids:
+        pendientes.update(ids)
+    else:
+        session.info.setdefault(_SIN_IDS, set()).add(tabla)
+
+
+def hay_cambios(session):
+    """Si la transacción actual de la sesión ya modificó alguna tabla"""
+    return bool(session.info.get(_CLAVE))
+
+
+def _registrar_objetos(session, objetos):
+    for obj in objetos:
+        tabla = getattr(obj, '__tablename__', None)
+        if not tabla:
+            continue
+        # En after_flush los objetos nuevos aún no tienen identity key, pero
+        # sus columnas de clave primaria ya tienen el valor asignado
+        clave = inspect(obj).mapper.primary_key_from_instance(obj)
+        registrar_cambios(session, tabla, None if clave[0] is None else [clave[0]])
+
+
+@event.listens_for(Session, 'after_flush')
+def _despues_de_flush(session, flush_context):
+    _registrar_objetos(session, session.new)
+    _registrar_objetos(session, session.dirty)
+    _registrar_objetos(session, session.deleted)
+
+
+@event.listens_for(Session, 'after_commit')
+def _despues_de_commit(session):
+    cambios = session.info.pop(_CLAVE, None)
+    for tabla in session.info.pop(_SIN_IDS, ()):
+        cambios[tabla] = set()
+    if not cambios:
+        return
+    for fn in _suscriptores:
+        try:
+            fn(cambios)
+        except Exception:
+            # El commit ya se hizo: un suscriptor con error no debe romper la petición
+            logger.exception('Error notificando cambios a %s', fn.__name__)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _despues_de_rollback(session, previous_transaction):
+    session.info.pop(_CLAVE, None)
+    session.info.pop(_SIN_IDS, None)
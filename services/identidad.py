@@ -0,0 +1,93 @@
+# services/identidad.py
+"""
+Caché de identidades para flask-login.
+
+load_user() se ejecuta en cada petición autenticada; en lugar de
+reconstruir el modelo User desde la base de datos cada vez, se guarda un
+registro inmutable (id, ci, role) en un LRU con TTL corto. Cualquier
+commit que modifique la fila del usuario (rol, contraseña...) invalida su
+entrada.
+"""
+import threading
+from dataclasses import dataclass
+
+from flask_login import UserMixin
+
+from models.base import db
+from models.model import User
+from services.cache import BackendMemoria, AUSENTE
+from services.eventos import al_confirmar
+
+
+@dataclass(frozen=True, eq=False)
+class IdentidadUsuario(UserMixin):
+    """Vista liviana y de solo lectura de un User autenticado"""
+    id: int
+    ci: str
+    role: str
+
+
+class CacheUsuarios:
+    def __init__(self, max_items=1024, ttl=60):
+        self.backend = BackendMemoria(max_items=max_items)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.peticiones = 0
+        self.consultas_db = 0
+        self.invalidaciones = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+        self.backend.max_items = app.config.get('USER_CACHE_MAX_ITEMS', self.backend.max_items)
+
+    def cargar(self, user_id):
+        """Devuelve la identidad del usuario, consultando la base solo si no está en caché"""
+        with self._lock:
+            self.peticiones += 1
+
+        identidad = self.backend.get(user_id)
+        if identidad is not AUSENTE:
+            return identidad
+
+        with self._lock:
+            self.consultas_db += 1
+        fila = db.session.query(User.id, User.ci, User.role).filter(User.id == user_id).first()
+        if fila is None:
+            return None
+
+        identidad = IdentidadUsuario(id=fila.id, ci=fila.ci, role=fila.role)
+        self.backend.set(user_id, identidad, self.ttl)
+        return identidad
+
+    def invalidar(self, ids=None):
+        """Descarta las identidades indicadas, o todas si no se conocen los ids"""
+        if ids:
+            for user_id in ids:
+                self.backend.delete(user_id)
+            self.invalidaciones += len(ids)
+        else:
+            self.backend.clear()
+            self.invalidaciones += 1
+
+    def estadisticas(self):
+        ahorradas = self.peticiones - self.consultas_db
+        return {
+            'peticiones': self.peticiones,
+            'consultas_db': self.consultas_db,
+            'consultas_ahorradas': ahorradas,
+            'consultas_db_por_peticion': (
+                round(self.consultas_db / self.peticiones, 4) if self.peticiones else None
+            ),
+            'invalidaciones': self.invalidaciones,
+            'entradas': len(self.backend),
+            'ttl': self.ttl
+        }
+
+
+cache_usuarios = CacheUsuarios()
+
+
+@al_confirmar
+def _invalidar_usuarios(cambios):
+    if User.__tablename__ in cambios:
+        cache_usuarios.invalidar(cambios[User.__tablename__])
@@ -0,0 +1,168 @@
+# services/inventario.py
+"""
+Resumen de inventario mantenido incrementalmente.
+
+inventario_resumen guarda una fila por libro con sus géneros y copias
+disponibles. Cuando cambian copias, ediciones o géneros se anota el libro
+en inventario_pendiente (triggers en PostgreSQL o marcar_pendientes()
+desde la aplicación) y aplicar_pendientes() recalcula solo esos libros.
+La aplicación corre en el worker (scripts/worker.py, periódicamente o con
+la tarea 'aplicar_inventario') o con el comando aplicar-inventario, nunca
+al leer: la lectura informa actualizado_en y cuántos libros esperan.
+"""
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert, literal, select
+
+from models.base import db, es_postgres
+from models.model import (
+    Libro, LibroGenero, Genero, Edicion, Copia,
+    EstadoProceso, InventarioResumen, InventarioPendiente
+)
+from services.eventos import registrar_cambios
+
+PROCESO = 'inventario_resumen'
+
+
+def _agregar_generos(columna):
+    if es_postgres():
+        return func.string_agg(columna, ', ')
+    return func.group_concat(columna, ', ')
+
+
+def consulta_inventario(ids=None):
+    """
+    SELECT que calcula el inventario por libro.
+
+    Géneros y copias se agregan por separado antes de unirlos a libro para
+    que un libro con varios géneros no multiplique su suma de copias.
+    """
+    generos = select(
+        LibroGenero.id_libro,
+        _agregar_generos(Genero.nombre_genero).label('generos')
+    ).join(
+        Genero, LibroGenero.id_genero == Genero.id_genero
+    )
+
+    copias = select(
+        Edicion.id_libro,
+        func.sum(Copia.copias_disponibles).label('copias_disponibles')
+    ).join(
+        Copia, Edicion.id_edicion == Copia.id_edicion
+    )
+
+    if ids is not None:
+        # El filtro va también dentro de cada agregado: el planificador no lo
+        # propaga a través del GROUP BY y recorrería las tablas completas
+        generos = generos.where(LibroGenero.id_libro.in_(ids))
+        copias = copias.where(Edicion.id_libro.in_(ids))
+
+    generos = generos.group_by(LibroGenero.id_libro).subquery()
+    copias = copias.group_by(Edicion.id_libro).subquery()
+
+    stmt = select(
+        Libro.id_libro,
+        Libro.titulo_libro,
+        Libro.idioma,
+        generos.c.generos,
+        copias.c.copias_disponibles,
+        literal(datetime.utcnow()).label('actualizado_en')
+    ).join(
+        generos, Libro.id_libro == generos.c.id_libro
+    ).join(
+        copias, Libro.id_libro == copias.c.id_libro
+    )
+    if ids is not None:
+        stmt = stmt.where(Libro.id_libro.in_(ids))
+    return stmt
+
+
+def _recalcular(ids=None):
+    columnas = ['id_libro', 'titulo_libro', 'idioma', 'generos',
+                'copias_disponibles', 'actualizado_en']
+    borrar = delete(InventarioResumen)
+    if ids is not None:
+        borrar = borrar.where(InventarioResumen.id_libro.in_(ids))
+    db.session.execute(borrar)
+    db.session.execute(
+        insert(InventarioResumen).from_select(columnas, consulta_inventario(ids))
+    )
+
+
+def _marcar_refresco():
+    estado = db.session.get(EstadoProceso, PROCESO)
+    ahora = datetime.utcnow()
+    if estado is None:
+        estado = EstadoProceso(nombre=PROCESO, actualizado_en=ahora, marca=0)
+        db.session.add(estado)
+    estado.actualizado_en = ahora
+    return ahora
+
+
+def marcar_pendientes(session, ids_libro):
+    """Anota libros para recalcular su resumen (dentro de la transacción de quien escribe)"""
+    ids = set(ids_libro)
+    if not ids:
+        return
+    existentes = set(session.execute(
+        select(InventarioPendiente.id_libro).where(InventarioPendiente.id_libro.in_(ids))
+    ).scalars())
+    nuevos = ids - existentes
+    if nuevos:
+        session.execute(insert(InventarioPendiente), [{'id_libro': i} for i in nuevos])
+    registrar_cambios(session, InventarioResumen.__tablename__, ids)
+
+
+def aplicar_pendientes():
+    """Recalcula solo los libros pendientes; devuelve cuántos se actualizaron"""
+    ids = db.session.execute(
+        delete(InventarioPendiente).returning(InventarioPendiente.id_libro)
+    ).scalars().all()
+    if ids:
+        _recalcular(ids)
+        _marcar_refresco()
+        registrar_cambios(db.session, InventarioResumen.__tablename__, ids)
+    db.session.commit()
+    return len(ids)
+
+
+def refrescar_inventario():
+    """Reconstruye todo el resumen (acción de administrador o tarea programada)"""
+    db.session.execute(delete(InventarioPendiente))
+    _recalcular()
+    ahora = _marcar_refresco()
+    registrar_cambios(db.session, InventarioResumen.__tablename__)
+    db.session.commit()
+    return ahora
+
+
+def actualizado_en():
+    estado = db.session.get(EstadoProceso, PROCESO)
+    return estado.actualizado_en if estado else None
+
+
+def contar_pendientes():
+    """Libros anotados que el resumen todavía no refleja"""
+    return db.session.execute(
+        select(func.count()).select_from(InventarioPendiente)
+    ).scalar()
+
+
+def leer_inventario(lote=None):
+    """
+    Filas del resumen ordenadas por título (sin aplicar los pendientes).
+
+    Con `lote` devuelve el resultado sin materializar, leído por lotes desde
+    un cursor del lado del servidor.
+    """
+    stmt = select(
+        InventarioResumen.id_libro,
+        InventarioResumen.titulo_libro,
+        InventarioResumen.idioma,
+        InventarioResumen.generos,
+        InventarioResumen.copias_disponibles
+    ).order_by(InventarioResumen.titulo_libro)
+
+    if lote:
+        return db.session.execute(stmt.execution_options(yield_per=lote))
+    return db.session.execute(stmt).all()
@@ -0,0 +1,169 @@
+# services/pdf.py
+"""
+Reportes en PDF con fpdf2.
+
+Los reportes pequeños se generan dentro de la petición; los grandes se
+encolan como trabajo 'descarga_pdf' (services/trabajos.py) y se consultan
+como cualquier otro trabajo. Los PDF generados se guardan en disco con
+una clave <reporte>-<versión>: el hash del tipo y los parámetros seguido
+del hash de la versión de los datos, así cualquier proceso que comparta
+el directorio puede servirlos. Al guardar una versión nueva se borran las
+anteriores del mismo reporte, y más allá de PDF_CACHE_MAX_ARCHIVOS los
+archivos menos usados.
+"""
+import hashlib
+import os
+import threading
+
+from fpdf import FPDF
+
+from services.reportes import (
+    reporte_descarga, reporte_valido, contar_filas, version_datos
+)
+
+MAX_ARCHIVOS = 200
+
+
+def _texto(valor):
+    # Las fuentes base de PDF solo cubren latin-1
+    texto = '' if valor is None else str(valor)
+    return texto.encode('latin-1', 'replace').decode('latin-1')
+
+
+class ReportePDF(FPDF):
+    def __init__(self, title, headers):
+        super().__init__(orientation='L', unit='mm', format='A4')
+        self.titulo = title.replace('_', ' ')
+        self.encabezados = headers
+        ancho_util = self.w - self.l_margin - self.r_margin
+        self.anchos = [ancho_util / len(headers)] * len(headers)
+        self.set_auto_page_break(auto=True, margin=12)
+
+    def header(self):
+        self.set_font('Helvetica', 'B', 12)
+        self.cell(0, 8, _texto(self.titulo))
+        self.ln(10)
+        self.set_font('Helvetica', 'B', 8)
+        for ancho, encabezado in zip(self.anchos, self.encabezados):
+            self.cell(ancho, 6, _texto(encabezado), border=1)
+        self.ln()
+        self.set_font('Helvetica', '', 8)
+
+    def footer(self):
+        self.set_y(-10)
+        self.set_font('Helvetica', 'I', 7)
+        self.cell(0, 5, _texto(f'Página {self.page_no()}'), align='R')
+
+    def fila(self, valores):
+        for ancho, valor in zip(self.anchos, valores):
+            texto = _texto(valor)
+            # Recortar para que la celda no desborde (cell no hace salto de línea)
+            while texto and self.get_string_width(texto) > ancho - 2:
+                texto = texto[:-1]
+            self.cell(ancho, 5, texto, border=1)
+        self.ln()
+
+
+def renderizar_pdf(title, headers, filas):
+    """Genera el PDF de un reporte y devuelve sus bytes"""
+    pdf = ReportePDF(title, headers)
+    pdf.add_page()
+    for fila in filas:
+        pdf.fila(fila)
+    return bytes(pdf.output())
+
+
+class GeneradorPDF:
+    """Caché en disco de los PDF de reportes, con desalojo por versión y por cantidad"""
+
+    def __init__(self):
+        self.directorio = None
+        self.max_filas_sync = 2000
+        self.max_archivos = MAX_ARCHIVOS
+
+    def init_app(self, app):
+        self.directorio = app.config.get(
+            'PDF_CACHE_DIR', os.path.join(app.instance_path, 'pdf_cache')
+        )
+        self.max_filas_sync = app.config.get('PDF_SYNC_MAX_FILAS', self.max_filas_sync)
+        self.max_archivos = app.config.get('PDF_CACHE_MAX_ARCHIVOS', self.max_archivos)
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def clave(self, report_type, user_id=None):
+        """<reporte>-<versión>: el prefijo identifica el reporte y sus parámetros"""
+        reporte = _hash(f'{report_type}|{user_id or ""}')
+        return f'{reporte}-{_hash(version_datos(report_type))}'
+
+    def ruta(self, clave):
+        return os.path.join(self.directorio, f'{clave}.pdf')
+
+    def generar(self, report_type, user_id=None, forzar=False):
+        """
+        Bytes del PDF, desde la caché o generado aquí. Devuelve None si el
+        reporte supera PDF_SYNC_MAX_FILAS (salvo con `forzar`): la petición
+        lo encola como trabajo 'descarga_pdf'.
+        """
+        if not reporte_valido(report_type, user_id):
+            raise ValueError('Tipo de reporte no válido')
+
+        clave = self.clave(report_type, user_id)
+        try:
+            with open(self.ruta(clave), 'rb') as f:
+                contenido = f.read()
+            # La fecha de modificación ordena el desalojo: usado = reciente
+            os.utime(self.ruta(clave))
+            return contenido
+        except FileNotFoundError:
+            pass
+
+        if not forzar and contar_filas(report_type, user_id) > self.max_filas_sync:
+            return None
+
+        reporte = reporte_descarga(report_type, user_id)
+        if reporte is None:
+            raise ValueError('Tipo de reporte no válido')
+        contenido = renderizar_pdf(*reporte)
+        self._guardar(clave, contenido)
+        return contenido
+
+    def _guardar(self, clave, contenido):
+        # Escritura atómica: otro proceso nunca ve un PDF a medio escribir
+        temporal = self.ruta(clave) + f'.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporal, 'wb') as f:
+            f.write(contenido)
+        os.replace(temporal, self.ruta(clave))
+        self._desalojar(clave)
+
+    def _desalojar(self, clave):
+        """Borra las versiones anteriores del mismo reporte y, pasado max_archivos, los menos usados"""
+        reporte = clave.split('-')[0]
+        archivos = []
+        for entrada in os.scandir(self.directorio):
+            if not entrada.name.endswith('.pdf') or entrada.name == f'{clave}.pdf':
+                continue
+            if entrada.name.startswith(f'{reporte}-'):
+                _borrar(entrada.path)
+            else:
+                try:
+                    archivos.append((entrada.stat().st_mtime, entrada.path))
+                except FileNotFoundError:
+                    pass
+
+        sobrantes = len(archivos) + 1 - self.max_archivos
+        for _, ruta in sorted(archivos)[:max(sobrantes, 0)]:
+            _borrar(ruta)
+
+
+def _hash(texto):
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:16]
+
+
+def _borrar(ruta):
+    # Otro proceso puede haberlo borrado ya
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+generador_pdf = GeneradorPDF()
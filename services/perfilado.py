@@ -0,0 +1,197 @@
+# services/perfilado.py
+"""
+Perfilado de SQL por petición (opcional, SQL_PROFILING=1).
+
+Escucha before/after_cursor_execute de SQLAlchemy y, mientras dura una
+petición, anota cada sentencia y su duración. Al terminar la petición:
+
+- agrega número de consultas, tiempo en base y sentencias más lentas por
+  endpoint (expuesto en /api/metricas/sql);
+- marca como posible N+1 la misma sentencia repetida `SQL_N1_UMBRAL` veces
+  o más (mismo texto, distintos parámetros: el patrón de una carga lazy
+  por fila);
+- añade la cabecera Server-Timing (db y app) para verlo desde el navegador;
+- escribe en el log de peticiones lentas (instance/sql_lento.log, una
+  línea JSON) una muestra de las que superan `SQL_LENTO_MS`.
+
+Las consultas que hace una respuesta en streaming después de devolverse
+la cabecera no entran en el conteo de esa petición.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MAX_LENTAS = 5
+LARGO_SENTENCIA = 300
+
+
+def _recortar(sentencia):
+    sentencia = ' '.join(sentencia.split())
+    if len(sentencia) > LARGO_SENTENCIA:
+        return sentencia[:LARGO_SENTENCIA] + '...'
+    return sentencia
+
+
+class PerfilPeticion:
+    """Sentencias ejecutadas durante una petición"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.repeticiones = Counter()
+        self.lentas = []
+
+    def anotar(self, sentencia, duracion):
+        self.consultas += 1
+        self.tiempo_db += duracion
+        self.repeticiones[sentencia] += 1
+        self.lentas.append((duracion, sentencia))
+        if len(self.lentas) > MAX_LENTAS * 4:
+            self.lentas = sorted(self.lentas, reverse=True)[:MAX_LENTAS]
+
+    def mas_lentas(self):
+        return sorted(self.lentas, reverse=True)[:MAX_LENTAS]
+
+
+class PerfiladorSQL:
+    def __init__(self):
+        self.activo = False
+        self.umbral_n1 = 5
+        self.lento_ms = 500
+        self.muestreo_lentas = 1.0
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._log_lentas = logging.getLogger('perfilado.sql_lento')
+
+    def init_app(self, app):
+        self.activo = app.config.get('SQL_PROFILING', False)
+        if not self.activo:
+            return
+
+        self.umbral_n1 = app.config.get('SQL_N1_UMBRAL', self.umbral_n1)
+        self.lento_ms = app.config.get('SQL_LENTO_MS', self.lento_ms)
+        self.muestreo_lentas = app.config.get('SQL_LENTO_MUESTREO', self.muestreo_lentas)
+
+        if not self._log_lentas.handlers:
+            ruta = app.config.get('SQL_LENTO_LOG', os.path.join(app.instance_path, 'sql_lento.log'))
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            self._log_lentas.addHandler(logging.FileHandler(ruta, encoding='utf-8'))
+            self._log_lentas.setLevel(logging.INFO)
+            self._log_lentas.propagate = False
+
+        # Sobre la clase Engine: cubre también motores creados después (réplicas, etc.)
+        if not event.contains(Engine, 'before_cursor_execute', _antes_de_ejecutar):
+            event.listen(Engine, 'before_cursor_execute', _antes_de_ejecutar)
+            event.listen(Engine, 'after_cursor_execute', _despues_de_ejecutar)
+
+        app.before_request(self._iniciar)
+        app.after_request(self._cerrar)
+
+    def _iniciar(self):
+        g.perfil_sql = PerfilPeticion()
+
+    def _cerrar(self, response):
+        perfil = g.pop('perfil_sql', None)
+        if perfil is None:
+            return response
+
+        total = time.perf_counter() - perfil.inicio
+        endpoint = request.endpoint or request.path
+        sospechosas = [
+            (sentencia, veces) for sentencia, veces in perfil.repeticiones.items()
+            if veces >= self.umbral_n1
+        ]
+
+        self._acumular(endpoint, perfil, total, sospechosas)
+
+        for sentencia, veces in sospechosas:
+            current_app.logger.warning(
+                f'Posible N+1 en {endpoint}: {veces} ejecuciones de {_recortar(sentencia)}'
+            )
+
+        if total * 1000 >= self.lento_ms and random.random() < self.muestreo_lentas:
+            self._log_lentas.info(json.dumps({
+                'fecha': datetime.utcnow().isoformat(),
+                'metodo': request.method,
+                'ruta': request.full_path.rstrip('?'),
+                'endpoint': endpoint,
+                'estado': response.status_code,
+                'total_ms': round(total * 1000, 1),
+                'db_ms': round(perfil.tiempo_db * 1000, 1),
+                'consultas': perfil.consultas,
+                'lentas': [
+                    {'ms': round(d * 1000, 1), 'sql': _recortar(s)} for d, s in perfil.mas_lentas()
+                ],
+                'posibles_n1': [{'veces': v, 'sql': _recortar(s)} for s, v in sospechosas]
+            }, ensure_ascii=False))
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={perfil.tiempo_db * 1000:.1f};desc="{perfil.consultas} consultas", '
+            f'app;dur={total * 1000:.1f}'
+        )
+        return response
+
+    def _acumular(self, endpoint, perfil, total, sospechosas):
+        with self._lock:
+            datos = self._endpoints.setdefault(endpoint, {
+                'peticiones': 0, 'consultas': 0, 'tiempo_db': 0.0, 'tiempo_total': 0.0,
+                'max_consultas': 0, 'peticiones_n1': 0, 'lentas': []
+            })
+            datos['peticiones'] += 1
+            datos['consultas'] += perfil.consultas
+            datos['tiempo_db'] += perfil.tiempo_db
+            datos['tiempo_total'] += total
+            datos['max_consultas'] = max(datos['max_consultas'], perfil.consultas)
+            datos['peticiones_n1'] += bool(sospechosas)
+            datos['lentas'] = sorted(datos['lentas'] + perfil.mas_lentas(), reverse=True)[:MAX_LENTAS]
+
+    def estadisticas(self):
+        with self._lock:
+            endpoints = {
+                endpoint: {
+                    'peticiones': d['peticiones'],
+                    'consultas_media': round(d['consultas'] / d['peticiones'], 1),
+                    'consultas_max': d['max_consultas'],
+                    'db_ms_medio': round(d['tiempo_db'] * 1000 / d['peticiones'], 2),
+                    'total_ms_medio': round(d['tiempo_total'] * 1000 / d['peticiones'], 2),
+                    'peticiones_con_n1': d['peticiones_n1'],
+                    'mas_lentas': [
+                        {'ms': round(dur * 1000, 2), 'sql': _recortar(s)} for dur, s in d['lentas']
+                    ]
+                }
+                for endpoint, d in self._endpoints.items()
+            }
+        return {'activo': self.activo, 'umbral_n1': self.umbral_n1, 'endpoints': endpoints}
+
+    def reiniciar(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    conn.info['perfil_inicio'] = time.perf_counter()
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info.pop('perfil_inicio', None)
+    if inicio is None:
+        return
+    duracion = time.perf_counter() - inicio
+    if has_request_context():
+        perfil = g.get('perfil_sql')
+        if perfil is not None:
+            perfil.anotar(statement, duracion)
+
+
+perfilador_sql = PerfiladorSQL()
@@ -0,0 +1,229 @@
+# services/prestamos.py
+"""
+Motor de préstamos: salida y devolución de ejemplares.
+
+La disponibilidad se descuenta con un UPDATE condicionado
+(copias_disponibles > 0) que la base evalúa de forma atómica, así dos
+peticiones concurrentes nunca prestan el mismo último ejemplar. Cada
+operación (copias, préstamo, ediciones y estado) es una sola transacción.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import func, select, update
+
+from models.base import db, es_postgres
+from models.model import (
+    Prestamo, PrestamoEdicion, EstadoPrestamo, EstadoEnum, Edicion, Copia, Usuario
+)
+from services.circulacion import registrar_devolucion, registrar_prestamo
+from services.eventos import registrar_cambios
+from services.inventario import marcar_pendientes
+from services.similares import marcar_prestamos
+
+DIAS_PRESTAMO = 14
+MAX_REINTENTOS = 5
+
+
+class ErrorPrestamo(Exception):
+    """Error de negocio en una operación de préstamo"""
+    status = 400
+
+
+class NoEncontrado(ErrorPrestamo):
+    status = 404
+
+
+class SinDisponibilidad(ErrorPrestamo):
+    status = 409
+
+    def __init__(self, id_edicion):
+        super().__init__(f'No hay copias disponibles de la edición {id_edicion}')
+        self.id_edicion = id_edicion
+
+
+class EstadoInvalido(ErrorPrestamo):
+    status = 409
+
+
+def _descontar_copia(id_edicion):
+    """
+    Resta un ejemplar disponible de la edición y devuelve el id de la copia.
+
+    La subconsulta elige una fila candidata; la condición repetida en el
+    UPDATE hace que, si otra transacción la agotó mientras tanto, no se
+    actualice nada y se reintente con la siguiente. En PostgreSQL la
+    candidata se bloquea con FOR UPDATE sin SKIP LOCKED: cada fila de copia
+    es un contador de varios ejemplares, así que saltar las bloqueadas
+    daría "sin copias" con ejemplares libres. La espera termina con el
+    commit de la otra transacción y la condición se vuelve a evaluar sobre
+    la fila actualizada (si se agotó, se toma la siguiente).
+    """
+    for _ in range(MAX_REINTENTOS):
+        candidata = select(Copia.id_copia).where(
+            Copia.id_edicion == id_edicion,
+            Copia.copias_disponibles > 0
+        ).order_by(Copia.id_copia).limit(1)
+        if es_postgres():
+            candidata = candidata.with_for_update()
+
+        id_copia = db.session.execute(
+            update(Copia)
+            .where(Copia.id_copia == candidata.scalar_subquery(),
+                   Copia.copias_disponibles > 0)
+            .values(copias_disponibles=Copia.copias_disponibles - 1)
+            .returning(Copia.id_copia)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        if id_copia is not None:
+            return id_copia
+
+        quedan = db.session.execute(
+            select(func.coalesce(func.sum(Copia.copias_disponibles), 0))
+            .where(Copia.id_edicion == id_edicion)
+        ).scalar()
+        if not quedan:
+            break
+    raise SinDisponibilidad(id_edicion)
+
+
+def _reponer_copia(id_edicion):
+    id_copia = db.session.execute(
+        select(func.min(Copia.id_copia)).where(Copia.id_edicion == id_edicion)
+    ).scalar()
+    if id_copia is None:
+        raise NoEncontrado(f'La edición {id_edicion} no tiene copias registradas')
+
+    db.session.execute(
+        update(Copia)
+        .where(Copia.id_copia == id_copia)
+        .values(copias_disponibles=Copia.copias_disponibles + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def registrar_estado(prestamo, estado):
+    """
+    Agrega la transición de estado del préstamo (dentro de la transacción
+    actual) y actualiza su proyección prestamo.estado_actual.
+    """
+    db.session.add(EstadoPrestamo(estado=estado, id_prestamo=prestamo.id_prestamo))
+    prestamo.estado_actual = estado
+
+
+def _anotar_inventario(ids_edicion):
+    """En PostgreSQL los triggers de copia ya anotan los libros pendientes"""
+    if es_postgres():
+        return
+    ids_libro = db.session.execute(
+        select(Edicion.id_libro).where(Edicion.id_edicion.in_(ids_edicion))
+    ).scalars()
+    marcar_pendientes(db.session, ids_libro)
+
+
+def prestar(id_usuario, ediciones, fecha_devolucion=None, precio_alquiler='0'):
+    """
+    Crea un préstamo de una o varias ediciones en una sola transacción.
+    Si alguna edición no tiene ejemplares, no se presta ninguna; cada
+    edición se indica una sola vez.
+    """
+    ediciones = sorted(int(e) for e in ediciones or [])
+    if not ediciones:
+        raise ErrorPrestamo('Debe indicar al menos una edición')
+    repetidas = sorted({e for a, e in zip(ediciones, ediciones[1:]) if a == e})
+    if repetidas:
+        raise ErrorPrestamo(f'Ediciones repetidas en el préstamo: {repetidas}')
+
+    try:
+        # Orden fijo de ediciones: evita interbloqueos entre préstamos simultáneos
+        copias = [_descontar_copia(id_edicion) for id_edicion in ediciones]
+
+        if db.session.get(Usuario, id_usuario) is None:
+            raise NoEncontrado(f'Usuario {id_usuario} no encontrado')
+
+        hoy = date.today()
+        prestamo = Prestamo(
+            id_usuario=id_usuario,
+            fecha_prestamo=hoy,
+            fecha_devolucion=fecha_devolucion or hoy + timedelta(days=DIAS_PRESTAMO),
+            precio_alquiler=str(precio_alquiler)
+        )
+        db.session.add(prestamo)
+        db.session.flush()
+
+        db.session.add_all([
+            PrestamoEdicion(id_prestamo=prestamo.id_prestamo, id_edicion=id_edicion)
+            for id_edicion in ediciones
+        ])
+        registrar_estado(prestamo, EstadoEnum.EN_CURSO)
+
+        _anotar_inventario(ediciones)
+        if not es_postgres():
+            # En PostgreSQL lo anota el trigger de prestamo
+            marcar_prestamos(db.session, [prestamo.id_prestamo])
+        registrar_cambios(db.session, Copia.__tablename__, copias)
+        registrar_prestamo(prestamo.id_prestamo)
+        db.session.commit()
+        return prestamo
+
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def devolver(id_prestamo):
+    """Cierra un préstamo en curso y repone los ejemplares de sus ediciones"""
+    try:
+        if es_postgres():
+            # Serializa devoluciones simultáneas del mismo préstamo
+            db.session.execute(
+                select(Prestamo.id_prestamo)
+                .where(Prestamo.id_prestamo == id_prestamo)
+                .with_for_update()
+            )
+
+        # El cierre es un UPDATE condicionado al estado vigente: de dos
+        # devoluciones simultáneas solo una encuentra el préstamo en curso
+        cerrados = db.session.execute(
+            update(Prestamo)
+            .where(Prestamo.id_prestamo == id_prestamo,
+                   Prestamo.estado_actual == EstadoEnum.EN_CURSO)
+            .values(fecha_devolucion=date.today(), estado_actual=EstadoEnum.DEVUELTO)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        prestamo = db.session.get(Prestamo, id_prestamo, populate_existing=True)
+        if prestamo is None:
+            raise NoEncontrado(f'Préstamo {id_prestamo} no encontrado')
+        if not cerrados:
+            raise EstadoInvalido(f'El préstamo {id_prestamo} no está en curso')
+
+        ediciones = sorted(db.session.execute(
+            select(PrestamoEdicion.id_edicion)
+            .where(PrestamoEdicion.id_prestamo == id_prestamo)
+        ).scalars())
+        for id_edicion in ediciones:
+            _reponer_copia(id_edicion)
+
+        registrar_estado(prestamo, EstadoEnum.DEVUELTO)
+
+        _anotar_inventario(ediciones)
+        registrar_cambios(db.session, Copia.__tablename__)
+        registrar_devolucion(id_prestamo)
+        db.session.commit()
+        return prestamo
+
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def prestamo_a_dict(prestamo):
+    return {
+        'id_prestamo': prestamo.id_prestamo,
+        'id_usuario': prestamo.id_usuario,
+        'fecha_prestamo': prestamo.fecha_prestamo.strftime('%Y-%m-%d'),
+        'fecha_devolucion': prestamo.fecha_devolucion.strftime('%Y-%m-%d'),
+        'precio_alquiler': prestamo.precio_alquiler,
+        'ediciones': [e.id_edicion for e in prestamo.ediciones],
+        'estado': getattr(prestamo.estado_actual, 'value', None)
+    }
@@ -0,0 +1,381 @@
+# services/reportes.py
+"""
+Consultas de los reportes de administración.
+
+Los reportes JSON (datos_*) devuelven estructuras listas para serializar;
+se usan desde los endpoints y desde los trabajos en segundo plano.
+
+Los reportes descargables devuelven (title, headers, filas), donde filas
+es un generador que lee de un cursor del lado del servidor por lotes
+(yield_per); nada se materializa completo en memoria.
+"""
+import csv
+import io
+from datetime import date
+
+from sqlalchemy import func
+
+from models.base import db
+from models.model import (
+    User, Usuario, Prestamo, EstadoEnum, PrestamoEdicion, Edicion, Libro,
+    InventarioResumen
+)
+from services.inventario import (
+    leer_inventario, contar_pendientes, actualizado_en as inventario_actualizado_en
+)
+from services.serializacion import Mapeador
+from services.versiones import firma, registrar_tablas
+
+TAMANO_LOTE = 1000
+
+
+def _fecha(valor):
+    return valor.strftime('%Y-%m-%d') if valor else ''
+
+
+def _dias_desde(fecha, hoy):
+    # Se calcula aquí y no en SQL: age() es propio de PostgreSQL y
+    # extract('day', age(...)) solo devolvía el componente de días del intervalo
+    return (hoy - fecha).days if fecha else None
+
+
+def _estado(valor):
+    return getattr(valor, 'value', valor)
+
+
+# ==============================================
+# REPORTES JSON (/api/reportes/*)
+# ==============================================
+
+def _normalizar_estado(estado_db):
+    if not estado_db:
+        return 'Desconocido'
+
+    estado = str(estado_db).strip().upper()
+    return {
+        'DEVUELTO': 'Devuelto',
+        'PENDIENTE': 'Pendiente',
+        'EN_CURSO': 'En curso',
+        'EN CURSO': 'En curso',
+    }.get(estado, estado_db)  # Mantener original si no coincide
+
+
+def _consulta_historial_usuario(user_id):
+    return db.session.query(
+        Prestamo.id_prestamo,
+        Prestamo.fecha_prestamo,
+        Prestamo.fecha_devolucion,
+        Prestamo.precio_alquiler,
+        Prestamo.estado_actual.label('estado_db'),
+        Usuario.nombre_usuario,
+        Usuario.apellido_usuario,
+        Usuario.ci,
+        Usuario.telefono,
+        Usuario.domicilio,
+        Libro.titulo_libro,
+        Edicion.isbn
+    ).join(
+        Usuario, Prestamo.id_usuario == Usuario.id_usuario
+    ).outerjoin(
+        PrestamoEdicion, Prestamo.id_prestamo == PrestamoEdicion.id_prestamo
+    ).outerjoin(
+        Edicion, PrestamoEdicion.id_edicion == Edicion.id_edicion
+    ).outerjoin(
+        Libro, Edicion.id_libro == Libro.id_libro
+    ).filter(
+        Prestamo.id_usuario == user_id
+    ).order_by(
+        Prestamo.fecha_prestamo.desc()
+    )
+
+
+_prestamo_historial = Mapeador(
+    id_prestamo='id_prestamo',
+    fecha_prestamo=lambda f: _fecha(f.fecha_prestamo),
+    fecha_devolucion=lambda f: _fecha(f.fecha_devolucion) or None,
+    precio=lambda f: float(f.precio_alquiler) if f.precio_alquiler else 0.0,
+    estado=lambda f: _normalizar_estado(_estado(f.estado_db)),
+    libro=lambda f: {'titulo': f.titulo_libro, 'isbn': f.isbn} if f.titulo_libro else None
+)
+
+_item_inventario = Mapeador(
+    id='id_libro',
+    titulo='titulo_libro',
+    idioma='idioma',
+    generos='generos',
+    copias_disponibles='copias_disponibles'
+)
+
+_usuario_top = Mapeador(usuario='ci', total_prestamos='total_prestamos')
+
+_usuario = Mapeador(id='id', ci='ci')
+
+
+def datos_historial_usuario(user_id):
+    """Historial de préstamos de un usuario, o None si no tiene préstamos"""
+    resultados = _consulta_historial_usuario(user_id).all()
+    if not resultados:
+        return None
+
+    # Tomar datos del primer registro (todos son del mismo usuario)
+    primer_registro = resultados[0]
+    usuario_info = {
+        'id': user_id,
+        'nombre': primer_registro.nombre_usuario,
+        'apellido': primer_registro.apellido_usuario,
+        'ci': primer_registro.ci,
+        'telefono': primer_registro.telefono,
+        'domicilio': primer_registro.domicilio
+    }
+
+    return {
+        'usuario': usuario_info,
+        'prestamos': _prestamo_historial.lista(resultados)
+    }
+
+
+def datos_inventario():
+    inventario = leer_inventario()
+    fecha = inventario_actualizado_en()
+
+    return {
+        'actualizado_en': fecha.isoformat() if fecha else None,
+        'pendientes': contar_pendientes(),
+        'inventario': _item_inventario.lista(inventario)
+    }
+
+
+def datos_prestamos_activos():
+    # Cálculo explícito de días
+    prestamos = db.session.query(
+        User.ci,
+        Libro.titulo_libro,
+        Prestamo.fecha_prestamo
+    ).join(
+        Prestamo, User.id == Prestamo.id_usuario
+    ).join(
+        PrestamoEdicion, Prestamo.id_prestamo == PrestamoEdicion.id_prestamo
+    ).join(
+        Edicion, PrestamoEdicion.id_edicion == Edicion.id_edicion
+    ).join(
+        Libro, Edicion.id_libro == Libro.id_libro
+    ).filter(
+        Prestamo.estado_actual == EstadoEnum.EN_CURSO
+    ).order_by(
+        Prestamo.fecha_prestamo
+    ).all()
+
+    hoy = date.today()
+    return Mapeador(
+        usuario_ci='ci',
+        libro='titulo_libro',
+        fecha_prestamo=lambda p: _fecha(p.fecha_prestamo),
+        dias_prestado=lambda p: _dias_desde(p.fecha_prestamo, hoy)
+    ).lista(prestamos)
+
+
+def datos_top_usuarios():
+    usuarios = db.session.query(
+        User.ci,
+        func.count(Prestamo.id_prestamo).label('total_prestamos')
+    ).join(
+        Prestamo, User.id == Prestamo.id_usuario
+    ).group_by(
+        User.ci
+    ).order_by(
+        func.count(Prestamo.id_prestamo).desc()
+    ).limit(10).all()
+
+    return _usuario_top.lista(usuarios)
+
+
+def datos_usuarios():
+    """Usuarios (id, ci) para elegir el del historial"""
+    usuarios = db.session.query(User.id, User.ci).order_by(User.ci).all()
+    return _usuario.lista(usuarios)
+
+
+# ==============================================
+# REPORTES DESCARGABLES (/api/reports/download/*)
+# ==============================================
+
+def _consulta_user_loans(user_id):
+    return db.session.query(
+        Prestamo.id_prestamo,
+        Libro.titulo_libro,
+        Prestamo.fecha_prestamo,
+        Prestamo.fecha_devolucion,
+        Prestamo.estado_actual.label('estado')
+    ).join(
+        PrestamoEdicion, Prestamo.id_prestamo == PrestamoEdicion.id_prestamo
+    ).join(
+        Edicion, PrestamoEdicion.id_edicion == Edicion.id_edicion
+    ).join(
+        Libro, Edicion.id_libro == Libro.id_libro
+    ).filter(
+        Prestamo.id_usuario == user_id
+    ).order_by(
+        Prestamo.fecha_prestamo.desc()
+    )
+
+
+def _reporte_user_loans(user_id):
+    data = _consulta_user_loans(user_id).yield_per(TAMANO_LOTE)
+
+    title = f"Historial_Prestamos_Usuario_{user_id}"
+    headers = ["ID Préstamo", "Libro", "Fecha Préstamo", "Fecha Devolución", "Estado"]
+    rows = (
+        [p.id_prestamo, p.titulo_libro,
+         _fecha(p.fecha_prestamo), _fecha(p.fecha_devolucion),
+         _estado(p.estado)]
+        for p in data
+    )
+    return title, headers, rows
+
+
+def _reporte_inventory():
+    data = leer_inventario(lote=TAMANO_LOTE)
+
+    title = "Inventario_Libros"
+    headers = ["ID", "Título", "Idioma", "Géneros", "Copias Disponibles"]
+    rows = (
+        [p.id_libro, p.titulo_libro, p.idioma, p.generos, p.copias_disponibles]
+        for p in data
+    )
+    return title, headers, rows
+
+
+def _consulta_active_loans():
+    return db.session.query(
+        User.id,
+        Libro.titulo_libro,
+        Prestamo.fecha_prestamo
+    ).join(
+        Prestamo, User.id == Prestamo.id_usuario
+    ).join(
+        PrestamoEdicion, Prestamo.id_prestamo == PrestamoEdicion.id_prestamo
+    ).join(
+        Edicion, PrestamoEdicion.id_edicion == Edicion.id_edicion
+    ).join(
+        Libro, Edicion.id_libro == Libro.id_libro
+    ).filter(
+        Prestamo.estado_actual == EstadoEnum.EN_CURSO
+    ).order_by(
+        Prestamo.fecha_prestamo
+    )
+
+
+def _reporte_active_loans():
+    data = _consulta_active_loans().yield_per(TAMANO_LOTE)
+
+    title = "Prestamos_Activos"
+    headers = ["ID Usuario", "Libro", "Fecha Préstamo", "Días Prestado"]
+    hoy = date.today()
+    rows = (
+        [p.id, p.titulo_libro, _fecha(p.fecha_prestamo), _dias_desde(p.fecha_prestamo, hoy)]
+        for p in data
+    )
+    return title, headers, rows
+
+
+def _reporte_top_users():
+    data = db.session.query(
+        User.ci,
+        func.count(Prestamo.id_prestamo).label('total_prestamos')
+    ).join(
+        Prestamo, User.id == Prestamo.id_usuario
+    ).group_by(
+        User.ci
+    ).order_by(
+        func.count(Prestamo.id_prestamo).desc()
+    ).limit(10).all()
+
+    title = "Top_10_Usuarios"
+    headers = ["Usuario", "Total Préstamos"]
+    rows = ([u.ci, u.total_prestamos] for u in data)
+    return title, headers, rows
+
+
+TIPOS_REPORTE = ('user_loans', 'inventory', 'active_loans', 'top_users')
+
+# Tablas de las que depende cada reporte (versionado para ETag y caché de PDF)
+TABLAS_REPORTE = {
+    'user_loans': registrar_tablas('prestamo', 'usuario', 'prestamo_edicion', 'edicion', 'libro'),
+    'inventory': registrar_tablas(
+        'inventario_resumen', 'copia', 'edicion', 'libro', 'libro_genero', 'genero'
+    ),
+    'active_loans': registrar_tablas('prestamo', 'users', 'prestamo_edicion', 'edicion', 'libro'),
+    'top_users': registrar_tablas('prestamo', 'users'),
+}
+
+
+def reporte_valido(report_type, user_id=None):
+    if report_type == 'user_loans':
+        return bool(user_id)
+    return report_type in TIPOS_REPORTE
+
+
+def reporte_descarga(report_type, user_id=None):
+    """
+    Devuelve (title, headers, filas) del reporte pedido, o None si el tipo
+    no es válido. La consulta se ejecuta aquí, de modo que los errores de
+    base de datos aparecen antes de empezar a enviar la respuesta.
+    """
+    if report_type == 'user_loans' and user_id:
+        return _reporte_user_loans(user_id)
+    if report_type == 'inventory':
+        return _reporte_inventory()
+    if report_type == 'active_loans':
+        return _reporte_active_loans()
+    if report_type == 'top_users':
+        return _reporte_top_users()
+    return None
+
+
+def contar_filas(report_type, user_id=None):
+    """Número de filas que tendrá el reporte (para decidir si se procesa en segundo plano)"""
+    if report_type == 'user_loans' and user_id:
+        return _consulta_user_loans(user_id).order_by(None).count()
+    if report_type == 'inventory':
+        return db.session.query(func.count(InventarioResumen.id_libro)).scalar()
+    if report_type == 'active_loans':
+        return _consulta_active_loans().order_by(None).count()
+    if report_type == 'top_users':
+        return 10
+    return 0
+
+
+def version_datos(report_type):
+    """
+    Identificador de la versión de los datos de un reporte (clave de la
+    caché de PDF): contadores de sus tablas y, si muestra días de
+    préstamo, la fecha.
+    """
+    diario = date.today() if report_type == 'active_loans' else None
+    return firma(TABLAS_REPORTE[report_type], diario)
+
+
+def generar_csv(title, headers, filas, lote=TAMANO_LOTE):
+    """Generador de CSV: emite el encabezado de inmediato y luego bloques de `lote` filas"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def vaciar():
+        contenido = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return contenido
+
+    writer.writerow([title])
+    writer.writerow([])
+    writer.writerow(headers)
+    yield vaciar()
+
+    for i, fila in enumerate(filas, 1):
+        writer.writerow(fila)
+        if i % lote == 0:
+            yield vaciar()
+
+    resto = vaciar()
+    if resto:
+        yield resto
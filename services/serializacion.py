@@ -0,0 +1,212 @@
+# services/serializacion.py
+"""
+Serialización de respuestas: mapeadores fila -> dict, codificador JSON y
+compresión.
+
+- Mapeador: arma dicts leyendo solo columnas de la fila.
+- relacion_cargada(): lee una relación solo si ya está cargada, así
+  serializar un modelo nunca dispara cargas perezosas.
+- ProveedorJSON: proveedor JSON de Flask que usa orjson si está instalado.
+  Produce los mismos valores que el codificador estándar (fechas y Decimal
+  se convierten igual que en Flask); el texto no ASCII sale en UTF-8 en
+  lugar de escapado.
+- Compresor: gzip (o brotli, si está instalado) según Accept-Encoding para
+  respuestas de texto mayores que COMPRESION_MINIMO. Las respuestas en
+  streaming y los archivos se envían sin comprimir.
+"""
+import gzip
+import json
+from operator import attrgetter
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import inspect
+from sqlalchemy.orm import NO_VALUE
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+TIPOS_COMPRIMIBLES = (
+    'application/json', 'application/x-ndjson', 'application/javascript',
+    'application/xml', 'image/svg+xml'
+)
+
+
+# ==============================================
+# MAPEADORES
+# ==============================================
+
+class Mapeador:
+    """
+    Convierte filas en dicts con claves fijas.
+
+    Cada campo es el nombre de un atributo de la fila o una función que
+    recibe la fila: Mapeador(id='id_libro', titulo='titulo_libro',
+    precio=lambda f: float(f.precio or 0)).
+
+    Los nombres se resuelven con operator.attrgetter: si todos los campos
+    son nombres, un único attrgetter lee la fila entera en C.
+    """
+
+    def __init__(self, **campos):
+        self.campos = campos
+        for campo in campos.values():
+            if isinstance(campo, str) and not campo.isidentifier():
+                raise ValueError(f'Nombre de columna inválido: {campo!r}')
+
+        claves = tuple(campos)
+        if len(campos) > 1 and all(isinstance(c, str) for c in campos.values()):
+            valores = attrgetter(*campos.values())
+        else:
+            lectores = [attrgetter(c) if isinstance(c, str) else c for c in campos.values()]
+
+            def valores(fila):
+                return [lector(fila) for lector in lectores]
+
+        def uno(fila):
+            return dict(zip(claves, valores(fila)))
+
+        def lista(filas):
+            return [dict(zip(claves, valores(fila))) for fila in filas]
+
+        self._uno = uno
+        self.lista = lista
+
+    def __call__(self, fila):
+        return self._uno(fila)
+
+
+def relacion_cargada(instancia, relacion):
+    """Valor de la relación si ya está cargada, o None sin consultar la base"""
+    valor = inspect(instancia).attrs[relacion].loaded_value
+    return None if valor is NO_VALUE else valor
+
+
+# ==============================================
+# CODIFICADOR JSON
+# ==============================================
+
+class ProveedorJSON(DefaultJSONProvider):
+    """
+    DefaultJSONProvider con orjson como backend cuando está disponible.
+
+    Respeta sort_keys y el modo legible (indent) de Flask. Las fechas,
+    Decimal y demás tipos no nativos pasan por el mismo `default` que el
+    proveedor estándar, así los valores del JSON no cambian.
+    """
+
+    def _opciones(self, indentar=False):
+        opciones = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            opciones |= orjson.OPT_SORT_KEYS
+        if indentar:
+            opciones |= orjson.OPT_INDENT_2
+        return opciones
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.keys() - {'separators'}:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._opciones()).decode()
+        except TypeError:
+            # Enteros fuera de 64 bits u otros casos que orjson no cubre
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            cuerpo = orjson.dumps(
+                obj, default=self.default,
+                option=self._opciones(indentar) | orjson.OPT_APPEND_NEWLINE
+            )
+        except TypeError:
+            return super().response(obj)
+        return self._app.response_class(cuerpo, mimetype=self.mimetype)
+
+
+def a_json(obj):
+    """Serializa a bytes UTF-8 compactos (sin ordenar claves), p. ej. para NDJSON"""
+    if orjson is not None:
+        return orjson.dumps(
+            obj, default=DefaultJSONProvider.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(
+        obj, default=DefaultJSONProvider.default, ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+
+
+# ==============================================
+# COMPRESIÓN
+# ==============================================
+
+def comprimir(datos, codificacion, nivel_gzip=6, calidad_brotli=4):
+    if codificacion == 'br':
+        return brotli.compress(datos, quality=calidad_brotli)
+    return gzip.compress(datos, compresslevel=nivel_gzip, mtime=0)
+
+
+class Compresor:
+    """Comprime en after_request las respuestas que lo justifican"""
+
+    def __init__(self):
+        self.minimo = 1024
+        self.nivel_gzip = 6
+        self.calidad_brotli = 4
+        self.codificaciones = ['br', 'gzip'] if brotli else ['gzip']
+
+    def init_app(self, app):
+        self.minimo = app.config.get('COMPRESION_MINIMO', self.minimo)
+        self.nivel_gzip = app.config.get('COMPRESION_NIVEL_GZIP', self.nivel_gzip)
+        self.calidad_brotli = app.config.get('COMPRESION_CALIDAD_BROTLI', self.calidad_brotli)
+        if self.minimo is not None and self.minimo >= 0:
+            app.after_request(self._despues)
+
+    def _comprimible(self, respuesta):
+        if respuesta.status_code < 200 or respuesta.status_code in (204, 206, 304):
+            return False
+        # Streaming y archivos (send_file) se envían tal cual
+        if respuesta.is_streamed or respuesta.direct_passthrough:
+            return False
+        if 'Content-Encoding' in respuesta.headers:
+            return False
+        tipo = respuesta.mimetype or ''
+        return tipo.startswith('text/') or tipo in TIPOS_COMPRIMIBLES
+
+    def _despues(self, respuesta):
+        if not self._comprimible(respuesta):
+            return respuesta
+
+        respuesta.vary.add('Accept-Encoding')
+        codificacion = request.accept_encodings.best_match(self.codificaciones)
+        if not codificacion or respuesta.content_length is None or respuesta.content_length < self.minimo:
+            return respuesta
+
+        respuesta.set_data(comprimir(
+            respuesta.get_data(), codificacion, self.nivel_gzip, self.calidad_brotli
+        ))
+        respuesta.headers['Content-Encoding'] = codificacion
+        # El cuerpo comprimido es otra representación: el ETag pasa a ser débil
+        etag, debil = respuesta.get_etag()
+        if etag and not debil:
+            respuesta.set_etag(etag, weak=True)
+        return respuesta
+
+
+compresor = Compresor()
@@ -0,0 +1,420 @@
+# services/similares.py
+"""
+Recomendaciones "otros lectores también pidieron" por coocurrencia de préstamos.
+
+Dos libros son similares si los prestaron los mismos usuarios. Con X la
+matriz usuario × libro (1 si el usuario pidió el libro alguna vez), los
+coprestamos son XᵀX y el puntaje es el coseno:
+
+    puntaje(a, b) = coprestamos(a, b) / sqrt(lectores(a) · lectores(b))
+
+libro_similar guarda los TOP_N mejores de cada libro y la API solo lee de
+ahí; libro_lectores guarda el denominador (lectores de cada libro). De
+cada usuario se consideran sus MAX_POR_USUARIO libros más recientes: un
+historial enorme aporta pares en forma cuadrática y casi nada de señal.
+
+- recalcular_similares() reconstruye ambas tablas. Con NumPy y SciPy
+  instalados multiplica la matriz dispersa por bloques de BLOQUE libros
+  (la memoria no depende del total de pares); sin ellos resuelve todo en
+  la base con un INSERT ... SELECT.
+- actualizar_similares() consume la cola similar_pendiente (trigger en
+  PostgreSQL o marcar_prestamos() desde la aplicación) con DELETE ...
+  RETURNING, así un préstamo que confirma tarde no se pierde. Solo
+  cambian los pares de los libros nuevos N de esos préstamos: se
+  recalculan los lectores y la lista completa de cada libro de N (desde
+  el historial de sus lectores, no de todos los usuarios) y esos mismos
+  pares, que son simétricos, se combinan con la lista guardada de cada
+  libro que los comparte. Si en una lista llena un puntaje baja hasta el
+  último lugar, un libro no guardado podría superarlo: solo esas listas
+  se recalculan completas. El resultado coincide con la reconstrucción
+  salvo por el tope MAX_POR_USUARIO (el libro que sale del historial de
+  un usuario no descuenta sus pares hasta la próxima reconstrucción).
+"""
+from array import array
+
+from sqlalchemy import Float, and_, cast, delete, func, insert, select
+
+from models.base import db
+from models.model import (
+    Book, Edicion, LibroLectores, LibroSimilar, Prestamo, PrestamoEdicion, SimilarPendiente
+)
+from services.eventos import registrar_cambios
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+TOP_N = 20
+MAX_POR_USUARIO = 500
+MIN_COPRESTAMOS = 1
+BLOQUE = 2048
+TAMANO_LOTE = 1000
+TAMANO_INSERCION = 10000
+TAMANO_IN = 5000
+
+
+def _historial(usuarios=None):
+    """(id_usuario, id_libro) distintos, limitados a los libros más recientes de cada usuario"""
+    reciente = func.row_number().over(
+        partition_by=Prestamo.id_usuario,
+        order_by=(func.max(Prestamo.fecha_prestamo).desc(), Edicion.id_libro)
+    )
+    stmt = select(
+        Prestamo.id_usuario, Edicion.id_libro, reciente.label('reciente')
+    ).join(
+        PrestamoEdicion, PrestamoEdicion.id_prestamo == Prestamo.id_prestamo
+    ).join(
+        Edicion, Edicion.id_edicion == PrestamoEdicion.id_edicion
+    )
+    if usuarios is not None:
+        stmt = stmt.where(Prestamo.id_usuario.in_(usuarios))
+    sub = stmt.group_by(Prestamo.id_usuario, Edicion.id_libro).subquery()
+    # El GROUP BY externo no cambia las filas, pero sin él SQLite no indexa
+    # el resultado de la función de ventana y el autojoin recorre a × b completo
+    return select(sub.c.id_usuario, sub.c.id_libro).where(
+        sub.c.reciente <= MAX_POR_USUARIO
+    ).group_by(sub.c.id_usuario, sub.c.id_libro)
+
+
+def _consulta_lectores(historial):
+    return select(
+        historial.c.id_libro, func.count().label('lectores')
+    ).group_by(historial.c.id_libro)
+
+
+def _puntaje(coprestamos, lectores_a, lectores_b):
+    return coprestamos / func.sqrt(cast(lectores_a * lectores_b, Float))
+
+
+def consulta_similares(top_n=TOP_N):
+    """
+    SELECT con los top_n similares de cada libro, en las columnas de
+    libro_similar (ruta sin NumPy). Lee los lectores de libro_lectores.
+    """
+    historial = _historial().cte('historial')
+    a, b = historial.alias('a'), historial.alias('b')
+    pares = select(
+        a.c.id_libro, b.c.id_libro.label('id_similar'), func.count().label('coprestamos')
+    ).join(
+        b, and_(a.c.id_usuario == b.c.id_usuario, a.c.id_libro != b.c.id_libro)
+    ).group_by(a.c.id_libro, b.c.id_libro).having(
+        func.count() >= MIN_COPRESTAMOS
+    ).subquery()
+
+    la, lb = LibroLectores.__table__.alias('la'), LibroLectores.__table__.alias('lb')
+    puntaje = _puntaje(pares.c.coprestamos, la.c.lectores, lb.c.lectores)
+    posicion = func.row_number().over(
+        partition_by=pares.c.id_libro,
+        order_by=(puntaje.desc(), pares.c.coprestamos.desc(), pares.c.id_similar)
+    )
+    ranking = select(
+        pares.c.id_libro, posicion.label('posicion'), pares.c.id_similar,
+        puntaje.label('puntaje'), pares.c.coprestamos
+    ).join(
+        la, la.c.id_libro == pares.c.id_libro
+    ).join(
+        lb, lb.c.id_libro == pares.c.id_similar
+    ).subquery()
+
+    return select(
+        ranking.c.id_libro, ranking.c.posicion, ranking.c.id_similar,
+        ranking.c.puntaje, ranking.c.coprestamos
+    ).where(ranking.c.posicion <= top_n)
+
+
+COLUMNAS = ['id_libro', 'posicion', 'id_similar', 'puntaje', 'coprestamos']
+
+
+def _similares_matriz(top_n):
+    """
+    Filas de libro_similar calculadas con SciPy: XᵀX por bloques de libros,
+    y el ranking de cada bloque con un único ordenamiento vectorizado.
+    """
+    usuarios, libros = array('q'), array('q')
+    resultado = db.session.execute(_historial().execution_options(yield_per=50000))
+    for lote in resultado.partitions():
+        for id_usuario, id_libro in lote:
+            usuarios.append(id_usuario)
+            libros.append(id_libro)
+    if not libros:
+        return
+
+    # Índices densos: fila = usuario, columna = libro
+    _, fila = np.unique(np.frombuffer(usuarios, dtype=np.int64), return_inverse=True)
+    ids_libro, columna = np.unique(np.frombuffer(libros, dtype=np.int64), return_inverse=True)
+    x = sparse.csr_matrix(
+        (np.ones(len(columna), dtype=np.float32), (fila, columna)),
+        shape=(fila.max() + 1, len(ids_libro))
+    )
+    del usuarios, libros, fila, columna
+    lectores = np.asarray(x.sum(axis=0), dtype=np.float64).ravel()
+    _insertar(LibroLectores, ['id_libro', 'lectores'],
+              zip(ids_libro.tolist(), lectores.astype(np.int64).tolist()))
+    xt = x.T.tocsr()
+
+    for inicio in range(0, len(ids_libro), BLOQUE):
+        coprestamos = (xt[inicio:inicio + BLOQUE] @ x).tocsr()
+        filas = np.repeat(
+            np.arange(coprestamos.shape[0]), np.diff(coprestamos.indptr)
+        ) + inicio
+        columnas, conteos = coprestamos.indices, coprestamos.data
+
+        validos = (columnas != filas) & (conteos >= MIN_COPRESTAMOS)
+        filas, columnas, conteos = filas[validos], columnas[validos], conteos[validos]
+        puntajes = conteos / np.sqrt(lectores[filas] * lectores[columnas])
+
+        # Mismo orden que consulta_similares(): puntaje, coprestamos, id
+        orden = np.lexsort((ids_libro[columnas], -conteos, -puntajes, filas))
+        filas, columnas = filas[orden], columnas[orden]
+        conteos, puntajes = conteos[orden], puntajes[orden]
+        posiciones = np.arange(len(filas)) - np.searchsorted(filas, filas) + 1
+        elegidos = posiciones <= top_n
+
+        yield from zip(
+            ids_libro[filas[elegidos]].tolist(),
+            posiciones[elegidos].tolist(),
+            ids_libro[columnas[elegidos]].tolist(),
+            puntajes[elegidos].tolist(),
+            conteos[elegidos].astype(np.int64).tolist()
+        )
+
+
+def _insertar(modelo, columnas, filas):
+    """INSERT por lotes de TAMANO_INSERCION; devuelve cuántas filas insertó"""
+    total, lote = 0, []
+    for fila in filas:
+        lote.append(dict(zip(columnas, fila)))
+        if len(lote) >= TAMANO_INSERCION:
+            db.session.execute(insert(modelo.__table__), lote)
+            total += len(lote)
+            lote = []
+    if lote:
+        db.session.execute(insert(modelo.__table__), lote)
+        total += len(lote)
+    return total
+
+
+def _en_bloques(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), TAMANO_IN):
+        yield ids[i:i + TAMANO_IN]
+
+
+def marcar_prestamos(session, ids_prestamo):
+    """Anota préstamos para la actualización incremental (para motores sin triggers)"""
+    filas = [{'id_prestamo': i} for i in set(ids_prestamo)]
+    if filas:
+        session.execute(insert(SimilarPendiente), filas)
+
+
+def recalcular_similares(top_n=TOP_N, usar_matriz=None):
+    """
+    Reconstruye libro_similar y libro_lectores en una transacción.
+    `usar_matriz` fuerza (o evita) la ruta con SciPy; por defecto se usa si
+    está instalado.
+    """
+    if usar_matriz is None:
+        usar_matriz = sparse is not None
+    if usar_matriz and sparse is None:
+        raise RuntimeError('La ruta vectorizada requiere numpy y scipy')
+
+    # La reconstrucción ya ve los préstamos confirmados de la cola; los que
+    # confirmen después dejan su fila para la actualización incremental
+    db.session.execute(delete(SimilarPendiente))
+    db.session.execute(delete(LibroSimilar))
+    db.session.execute(delete(LibroLectores))
+    if usar_matriz:
+        filas = _insertar(LibroSimilar, COLUMNAS, _similares_matriz(top_n))
+    else:
+        db.session.execute(insert(LibroLectores).from_select(
+            ['id_libro', 'lectores'], _consulta_lectores(_historial().subquery())
+        ))
+        db.session.execute(
+            insert(LibroSimilar).from_select(COLUMNAS, consulta_similares(top_n=top_n))
+        )
+        filas = db.session.execute(select(func.count()).select_from(LibroSimilar)).scalar()
+
+    registrar_cambios(db.session, LibroSimilar.__tablename__)
+    db.session.commit()
+    return {'filas': filas, 'metodo': 'matriz' if usar_matriz else 'sql'}
+
+
+def _orden(entrada):
+    # Mismo orden que consulta_similares(): puntaje, coprestamos, id
+    id_similar, puntaje, coprestamos = entrada
+    return -puntaje, -coprestamos, id_similar
+
+
+def _pares_de(libros, recalcular_lectores=False):
+    """
+    (id_libro, id_similar, puntaje, coprestamos) de cada libro de `libros`,
+    opcionalmente después de recalcular sus lectores. Solo recorre el
+    historial de los usuarios que pidieron alguno de esos libros.
+    """
+    sus_lectores = select(Prestamo.id_usuario).join(
+        PrestamoEdicion, PrestamoEdicion.id_prestamo == Prestamo.id_prestamo
+    ).join(
+        Edicion, Edicion.id_edicion == PrestamoEdicion.id_edicion
+    ).where(Edicion.id_libro.in_(libros)).distinct()
+    historial = _historial(sus_lectores).cte('historial')
+
+    if recalcular_lectores:
+        db.session.execute(delete(LibroLectores).where(LibroLectores.id_libro.in_(libros)))
+        db.session.execute(insert(LibroLectores).from_select(
+            ['id_libro', 'lectores'],
+            _consulta_lectores(historial).where(historial.c.id_libro.in_(libros))
+        ))
+
+    a, b = historial.alias('a'), historial.alias('b')
+    pares = select(
+        a.c.id_libro, b.c.id_libro.label('id_similar'), func.count().label('coprestamos')
+    ).join(
+        b, and_(a.c.id_usuario == b.c.id_usuario, a.c.id_libro != b.c.id_libro)
+    ).where(a.c.id_libro.in_(libros)).group_by(a.c.id_libro, b.c.id_libro).having(
+        func.count() >= MIN_COPRESTAMOS
+    ).subquery()
+
+    la, lb = LibroLectores.__table__.alias('la'), LibroLectores.__table__.alias('lb')
+    return db.session.execute(
+        select(
+            pares.c.id_libro, pares.c.id_similar,
+            _puntaje(pares.c.coprestamos, la.c.lectores, lb.c.lectores),
+            pares.c.coprestamos
+        ).join(
+            la, la.c.id_libro == pares.c.id_libro
+        ).join(
+            lb, lb.c.id_libro == pares.c.id_similar
+        )
+    ).all()
+
+
+def _actualizar_lote(ids_prestamo, top_n):
+    """Aplica un lote de préstamos de la cola; devuelve (libros nuevos, listas reescritas)"""
+    nuevos = set()
+    for bloque in _en_bloques(ids_prestamo):
+        nuevos.update(db.session.execute(
+            select(Edicion.id_libro).join(
+                PrestamoEdicion, PrestamoEdicion.id_edicion == Edicion.id_edicion
+            ).where(PrestamoEdicion.id_prestamo.in_(bloque))
+        ).scalars())
+    if not nuevos:
+        return 0, 0
+    nuevos = sorted(nuevos)
+
+    # Listas completas de los libros nuevos; el mismo par, visto desde el
+    # otro libro, actualiza la lista guardada de cada libro que lo comparte
+    listas, cambios = {}, {}
+    for id_libro, id_similar, puntaje, coprestamos in _pares_de(nuevos, recalcular_lectores=True):
+        listas.setdefault(id_libro, []).append((id_similar, puntaje, coprestamos))
+        cambios.setdefault(id_similar, {})[id_libro] = (puntaje, coprestamos)
+    for id_libro in nuevos:
+        listas[id_libro] = sorted(listas.get(id_libro, []), key=_orden)[:top_n]
+        cambios.pop(id_libro, None)
+
+    inciertos = []
+    for bloque in _en_bloques(sorted(cambios)):
+        guardadas = {}
+        for fila in db.session.execute(
+            select(LibroSimilar.id_libro, LibroSimilar.id_similar,
+                   LibroSimilar.puntaje, LibroSimilar.coprestamos)
+            .where(LibroSimilar.id_libro.in_(bloque))
+        ):
+            guardadas.setdefault(fila.id_libro, {})[fila.id_similar] = (fila.puntaje, fila.coprestamos)
+
+        for id_libro in bloque:
+            lista = guardadas.get(id_libro, {})
+            completa = len(lista) >= top_n
+            peor = max((_orden((k, *v)) for k, v in lista.items()), default=None)
+            cambio = False
+            for id_similar, valores in cambios[id_libro].items():
+                # Un par ya listado actualiza su puntaje; uno nuevo entra si
+                # hay lugar o supera al último de la lista guardada
+                if id_similar in lista:
+                    cambio = cambio or lista[id_similar] != valores
+                elif completa and _orden((id_similar, *valores)) > peor:
+                    continue
+                else:
+                    cambio = True
+                lista[id_similar] = valores
+            if not cambio:
+                continue
+            nueva = sorted(((k, *v) for k, v in lista.items()), key=_orden)[:top_n]
+            if completa and _orden(nueva[-1]) > peor:
+                # Bajó un puntaje hasta el último lugar: un libro que no estaba
+                # guardado (peor que el último anterior) podría superarlo
+                inciertos.append(id_libro)
+            else:
+                listas[id_libro] = nueva
+
+    for bloque in _en_bloques(inciertos):
+        recalculadas = {id_libro: [] for id_libro in bloque}
+        for id_libro, id_similar, puntaje, coprestamos in _pares_de(bloque):
+            recalculadas[id_libro].append((id_similar, puntaje, coprestamos))
+        for id_libro, pares in recalculadas.items():
+            listas[id_libro] = sorted(pares, key=_orden)[:top_n]
+
+    reescritos = sorted(listas)
+    for bloque in _en_bloques(reescritos):
+        db.session.execute(delete(LibroSimilar).where(LibroSimilar.id_libro.in_(bloque)))
+    _insertar(LibroSimilar, COLUMNAS, (
+        (id_libro, posicion, id_similar, puntaje, coprestamos)
+        for id_libro in reescritos
+        for posicion, (id_similar, puntaje, coprestamos) in enumerate(listas[id_libro], 1)
+    ))
+    return len(nuevos), len(reescritos)
+
+
+def actualizar_similares(top_n=TOP_N, lote=TAMANO_LOTE):
+    """
+    Procesa la cola de préstamos nuevos por lotes de `lote` préstamos; cada
+    lote (retirarlo de la cola + reescribir las listas) es una transacción.
+    Sin libro_lectores (nunca se reconstruyó) hace la reconstrucción completa.
+    """
+    if db.session.execute(select(LibroLectores.id_libro).limit(1)).first() is None:
+        return recalcular_similares(top_n)
+
+    totales = {'prestamos': 0, 'libros': 0, 'listas': 0}
+    while True:
+        siguientes = select(SimilarPendiente.id_prestamo).order_by(
+            SimilarPendiente.id_prestamo
+        ).limit(lote)
+        ids = db.session.execute(
+            delete(SimilarPendiente)
+            .where(SimilarPendiente.id_prestamo.in_(siguientes.scalar_subquery()))
+            .returning(SimilarPendiente.id_prestamo)
+        ).scalars().all()
+        if not ids:
+            db.session.commit()
+            return totales
+
+        libros, listas = _actualizar_lote(ids, top_n)
+        registrar_cambios(db.session, LibroSimilar.__tablename__)
+        db.session.commit()
+        totales['prestamos'] += len(ids)
+        totales['libros'] += libros
+        totales['listas'] += listas
+
+
+def similares_de_libro(book, limite=10):
+    """Similares precalculados de un libro del catálogo, como libros del catálogo"""
+    if book.id_libro is None:
+        return []
+    filas = db.session.execute(
+        select(
+            Book.id, Book.title, Book.author,
+            LibroSimilar.puntaje, LibroSimilar.coprestamos
+        ).join(
+            Book, Book.id_libro == LibroSimilar.id_similar
+        ).where(
+            LibroSimilar.id_libro == book.id_libro
+        ).order_by(LibroSimilar.posicion).limit(limite)
+    )
+    return [{
+        'id': f.id,
+        'title': f.title,
+        'author': f.author,
+        'puntaje': round(f.puntaje, 4),
+        'coprestamos': f.coprestamos
+    } for f in filas]
@@ -0,0 +1,157 @@
+# services/sincronizacion.py
+"""
+Sincronización incremental del esquema legacy (libro, autor_libro,
+libro_genero) hacia el catálogo (books, categories).
+
+Los triggers de la migración anotan en catalogo_cambio cada libro legacy
+modificado. catalogo_cambio funciona como cola (igual que
+inventario_pendiente): cada lote se toma con DELETE ... RETURNING y se
+proyecta en la misma transacción. Un watermark por id no serviría: los
+ids se asignan al insertar, no al confirmar, y una transacción que tomó
+un id bajo y confirma tarde quedaría por debajo de la marca para siempre.
+"""
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from models.base import db
+from models.model import (
+    Book, Category, Libro, Autor, AutorLibro, Genero, LibroGenero,
+    CatalogoCambio, EstadoProceso
+)
+from services.eventos import registrar_cambios
+
+PROCESO = 'sincronizacion_catalogo'
+TAMANO_LOTE = 1000
+
+
+def _estado():
+    estado = db.session.get(EstadoProceso, PROCESO)
+    if estado is None:
+        estado = EstadoProceso(nombre=PROCESO, actualizado_en=datetime.utcnow(), marca=0)
+        db.session.add(estado)
+    return estado
+
+
+def _proyeccion(ids):
+    """Título, sinopsis, primer autor y primer género de cada libro legacy"""
+    libros = {
+        row.id_libro: row
+        for row in db.session.execute(
+            select(Libro.id_libro, Libro.titulo_libro, Libro.sinopsis)
+            .where(Libro.id_libro.in_(ids))
+        )
+    }
+
+    autores = {}
+    for row in db.session.execute(
+        select(AutorLibro.id_libro, Autor.nombre_autor)
+        .join(Autor, AutorLibro.id_autor == Autor.id_autor)
+        .where(AutorLibro.id_libro.in_(ids))
+        .order_by(AutorLibro.id_autor_libro)
+    ):
+        autores.setdefault(row.id_libro, row.nombre_autor)
+
+    generos = {}
+    for row in db.session.execute(
+        select(LibroGenero.id_libro, Genero.nombre_genero)
+        .join(Genero, LibroGenero.id_genero == Genero.id_genero)
+        .where(LibroGenero.id_libro.in_(ids))
+        .order_by(LibroGenero.id_libro_genero)
+    ):
+        generos.setdefault(row.id_libro, row.nombre_genero)
+
+    return libros, autores, generos
+
+
+def _categorias_por_nombre(nombres):
+    """Id de categoría por nombre, creando las que falten"""
+    existentes = dict(db.session.execute(
+        select(Category.name, Category.id).where(Category.name.in_(nombres))
+    ).all())
+    faltantes = [n for n in nombres if n not in existentes]
+    if faltantes:
+        db.session.execute(insert(Category), [{'name': n} for n in faltantes])
+        existentes.update(db.session.execute(
+            select(Category.name, Category.id).where(Category.name.in_(faltantes))
+        ).all())
+        registrar_cambios(db.session, Category.__tablename__)
+    return existentes
+
+
+def _aplicar_lote(ids):
+    libros, autores, generos = _proyeccion(ids)
+    categorias = _categorias_por_nombre(sorted(set(generos.values())))
+
+    proyectados = [{
+        'b_id_libro': id_libro,
+        'title': row.titulo_libro,
+        'author': autores.get(id_libro, 'Desconocido'),
+        'description': row.sinopsis,
+        'category_id': categorias.get(generos.get(id_libro))
+    } for id_libro, row in libros.items()]
+
+    existentes = set(db.session.execute(
+        select(Book.id_libro).where(Book.id_libro.in_(ids))
+    ).scalars())
+
+    actualizar = [p for p in proyectados if p['b_id_libro'] in existentes]
+    if actualizar:
+        db.session.connection().execute(
+            update(Book.__table__)
+            .where(Book.__table__.c.id_libro == bindparam('b_id_libro'))
+            .values(title=bindparam('title'), author=bindparam('author'),
+                    description=bindparam('description'),
+                    category_id=bindparam('category_id')),
+            actualizar
+        )
+
+    nuevos = [
+        {**{k: v for k, v in p.items() if k != 'b_id_libro'}, 'id_libro': p['b_id_libro']}
+        for p in proyectados if p['b_id_libro'] not in existentes
+    ]
+    if nuevos:
+        db.session.execute(insert(Book), nuevos)
+
+    # Libros legacy eliminados
+    eliminados = set(ids) - set(libros)
+    if eliminados:
+        db.session.execute(delete(Book).where(Book.id_libro.in_(eliminados)))
+
+    registrar_cambios(db.session, Book.__tablename__)
+    return len(actualizar), len(nuevos), len(eliminados)
+
+
+def sincronizar_catalogo(lote=TAMANO_LOTE):
+    """
+    Procesa los cambios anotados, por lotes. Cada lote (retirarlo de la
+    cola + proyección) es una transacción: si falla, los cambios quedan.
+    """
+    inicio = time.perf_counter()
+    totales = {'cambios': 0, 'actualizados': 0, 'insertados': 0, 'eliminados': 0}
+
+    while True:
+        siguientes = select(CatalogoCambio.id).order_by(CatalogoCambio.id).limit(lote)
+        cambios = db.session.execute(
+            delete(CatalogoCambio)
+            .where(CatalogoCambio.id.in_(siguientes.scalar_subquery()))
+            .returning(CatalogoCambio.id_libro)
+        ).scalars().all()
+        if not cambios:
+            db.session.commit()
+            break
+
+        actualizados, insertados, eliminados = _aplicar_lote(sorted(set(cambios)))
+
+        _estado().actualizado_en = datetime.utcnow()
+        db.session.commit()
+
+        totales['cambios'] += len(cambios)
+        totales['actualizados'] += actualizados
+        totales['insertados'] += insertados
+        totales['eliminados'] += eliminados
+
+    totales['segundos'] = round(time.perf_counter() - inicio, 3)
+    return totales
+
@@ -0,0 +1,356 @@
+# services/sugerencias.py
+"""
+Autocompletado de títulos y autores con un índice de prefijos en memoria.
+
+Los textos se normalizan (minúsculas, sin acentos ni signos) y se indexa
+el comienzo de cada palabra, así 'garcia' encuentra 'Gabriel García
+Márquez'. El índice es un arreglo ordenado de enteros (documento, posición
+de la palabra) que se recorre con bisect: no guarda una copia por sufijo y
+una búsqueda cuesta O(log n) comparaciones más los k resultados.
+
+El índice se construye al primer uso (o al arrancar, con
+SUGERENCIAS_PRECARGAR) y se actualiza con cada commit que modifica books
+(services.eventos). Los cambios hechos por otros procesos se detectan por
+la versión de la tabla (version_tabla), revisada como mucho cada
+SUGERENCIAS_VERIFICAR_SEGUNDOS; en ese caso se reconstruye en segundo plano
+mientras se sigue respondiendo con el índice anterior.
+"""
+import re
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+
+from sqlalchemy import select
+
+from models.base import db
+from models.model import Book, VersionTabla
+from services.eventos import al_confirmar
+# Importar versiones primero registra su suscriptor antes que el de este módulo:
+# al actualizar el índice, version_tabla ya tiene la versión del commit
+from services.versiones import registrar_tablas
+
+TABLA = 'books'
+LIMITE_MAXIMO = 50
+ESCANEO_MAXIMO = 200
+LARGO_MAXIMO = 255  # la posición de la palabra se guarda en 8 bits
+
+registrar_tablas(TABLA)
+
+
+_DIACRITICOS = re.compile('[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]')
+_SEPARADORES = re.compile(r'[\W_]+')
+
+
+def normalizar(texto):
+    """minúsculas, sin acentos, solo letras y dígitos separados por un espacio"""
+    texto = texto or ''
+    if not texto.isascii():
+        texto = _DIACRITICOS.sub('', unicodedata.normalize('NFKD', texto))
+    return _SEPARADORES.sub(' ', texto.casefold())[:LARGO_MAXIMO].strip()
+
+
+def _version_libros(conexion):
+    # Siempre de la primaria: una réplica atrasada forzaría reconstrucciones
+    return conexion.execute(
+        select(VersionTabla.version).where(VersionTabla.tabla == TABLA)
+    ).scalar() or 0
+
+
+def _inicios_de_palabra(texto):
+    inicios = [0]
+    i = texto.find(' ')
+    while i != -1:
+        inicios.append(i + 1)
+        i = texto.find(' ', i + 1)
+    return inicios
+
+
+class IndicePrefijos:
+    """
+    Documentos (clave -> texto visible) buscables por prefijo de palabra.
+    No es seguro entre hilos: IndiceSugerencias lo protege con un lock.
+
+    Cada entrada es (documento << 8) | posición de una palabra. Las de la
+    primera palabra van en _comienzos y las demás en _palabras, ambas
+    ordenadas por el texto desde esa posición: los documentos que empiezan
+    por el prefijo salen primero sin ordenar nada al consultar.
+    """
+
+    def __init__(self):
+        self._textos = []       # texto normalizado por documento (None si se borró)
+        self._visibles = []
+        self._claves = []
+        self._doc_por_clave = {}
+        self._libres = []
+        self._comienzos = array('Q')
+        self._palabras = array('Q')
+
+    def __len__(self):
+        return len(self._doc_por_clave)
+
+    def _sufijo(self, entrada):
+        return self._textos[entrada >> 8][entrada & 0xFF:]
+
+    def _arreglo(self, inicio):
+        return self._palabras if inicio else self._comienzos
+
+    def cargar(self, documentos):
+        """Carga masiva de (clave, texto visible): un solo ordenamiento al final"""
+        comienzos, palabras = [], []
+        for clave, visible in documentos:
+            doc = self._nuevo_documento(clave, visible)
+            if doc is not None:
+                inicios = _inicios_de_palabra(self._textos[doc])
+                comienzos.append(doc << 8)
+                palabras.extend((doc << 8) | i for i in inicios[1:])
+        comienzos.sort(key=self._sufijo)
+        palabras.sort(key=self._sufijo)
+        self._comienzos, self._palabras = array('Q', comienzos), array('Q', palabras)
+
+    def _nuevo_documento(self, clave, visible):
+        texto = normalizar(visible)
+        if not texto:
+            return None
+        if self._libres:
+            doc = self._libres.pop()
+            self._textos[doc], self._visibles[doc], self._claves[doc] = texto, visible, clave
+        else:
+            doc = len(self._textos)
+            self._textos.append(texto)
+            self._visibles.append(visible)
+            self._claves.append(clave)
+        self._doc_por_clave[clave] = doc
+        return doc
+
+    def poner(self, clave, visible):
+        """Agrega o reemplaza un documento"""
+        self.quitar(clave)
+        doc = self._nuevo_documento(clave, visible)
+        if doc is None:
+            return
+        for i in _inicios_de_palabra(self._textos[doc]):
+            insort(self._arreglo(i), (doc << 8) | i, key=self._sufijo)
+
+    def quitar(self, clave):
+        doc = self._doc_por_clave.pop(clave, None)
+        if doc is None:
+            return
+        texto = self._textos[doc]
+        for i in _inicios_de_palabra(texto):
+            entradas, entrada = self._arreglo(i), (doc << 8) | i
+            pos = bisect_left(entradas, texto[i:], key=self._sufijo)
+            # Entre sufijos iguales de otros documentos, busca el propio
+            while entradas[pos] != entrada:
+                pos += 1
+            del entradas[pos]
+        self._textos[doc] = self._visibles[doc] = self._claves[doc] = None
+        self._libres.append(doc)
+
+    def _coincidencias(self, entradas, prefijo):
+        pos = bisect_left(entradas, prefijo, key=self._sufijo)
+        for escaneadas in range(ESCANEO_MAXIMO):
+            if pos + escaneadas >= len(entradas):
+                return
+            entrada = entradas[pos + escaneadas]
+            if not self._sufijo(entrada).startswith(prefijo):
+                return
+            yield entrada >> 8
+
+    def buscar(self, prefijo, limite):
+        """
+        [(clave, visible)] de hasta `limite` documentos con una palabra que
+        empieza por `prefijo` (ya normalizado): primero los que empiezan por
+        él, en orden alfabético; después los que lo tienen en otra palabra,
+        por orden de esa palabra.
+        """
+        encontrados = {}
+        for entradas in (self._comienzos, self._palabras):
+            for doc in self._coincidencias(entradas, prefijo):
+                if len(encontrados) >= limite:
+                    break
+                encontrados.setdefault(doc, None)
+        return [(self._claves[doc], self._visibles[doc]) for doc in encontrados]
+
+    def memoria(self):
+        """Bytes aproximados de las estructuras (sin contar los textos visibles compartidos)"""
+        textos = sum(sys.getsizeof(t) for t in self._textos if t is not None)
+        listas = sum(sys.getsizeof(x) for x in (self._textos, self._visibles, self._claves))
+        entradas = len(self._comienzos) + len(self._palabras)
+        return {
+            'documentos': len(self),
+            'entradas': entradas,
+            'bytes': textos + listas + sys.getsizeof(self._doc_por_clave)
+            + self._palabras.itemsize * entradas,
+        }
+
+
+class IndiceSugerencias:
+    """Títulos (por libro) y autores (con su cantidad de libros) del catálogo"""
+
+    def __init__(self):
+        self.app = None
+        self.verificar_cada = 5
+        self._lock = threading.Lock()
+        self._titulos = IndicePrefijos()
+        self._autores = IndicePrefijos()
+        self._autor_de_libro = {}
+        self._libros_por_autor = {}
+        self._construido = False
+        self._version = None
+        self._verificado_en = 0.0
+        self._reconstruyendo = False
+
+    def init_app(self, app):
+        self.app = app
+        self.verificar_cada = app.config.get('SUGERENCIAS_VERIFICAR_SEGUNDOS', self.verificar_cada)
+        if app.config.get('SUGERENCIAS_PRECARGAR'):
+            self._reconstruir_en_segundo_plano()
+
+    # ---------- construcción ----------
+
+    def _leer_libros(self, conexion, ids=None):
+        stmt = select(Book.id, Book.title, Book.author)
+        if ids is not None:
+            stmt = stmt.where(Book.id.in_(ids))
+        return conexion.execute(stmt.execution_options(yield_per=5000))
+
+    def construir(self):
+        """Construye el índice completo desde la base y lo publica de una vez"""
+        with db.engine.connect() as conexion:
+            version = _version_libros(conexion)
+            titulos, autores = IndicePrefijos(), IndicePrefijos()
+            autor_de_libro, libros_por_autor = {}, {}
+            visibles_autor = {}
+            documentos = []
+            for id_libro, titulo, autor in self._leer_libros(conexion):
+                documentos.append((id_libro, titulo))
+                clave = normalizar(autor)
+                autor_de_libro[id_libro] = clave
+                libros_por_autor[clave] = libros_por_autor.get(clave, 0) + 1
+                visibles_autor.setdefault(clave, autor)
+            titulos.cargar(documentos)
+            autores.cargar(visibles_autor.items())
+
+        with self._lock:
+            self._titulos, self._autores = titulos, autores
+            self._autor_de_libro, self._libros_por_autor = autor_de_libro, libros_por_autor
+            self._version = version
+            self._verificado_en = time.monotonic()
+            self._construido = True
+
+    def _reconstruir_en_segundo_plano(self):
+        with self._lock:
+            if self._reconstruyendo:
+                return
+            self._reconstruyendo = True
+
+        def tarea():
+            try:
+                with self.app.app_context():
+                    self.construir()
+            except Exception:
+                self.app.logger.exception('Error reconstruyendo el índice de sugerencias')
+            finally:
+                self._reconstruyendo = False
+
+        threading.Thread(target=tarea, name='sugerencias', daemon=True).start()
+
+    def _asegurar_vigente(self):
+        if not self._construido:
+            self.construir()
+            return
+        if time.monotonic() - self._verificado_en < self.verificar_cada:
+            return
+        self._verificado_en = time.monotonic()
+        with db.engine.connect() as conexion:
+            version = _version_libros(conexion)
+        if version != self._version:
+            # Otro proceso modificó el catálogo: se reconstruye sin bloquear
+            self._reconstruir_en_segundo_plano()
+
+    # ---------- actualización incremental ----------
+
+    def _quitar_libro(self, id_libro):
+        self._titulos.quitar(id_libro)
+        clave = self._autor_de_libro.pop(id_libro, None)
+        if clave is None:
+            return
+        restantes = self._libros_por_autor.get(clave, 1) - 1
+        if restantes > 0:
+            self._libros_por_autor[clave] = restantes
+        else:
+            self._libros_por_autor.pop(clave, None)
+            self._autores.quitar(clave)
+
+    def _poner_libro(self, id_libro, titulo, autor):
+        self._titulos.poner(id_libro, titulo)
+        clave = normalizar(autor)
+        self._autor_de_libro[id_libro] = clave
+        self._libros_por_autor[clave] = self._libros_por_autor.get(clave, 0) + 1
+        if clave not in self._autores._doc_por_clave:
+            self._autores.poner(clave, autor)
+
+    def actualizar(self, ids):
+        """Relee de la base los libros indicados y los reemplaza en el índice"""
+        with db.engine.connect() as conexion:
+            filas = {f.id: f for f in self._leer_libros(conexion, list(ids))}
+            version = _version_libros(conexion)
+        with self._lock:
+            for id_libro in ids:
+                self._quitar_libro(id_libro)
+                fila = filas.get(id_libro)
+                if fila is not None:
+                    self._poner_libro(fila.id, fila.title, fila.author)
+            # Si la versión avanzó más de lo esperado hubo cambios de otro proceso
+            if self._version is not None and version == self._version + 1:
+                self._version = version
+            else:
+                self._verificado_en = 0.0
+
+    # ---------- consulta ----------
+
+    def sugerir(self, prefijo, limite=10):
+        prefijo = normalizar(prefijo)
+        limite = max(1, min(limite or 10, LIMITE_MAXIMO))
+        if not prefijo:
+            return {'titulos': [], 'autores': []}
+
+        self._asegurar_vigente()
+        with self._lock:
+            titulos = self._titulos.buscar(prefijo, limite)
+            autores = self._autores.buscar(prefijo, limite)
+            libros_por_autor = [self._libros_por_autor.get(clave, 0) for clave, _ in autores]
+        return {
+            'titulos': [{'id': id_libro, 'title': titulo} for id_libro, titulo in titulos],
+            'autores': [
+                {'author': autor, 'libros': libros}
+                for (_, autor), libros in zip(autores, libros_por_autor)
+            ],
+        }
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'construido': self._construido,
+                'version': self._version,
+                'titulos': self._titulos.memoria(),
+                'autores': self._autores.memoria(),
+            }
+
+
+indice_sugerencias = IndiceSugerencias()
+
+
+@al_confirmar
+def _actualizar_por_commit(cambios):
+    if TABLA not in cambios or not indice_sugerencias._construido:
+        return
+    ids = cambios[TABLA]
+    if ids:
+        indice_sugerencias.actualizar(ids)
+    else:
+        # Cambio masivo sin ids (importación): se reconstruye completo
+        indice_sugerencias._reconstruir_en_segundo_plano()
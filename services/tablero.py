@@ -0,0 +1,162 @@
+# services/tablero.py
+"""
+Reportes del panel de administración en una sola petición.
+
+/api/reportes/dashboard recibe la lista de reportes y los ejecuta en
+paralelo en un pool de hilos acotado (DASHBOARD_WORKERS). Cada reporte
+corre en su propio contexto de aplicación, así Flask-SQLAlchemy le da una
+sesión y una conexión del pool propias, que se devuelven al terminar. Un
+reporte que falla o excede DASHBOARD_TIMEOUT se informa en su entrada sin
+afectar al resto. En PostgreSQL cada transacción de un reporte lleva un
+statement_timeout igual al tiempo que le queda: una consulta que se pasa
+se cancela en la base y devuelve su conexión, en lugar de seguir
+ocupándola después de que la respuesta ya la descartó.
+
+DASHBOARD_WORKERS debería ser menor que DB_POOL_SIZE: cada hilo ocupa una
+conexión mientras corre su consulta.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models.replicas import replicas
+from services.reportes import (
+    datos_historial_usuario, datos_inventario, datos_prestamos_activos,
+    datos_top_usuarios, datos_usuarios
+)
+
+MAX_REPORTES = 10
+
+# nombre -> (función, parámetros requeridos); los parámetros son enteros
+REPORTES = {
+    'inventario': (datos_inventario, ()),
+    'prestamos_activos': (datos_prestamos_activos, ()),
+    'top_usuarios': (datos_top_usuarios, ()),
+    'usuarios': (datos_usuarios, ()),
+    'historial_usuario': (datos_historial_usuario, ('user_id',)),
+}
+
+
+class ErrorTablero(ValueError):
+    """Pedido de reportes no válido"""
+
+
+def interpretar_pedidos(pedidos, parametros_comunes=None):
+    """
+    Normaliza la lista de reportes pedidos a [(clave, nombre, parámetros)].
+
+    Cada elemento es un nombre o un objeto {"nombre", "parametros", "clave"};
+    la clave (por defecto el nombre) identifica el reporte en la respuesta,
+    lo que permite pedir el mismo reporte con distintos parámetros.
+    """
+    if not isinstance(pedidos, list) or not pedidos:
+        raise ErrorTablero('Se requiere una lista no vacía de reportes')
+    if len(pedidos) > MAX_REPORTES:
+        raise ErrorTablero(f'Máximo {MAX_REPORTES} reportes por petición')
+
+    normalizados = []
+    claves = set()
+    for pedido in pedidos:
+        if isinstance(pedido, str):
+            pedido = {'nombre': pedido}
+        if not isinstance(pedido, dict):
+            raise ErrorTablero('Cada reporte debe ser un nombre o un objeto')
+
+        nombre = pedido.get('nombre')
+        if nombre not in REPORTES:
+            raise ErrorTablero(f'Reporte no válido: {nombre}')
+
+        clave = pedido.get('clave') or nombre
+        if clave in claves:
+            raise ErrorTablero(f'Reporte repetido: {clave} (use "clave" para distinguirlos)')
+        claves.add(clave)
+
+        propios = pedido.get('parametros') or {}
+        parametros = {}
+        for requerido in REPORTES[nombre][1]:
+            valor = propios.get(requerido, (parametros_comunes or {}).get(requerido))
+            try:
+                parametros[requerido] = int(valor)
+            except (TypeError, ValueError):
+                raise ErrorTablero(f'El reporte {clave} requiere el parámetro entero {requerido}')
+        normalizados.append((clave, nombre, parametros))
+    return normalizados
+
+
+@event.listens_for(Session, 'after_begin')
+def _limitar_sentencias(session, transaccion, conexion):
+    """En los hilos del tablero, ninguna sentencia dura más que el tiempo restante del reporte"""
+    limite = g.get('tablero_limite') if has_app_context() else None
+    if limite is None or conexion.dialect.name != 'postgresql':
+        return
+    restante_ms = max(int((limite - time.monotonic()) * 1000), 1)
+    conexion.exec_driver_sql(f'SET LOCAL statement_timeout = {restante_ms}')
+
+
+class Tablero:
+    def __init__(self):
+        self.app = None
+        self.tiempo_limite = 30
+        self._executor = None
+
+    def init_app(self, app):
+        self.app = app
+        self.tiempo_limite = app.config.get('DASHBOARD_TIMEOUT', self.tiempo_limite)
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config.get('DASHBOARD_WORKERS', 4),
+            thread_name_prefix='tablero'
+        )
+
+    def _ejecutar(self, clave, nombre, parametros, en_replica, limite):
+        inicio = time.perf_counter()
+        # Contexto propio: sesión y conexión propias, liberadas al salir
+        with self.app.app_context():
+            g.solo_lectura = en_replica
+            g.tablero_limite = limite
+            try:
+                datos = REPORTES[nombre][0](**parametros)
+                if datos is None:
+                    resultado = {'ok': False, 'error': 'No se encontraron datos'}
+                else:
+                    resultado = {'ok': True, 'datos': datos}
+            except Exception as e:
+                self.app.logger.error(f'Error en reporte {clave} del dashboard: {str(e)}')
+                resultado = {'ok': False, 'error': str(e)}
+        resultado['ms'] = round((time.perf_counter() - inicio) * 1000, 1)
+        return resultado
+
+    def ejecutar(self, pedidos):
+        """Corre los reportes en paralelo; devuelve {clave: resultado} y el tiempo total"""
+        inicio = time.perf_counter()
+        limite = time.monotonic() + self.tiempo_limite
+        # Los hilos no ven la petición: se decide aquí si pueden leer de réplicas
+        en_replica = replicas.lectura_permitida()
+        futuros = {
+            clave: self._executor.submit(
+                self._ejecutar, clave, nombre, parametros, en_replica, limite
+            )
+            for clave, nombre, parametros in pedidos
+        }
+        wait(futuros.values(), timeout=self.tiempo_limite)
+
+        reportes = {}
+        for clave, futuro in futuros.items():
+            if futuro.done():
+                reportes[clave] = futuro.result()
+            else:
+                # Si aún no empezó no se ejecuta; si ya corre, su resultado se descarta
+                futuro.cancel()
+                reportes[clave] = {
+                    'ok': False, 'error': 'Tiempo de espera agotado',
+                    'ms': round(self.tiempo_limite * 1000, 1)
+                }
+        return {
+            'reportes': reportes,
+            'total_ms': round((time.perf_counter() - inicio) * 1000, 1)
+        }
+
+
+tablero = Tablero()
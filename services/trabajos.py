@@ -0,0 +1,261 @@
+# services/trabajos.py
+"""
+Cola de trabajos en segundo plano respaldada por la tabla `trabajo`.
+
+La web encola con encolar() y responde de inmediato; scripts/worker.py
+reclama trabajos pendientes (FOR UPDATE SKIP LOCKED en PostgreSQL) y los
+ejecuta con la función registrada para su tipo. No necesita servicios
+externos: la base de datos es la cola.
+
+Los resultados JSON se guardan en la columna resultado. Las tareas que
+generan archivos (registradas con `extension`) devuelven fragmentos que
+se escriben a medida que llegan en TRABAJOS_DIR, compartido entre la web
+y los workers, y la fila solo guarda el nombre del archivo. Los trabajos
+terminados se borran, con su archivo, pasadas RETENCION_HORAS
+(purgar_terminados(), que el worker corre periódicamente).
+"""
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, select, update
+
+from models.base import db, es_postgres
+from models.model import Trabajo
+from services import inventario, reportes, similares
+from services.pdf import generador_pdf
+from services.sincronizacion import sincronizar_catalogo
+
+PENDIENTE = 'pendiente'
+PROCESANDO = 'procesando'
+LISTO = 'listo'
+ERROR = 'error'
+
+MAX_INTENTOS = 3
+RETENCION_HORAS = 24
+TAMANO_PURGA = 1000
+
+_tareas = {}
+
+
+def tarea(tipo, tipo_contenido='application/json', extension=None):
+    """
+    Registra la función que ejecuta los trabajos de un tipo. Con
+    `extension` la función devuelve un iterable de fragmentos (str o
+    bytes) que se escriben en un archivo en lugar de la columna resultado.
+    """
+    def decorador(fn):
+        _tareas[tipo] = (fn, tipo_contenido, extension)
+        return fn
+    return decorador
+
+
+def directorio():
+    """Directorio de los archivos de resultado (TRABAJOS_DIR)"""
+    ruta = current_app.config.get(
+        'TRABAJOS_DIR', os.path.join(current_app.instance_path, 'trabajos')
+    )
+    os.makedirs(ruta, exist_ok=True)
+    return ruta
+
+
+def tipos_registrados():
+    return sorted(_tareas)
+
+
+def _parametros(parametros):
+    # Claves ordenadas: los mismos parámetros dan siempre el mismo texto
+    return json.dumps(parametros or {}, sort_keys=True)
+
+
+def encolar(tipo, parametros=None):
+    if tipo not in _tareas:
+        raise ValueError(f'Tipo de trabajo no válido: {tipo}')
+
+    trabajo = Trabajo(
+        id=uuid.uuid4().hex,
+        tipo=tipo,
+        parametros=_parametros(parametros),
+        estado=PENDIENTE,
+        intentos=0,
+        creado_en=datetime.utcnow()
+    )
+    db.session.add(trabajo)
+    db.session.commit()
+    return trabajo
+
+
+def encolar_unico(tipo, parametros=None):
+    """Como encolar(), pero reutiliza un trabajo igual que aún no terminó"""
+    existente = db.session.execute(
+        select(Trabajo).where(
+            Trabajo.tipo == tipo,
+            Trabajo.parametros == _parametros(parametros),
+            Trabajo.estado.in_((PENDIENTE, PROCESANDO))
+        ).order_by(Trabajo.creado_en).limit(1)
+    ).scalar()
+    return existente or encolar(tipo, parametros)
+
+
+def obtener(trabajo_id):
+    return db.session.get(Trabajo, trabajo_id)
+
+
+def a_dict(trabajo):
+    return {
+        'job_id': trabajo.id,
+        'tipo': trabajo.tipo,
+        'parametros': json.loads(trabajo.parametros),
+        'estado': trabajo.estado,
+        'error': trabajo.error,
+        'intentos': trabajo.intentos,
+        'creado_en': trabajo.creado_en.isoformat(),
+        'iniciado_en': trabajo.iniciado_en.isoformat() if trabajo.iniciado_en else None,
+        'terminado_en': trabajo.terminado_en.isoformat() if trabajo.terminado_en else None,
+    }
+
+
+def reclamar_siguiente():
+    """
+    Toma el trabajo pendiente más antiguo y lo marca como en proceso.
+
+    El UPDATE condicionado a estado='pendiente' garantiza que dos workers
+    no ejecuten el mismo trabajo; en PostgreSQL SKIP LOCKED además evita
+    que esperen por la misma fila.
+    """
+    consulta = select(Trabajo.id).where(
+        Trabajo.estado == PENDIENTE
+    ).order_by(Trabajo.creado_en).limit(1)
+    if es_postgres():
+        consulta = consulta.with_for_update(skip_locked=True)
+
+    trabajo_id = db.session.execute(consulta).scalar()
+    if trabajo_id is None:
+        db.session.rollback()
+        return None
+
+    reclamado = db.session.execute(
+        update(Trabajo)
+        .where(Trabajo.id == trabajo_id, Trabajo.estado == PENDIENTE)
+        .values(estado=PROCESANDO, iniciado_en=datetime.utcnow(),
+                intentos=Trabajo.intentos + 1)
+    ).rowcount
+    db.session.commit()
+    return obtener(trabajo_id) if reclamado else None
+
+
+def _escribir_archivo(trabajo, fragmentos, extension):
+    """Escribe los fragmentos en <id>.<extension> sin juntarlos en memoria"""
+    nombre = f'{trabajo.id}.{extension}'
+    ruta = os.path.join(directorio(), nombre)
+    # Escritura atómica: la descarga nunca ve un archivo a medio escribir
+    temporal = ruta + f'.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(temporal, 'wb') as f:
+            for fragmento in fragmentos:
+                f.write(fragmento.encode('utf-8') if isinstance(fragmento, str) else fragmento)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return nombre
+
+
+def ejecutar(trabajo):
+    fn, tipo_contenido, extension = _tareas[trabajo.tipo]
+    try:
+        resultado = fn(**json.loads(trabajo.parametros))
+        if extension:
+            trabajo.archivo = _escribir_archivo(trabajo, resultado, extension)
+            trabajo.resultado = None
+        else:
+            trabajo.resultado = resultado if isinstance(resultado, str) else json.dumps(resultado)
+        trabajo.tipo_contenido = tipo_contenido
+        trabajo.estado = LISTO
+        trabajo.error = None
+    except Exception as e:
+        db.session.rollback()
+        trabajo = obtener(trabajo.id)
+        trabajo.error = str(e)
+        trabajo.estado = PENDIENTE if trabajo.intentos < MAX_INTENTOS else ERROR
+    trabajo.terminado_en = datetime.utcnow()
+    db.session.commit()
+    return trabajo
+
+
+def recuperar_huerfanos(minutos=30):
+    """Devuelve a la cola los trabajos que quedaron en proceso (p. ej. por un worker caído)"""
+    limite = datetime.utcnow() - timedelta(minutes=minutos)
+    recuperados = db.session.execute(
+        update(Trabajo)
+        .where(Trabajo.estado == PROCESANDO, Trabajo.iniciado_en < limite)
+        .values(estado=PENDIENTE)
+    ).rowcount
+    db.session.commit()
+    return recuperados
+
+
+def purgar_terminados(horas=RETENCION_HORAS, lote=TAMANO_PURGA):
+    """Borra los trabajos terminados (listos o con error) hace más de `horas`, y sus archivos"""
+    limite = datetime.utcnow() - timedelta(hours=horas)
+    total = 0
+    while True:
+        viejos = select(Trabajo.id).where(
+            Trabajo.estado.in_((LISTO, ERROR)), Trabajo.terminado_en < limite
+        ).limit(lote)
+        archivos = db.session.execute(
+            delete(Trabajo)
+            .where(Trabajo.id.in_(viejos.scalar_subquery()))
+            .returning(Trabajo.archivo)
+        ).scalars().all()
+        db.session.commit()
+
+        # Después del commit: si falla el borrado queda un archivo suelto,
+        # nunca una fila que apunte a un archivo inexistente
+        for archivo in filter(None, archivos):
+            try:
+                os.remove(os.path.join(directorio(), archivo))
+            except FileNotFoundError:
+                pass
+
+        total += len(archivos)
+        if len(archivos) < lote:
+            return total
+
+
+# ==============================================
+# TAREAS DE REPORTES
+# ==============================================
+
+tarea('historial_usuario')(reportes.datos_historial_usuario)
+tarea('inventario')(reportes.datos_inventario)
+tarea('prestamos_activos')(reportes.datos_prestamos_activos)
+tarea('top_usuarios')(reportes.datos_top_usuarios)
+
+
+@tarea('descarga_csv', tipo_contenido='text/csv', extension='csv')
+def _descarga_csv(report_type, user_id=None):
+    reporte = reportes.reporte_descarga(report_type, user_id)
+    if reporte is None:
+        raise ValueError('Tipo de reporte no válido')
+    return reportes.generar_csv(*reporte)
+
+
+@tarea('descarga_pdf', tipo_contenido='application/pdf', extension='pdf')
+def _descarga_pdf(report_type, user_id=None):
+    # También queda en la caché de PDF para los pedidos siguientes
+    return [generador_pdf.generar(report_type, user_id, forzar=True)]
+
+
+# ==============================================
+# TAREAS DE MANTENIMIENTO
+# ==============================================
+
+tarea('aplicar_inventario')(inventario.aplicar_pendientes)
+tarea('sincronizar_catalogo')(sincronizar_catalogo)
+tarea('recalcular_similares')(similares.recalcular_similares)
+tarea('actualizar_similares')(similares.actualizar_similares)
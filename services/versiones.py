@@ -0,0 +1,158 @@
+# services/versiones.py
+"""
+Versiones de datos por tabla y GET condicional (ETag / Last-Modified).
+
+Cada commit que modifica una tabla versionada incrementa su contador en
+version_tabla (vía services.eventos, así que cuenta tanto el ORM como las
+escrituras registradas con registrar_cambios). Como el contador vive en
+la base, todos los procesos ven la misma versión.
+
+@respuesta_condicional(*tablas) lee esos contadores (una consulta sobre
+una tabla diminuta) y, si el cliente ya tiene la versión vigente
+(If-None-Match / If-Modified-Since), responde 304 sin ejecutar la vista.
+Las escrituras hechas fuera de la aplicación (triggers, SQL manual) no
+incrementan versiones; las vistas que dependen de ellas pasan `extra`.
+"""
+import hashlib
+from datetime import date, datetime, timezone
+from functools import wraps
+
+from flask import make_response, request, session
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models.base import db, es_postgres
+from models.model import VersionTabla
+from services.eventos import al_confirmar
+
+CACHE_CONTROL = 'private, no-cache'
+
+# Solo se incrementan las tablas de las que depende alguna respuesta
+_tablas_versionadas = set()
+
+
+def registrar_tablas(*tablas):
+    _tablas_versionadas.update(tablas)
+    return tablas
+
+
+def incrementar(tablas):
+    """Suma 1 a la versión de cada tabla, en una transacción propia"""
+    tablas = sorted(set(tablas) & _tablas_versionadas)
+    if not tablas:
+        return
+
+    ahora = datetime.utcnow()
+    filas = [{'tabla': t, 'version': 1, 'actualizado_en': ahora} for t in tablas]
+    with db.engine.begin() as conn:
+        if es_postgres() or db.engine.dialect.name == 'sqlite':
+            dialecto = postgresql if es_postgres() else sqlite
+            stmt = dialecto.insert(VersionTabla)
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=[VersionTabla.tabla],
+                set_={'version': VersionTabla.version + 1, 'actualizado_en': stmt.excluded.actualizado_en}
+            ), filas)
+            return
+
+        for fila in filas:
+            actualizadas = conn.execute(
+                update(VersionTabla)
+                .where(VersionTabla.tabla == fila['tabla'])
+                .values(version=VersionTabla.version + 1, actualizado_en=ahora)
+            ).rowcount
+            if not actualizadas:
+                conn.execute(VersionTabla.__table__.insert(), fila)
+
+
+@al_confirmar
+def _incrementar_por_commit(cambios):
+    incrementar(cambios.keys())
+
+
+def leer_versiones(tablas):
+    """Devuelve ({tabla: version}, fecha del último cambio o None)"""
+    filas = db.session.execute(
+        select(VersionTabla.tabla, VersionTabla.version, VersionTabla.actualizado_en)
+        .where(VersionTabla.tabla.in_(tablas))
+    ).all()
+    versiones = {tabla: 0 for tabla in tablas}
+    versiones.update({f.tabla: f.version for f in filas})
+    ultima = max((f.actualizado_en for f in filas), default=None)
+    return versiones, ultima
+
+
+def firma(tablas, *extra):
+    """Identificador de la versión de los datos de `tablas` (más valores extra)"""
+    versiones, _ = leer_versiones(tablas)
+    base = '|'.join([f'{t}:{versiones[t]}' for t in sorted(versiones)] + [str(e) for e in extra])
+    return hashlib.sha1(base.encode('utf-8')).hexdigest()
+
+
+def formato_negociado(formatos):
+    """Tipo de `formatos` que prefiere el Accept de la petición (el primero si no indica)"""
+    return request.accept_mimetypes.best_match(formatos, default=formatos[0])
+
+
+def respuesta_condicional(*tablas, diario=False, formatos=None, extra=None):
+    """
+    Agrega ETag fuerte, Last-Modified y Cache-Control a las respuestas 200
+    de la vista, y responde 304 sin llamarla si el cliente está al día.
+
+    `diario` incluye la fecha en la versión, para respuestas que dependen
+    del día (p. ej. días de préstamo).
+    `formatos` (tipos MIME que la vista negocia por Accept) suma el formato
+    elegido a la versión y envía Vary: Accept.
+    `extra` es una función cuyo resultado también forma parte de la
+    versión, para datos que cambian sin pasar por version_tabla (p. ej.
+    libros anotados por triggers). Como ese valor no tiene fecha, con
+    `extra` no se envía Last-Modified.
+    """
+    registrar_tablas(*tablas)
+
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            versiones, ultima = leer_versiones(tablas)
+            hoy = date.today() if diario else None
+
+            # La ruta completa, el rol y el formato también forman parte de la versión
+            base = [request.full_path, str(session.get('role')), str(hoy)]
+            if formatos:
+                base.append(formato_negociado(formatos))
+            if extra is not None:
+                base.append(str(extra()))
+                ultima = None
+            base += [f'{t}:{versiones[t]}' for t in sorted(versiones)]
+            etag = hashlib.sha1('|'.join(base).encode('utf-8')).hexdigest()
+
+            if ultima is not None:
+                ultima = ultima.replace(microsecond=0, tzinfo=timezone.utc)
+                if hoy:
+                    ultima = max(ultima, datetime(hoy.year, hoy.month, hoy.day, tzinfo=timezone.utc))
+
+            if _cliente_al_dia(etag, ultima):
+                respuesta = make_response('', 304)
+            else:
+                respuesta = make_response(vista(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+
+            respuesta.set_etag(etag)
+            if ultima is not None:
+                respuesta.last_modified = ultima
+            if formatos:
+                respuesta.vary.add('Accept')
+            respuesta.headers['Cache-Control'] = CACHE_CONTROL
+            return respuesta
+        return envoltura
+    return decorador
+
+
+def _cliente_al_dia(etag, ultima):
+    if request.if_none_match:
+        # If-None-Match tiene prioridad sobre If-Modified-Since y usa
+        # comparación débil (RFC 9110): el compresor marca W/ los ETag
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and ultima is not None:
+        return ultima <= request.if_modified_since
+    return False
@@ -9,12 +9,14 @@ document.addEventListener('DOMContentLoaded', () => {
 
 // ========== FUNCIONES PARA LIBROS ==========
 
-function loadBooks(filters = {}) {
+// La API pagina por keyset: cada respuesta trae next_cursor para pedir la siguiente página
+function loadBooks(filters = {}, afterId = null) {
   let url = '/api/libros';
   const queryParams = new URLSearchParams();
 
   if (filters.author) queryParams.append('autor', filters.author);
-  if (filters.category) queryParams.append('categoria', filters.category);
+  if (filters.category) queryParams.append('categoria_id', filters.category);
+  if (afterId) queryParams.append('after_id', afterId);
 
   if (queryParams.toString()) {
     url += `?${queryParams.toString()}`;
@@ -22,15 +24,15 @@ function loadBooks(filters = {}) {
 
   fetch(url)
     .then(response => {
-      if (!response.ok) return [];
+      if (!response.ok) return { libros: [], next_cursor: null };
       return response.json();
     })
     .then(data => {
       const tbody = document.querySelector('#booksTable tbody');
       if (tbody) {
-        tbody.innerHTML = '';
+        if (!afterId) tbody.innerHTML = '';
 
-        data.forEach(book => {
+        data.libros.forEach(book => {
           // Extraer el nombre de la categoría correctamente
           let categoryName = '—';
           
@@ -63,12 +65,30 @@ function loadBooks(filters = {}) {
             </td>`;
           tbody.appendChild(tr);
         });
+
+        renderLoadMore(filters, data.next_cursor);
       }
     })
     .catch(error => {
       console.error('Error loading books:', error);
     });
 }
+function renderLoadMore(filters, nextCursor) {
+  let btn = document.getElementById('loadMoreBooks');
+  if (!nextCursor) {
+    if (btn) btn.remove();
+    return;
+  }
+  if (!btn) {
+    btn = document.createElement('button');
+    btn.id = 'loadMoreBooks';
+    btn.className = 'btn btn-sm btn-outline-light mt-2';
+    btn.textContent = 'Cargar más';
+    document.getElementById('booksTable').after(btn);
+  }
+  btn.onclick = () => loadBooks(filters, nextCursor);
+}
+
 function setupBookForm() {
   const form = document.getElementById('bookForm');
   if (!form) return;
@@ -156,15 +176,45 @@ function setupReportHandlers() {
   document.getElementById('btnTopBorrowers')?.addEventListener('click', () => {
     generateTopBorrowersReport();
   });
+
+  // Solo si la página tiene los botones del panel
+  if (document.getElementById('btnAvailableCopies')) {
+    preloadPanelReports();
+  }
+}
+
+// Los reportes del panel se piden en una sola petición a /api/reportes/dashboard
+// (el servidor los ejecuta en paralelo); cada botón usa ese resultado la primera
+// vez y después, o si ese reporte falló, pide el suyo.
+let panelReports = null;
+
+function preloadPanelReports() {
+  panelReports = fetch('/api/reportes/dashboard?reportes=inventario,prestamos_activos,top_usuarios,usuarios')
+    .then(response => response.ok ? response.json() : { reportes: {} })
+    .then(data => data.reportes)
+    .catch(() => ({}));
+}
+
+async function getPanelReport(key, url) {
+  if (panelReports) {
+    const reports = await panelReports;
+    const report = reports[key];
+    if (report && report.ok) {
+      delete reports[key];
+      return report.datos;
+    }
+  }
+
+  const response = await fetch(url);
+  if (!response.ok) throw new Error('Error al generar el reporte');
+  return await response.json();
 }
 
 // ========== FUNCIONES AUXILIARES ==========
 
 async function fetchUsers() {
   try {
-    const response = await fetch('/api/usuarios');
-    if (!response.ok) throw new Error('Error al obtener usuarios');
-    return await response.json();
+    return await getPanelReport('usuarios', '/api/users');
   } catch (error) {
     console.error('Error:', error);
     showError('No se pudieron cargar los usuarios');
@@ -385,11 +435,8 @@ async function generateAvailableCopiesReport() {
   try {
     showLoading('Generando reporte...');
     
-    const response = await fetch('/api/reportes/inventario');
-    if (!response.ok) throw new Error('Error al obtener inventario');
-    
-    const data = await response.json();
-    displayInventory(data);
+    const data = await getPanelReport('inventario', '/api/reportes/inventario');
+    displayInventory(data.inventario, data.actualizado_en);
     
   } catch (error) {
     console.error('Error:', error);
@@ -399,10 +446,11 @@ async function generateAvailableCopiesReport() {
   }
 }
 
-function displayInventory(data) {
+function displayInventory(data, actualizadoEn) {
   const content = `
     <div class="modal-header">
       <h5 class="modal-title">Inventario de libros</h5>
+      ${actualizadoEn ? `<small class="text-muted ms-2">Actualizado: ${new Date(actualizadoEn).toLocaleString()}</small>` : ''}
       <button type="button" class="btn-close" data-bs-dismiss="modal"></button>
     </div>
     <div class="modal-body">
@@ -442,10 +490,7 @@ async function generateActiveLoansReport() {
   try {
     showLoading('Generando reporte...');
     
-    const response = await fetch('/api/reportes/prestamos-activos');
-    if (!response.ok) throw new Error('Error al obtener préstamos activos');
-    
-    const data = await response.json();
+    const data = await getPanelReport('prestamos_activos', '/api/reportes/prestamos-activos');
     displayActiveLoans(data);
     
   } catch (error) {
@@ -499,10 +544,7 @@ async function generateTopBorrowersReport() {
   try {
     showLoading('Generando reporte...');
     
-    const response = await fetch('/api/reportes/top-usuarios');
-    if (!response.ok) throw new Error('Error al obtener datos');
-    
-    const data = await response.json();
+    const data = await getPanelReport('top_usuarios', '/api/reportes/top-usuarios');
     displayTopBorrowers(data);
     
   } catch (error) {